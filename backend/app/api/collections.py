@@ -1,7 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query
+from typing import Optional
 from sqlalchemy.orm import Session
 from app.database.connection import get_db
 from app.database import crud
+from app.api.grading_batches import cancel_collection_batches
+from app.services.json_rows import json_response
 from app.schemas.collection_schema import (
     CollectionCreate, 
     CollectionResponse, 
@@ -29,14 +32,14 @@ def create_collection(collection: CollectionCreate, db: Session = Depends(get_db
 # Get a list of all collections in the db
 @router.get("/", response_model=CollectionListResponse)
 def get_all_collections(db: Session = Depends(get_db)):
-    return crud.get_all_collections(db=db)
+    return json_response(crud.get_all_collections(db=db))
 
 # Get a list of all collections for a given user; will need to change endpoint when integrating with JWT tokens
 # since user_id will be obtainable from token
 @router.get("/{user_id}", response_model=CollectionListResponse)
 def get_collections(user_id: int, db: Session = Depends(get_db)):
     try:
-        return crud.get_collections(db=db, user_id=user_id)
+        return json_response(crud.get_collections(db=db, user_id=user_id))
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
@@ -50,9 +53,12 @@ def get_collection(user_id: int, collection_id: int, db: Session = Depends(get_d
         raise HTTPException(status_code=404, detail=str(e))
 
 @router.delete("/{user_id}/{collection_id}", response_model=CollectionDeleteResponse)
-def remove_collection(user_id: int, collection_id: int, db: Session = Depends(get_db)):
+async def remove_collection(user_id: int, collection_id: int, db: Session = Depends(get_db)):
     try:
-        return crud.delete_collection(db=db, user_id=user_id)
+        crud.get_collection(db=db, user_id=user_id, collection_id=collection_id)
+        # Stop grading first so no batch keeps grading answers that are being deleted
+        await cancel_collection_batches(db, collection_id)
+        return crud.delete_collection(db=db, user_id=user_id, collection_id=collection_id)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     
@@ -113,10 +119,19 @@ async def upload_questions_csv(collection_id: int, file: UploadFile = File(...),
         raise HTTPException(status_code=500, detail=f"Failed to process CSV: {str(e)}")
 
 @router.post("/{collection_id}/upload-answers", response_model=AnswerUploadResponse)
-async def upload_answers_csv(collection_id: int, file: UploadFile = File(...), db: Session = Depends(get_db)):
+async def upload_answers_csv(
+    collection_id: int,
+    file: UploadFile = File(...),
+    auto_accept_threshold: Optional[float] = Query(None, gt=0.0, le=1.0),
+    db: Session = Depends(get_db)
+):
     """
     Upload a CSV file with student answers for a collection.
     
+    Every answer gets a provisional lexical score against its model answer. With
+    auto_accept_threshold, answers scoring at least the threshold are graded 1.0
+    without the LLM.
+    
     Expected CSV format:
     student_name,student_pid,question,answer
     "John Doe","johndoe@vt.edu","What is X?","X is Z"
@@ -124,6 +139,7 @@ async def upload_answers_csv(collection_id: int, file: UploadFile = File(...), d
     Args:
         collection_id: ID of the collection
         file: CSV file upload
+        auto_accept_threshold: Provisional score from which answers are accepted
         
     Returns:
         Statistics about the upload process
@@ -134,7 +150,7 @@ async def upload_answers_csv(collection_id: int, file: UploadFile = File(...), d
         
         content = await file.read()
         
-        result = CSVService.process_answers_csv(db, collection_id, content)
+        result = CSVService.process_answers_csv(db, collection_id, content, auto_accept_threshold)
         return result
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
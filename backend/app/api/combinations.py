@@ -1,5 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Response
 from fastapi.responses import StreamingResponse
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from typing import List, Dict, Any, Optional
 import json
@@ -8,11 +9,14 @@ import logging
 
 from app.database.connection import get_db
 from app.models.combination import Combination
+from app.models.llm_response import LLMResponse
 from app.schemas.evaluation_schema import (
     CombinationCreate, 
     CombinationUpdate, 
     Combination as CombinationSchema, 
     CombinationWithCollections,
+    CascadeStats,
+    GradingMode,
     ModelList
 )
 from app.auth.auth import get_current_active_user, get_admin_user
@@ -21,6 +25,9 @@ from app.services.ollama_service import OllamaService
 router = APIRouter(prefix="/combinations", tags=["combinations"])
 ollama_service = OllamaService()
 
+# Fields whose change bumps the combination version, making earlier grades stale
+GRADING_FIELDS = ("prompt", "model_name", "cascade_model_name", "cascade_band_low", "cascade_band_high", "grading_mode")
+
 @router.get("/", response_model=List[CombinationSchema])
 async def get_combinations(
     skip: int = 0, 
@@ -83,19 +90,23 @@ async def create_combination(
             )
         
         models = response.json().get("models", [])
-        model_exists = any(model["name"] == combination.model_name for model in models)
-        
-        if not model_exists:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Model '{combination.model_name}' not found in Ollama"
-            )
+        for model_name in filter(None, [combination.model_name, combination.cascade_model_name]):
+            model_exists = any(model["name"] == model_name for model in models)
+            
+            if not model_exists:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Model '{model_name}' not found in Ollama"
+                )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error checking model: {str(e)}"
         )
     
+    verify_cascade_band(combination.cascade_band_low, combination.cascade_band_high)
+    verify_grading_mode(combination.grading_mode)
+    
     # Create the combination
     db_combination = Combination(**combination.model_dump())
     db.add(db_combination)
@@ -118,8 +129,15 @@ async def update_combination(
             detail="Combination not found"
         )
     
-    # If model name is being updated, verify it exists in Ollama
-    if combination_update.model_name and combination_update.model_name != db_combination.model_name:
+    # If model names are being updated, verify they exist in Ollama
+    new_model_names = [
+        model_name for model_name, current_model_name in [
+            (combination_update.model_name, db_combination.model_name),
+            (combination_update.cascade_model_name, db_combination.cascade_model_name)
+        ]
+        if model_name and model_name != current_model_name
+    ]
+    if new_model_names:
         try:
             response = await ollama_service._make_request_with_retry("GET", "api/tags")
             if response.status_code != 200:
@@ -129,27 +147,100 @@ async def update_combination(
                 )
             
             models = response.json().get("models", [])
-            model_exists = any(model["name"] == combination_update.model_name for model in models)
-            
-            if not model_exists:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Model '{combination_update.model_name}' not found in Ollama"
-                )
+            for model_name in new_model_names:
+                model_exists = any(model["name"] == model_name for model in models)
+                
+                if not model_exists:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail=f"Model '{model_name}' not found in Ollama"
+                    )
         except Exception as e:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Error checking model: {str(e)}"
             )
     
+    updates = combination_update.model_dump(exclude_unset=True)
+    if "grading_mode" in updates:
+        verify_grading_mode(updates["grading_mode"])
+    verify_cascade_band(
+        updates.get("cascade_band_low", db_combination.cascade_band_low),
+        updates.get("cascade_band_high", db_combination.cascade_band_high)
+    )
+    
+    # Any change to what a grade depends on makes the grades of the previous version stale
+    if any(
+        field in GRADING_FIELDS and getattr(db_combination, field) != value
+        for field, value in updates.items()
+    ):
+        db_combination.version = (db_combination.version or 1) + 1
+    
     # Update fields that are present in the request
-    for field, value in combination_update.model_dump(exclude_unset=True).items():
+    for field, value in updates.items():
         setattr(db_combination, field, value)
     
     db.commit()
     db.refresh(db_combination)
     return db_combination
 
+@router.get("/{combination_id}/cascade-stats", response_model=CascadeStats)
+async def get_cascade_stats(
+    combination_id: int,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_active_user)
+):
+    """Get how often grades of a combination were escalated to its cascade model."""
+    if not db.query(Combination.id).filter(Combination.id == combination_id).first():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Combination not found"
+        )
+    
+    total_grades = 0
+    escalated_grades = 0
+    grades_by_model = {}
+    for model_name, escalated, count in db.query(
+        LLMResponse.model_name,
+        LLMResponse.escalated,
+        func.count(LLMResponse.id)
+    ).filter(
+        LLMResponse.combination_id == combination_id
+    ).group_by(LLMResponse.model_name, LLMResponse.escalated).all():
+        total_grades += count
+        if escalated:
+            escalated_grades += count
+        grades_by_model[model_name or "unknown"] = grades_by_model.get(model_name or "unknown", 0) + count
+    
+    return CascadeStats(
+        combination_id=combination_id,
+        total_grades=total_grades,
+        escalated_grades=escalated_grades,
+        escalation_rate=escalated_grades / total_grades if total_grades else None,
+        grades_by_model=grades_by_model
+    )
+
+def verify_cascade_band(band_low: Optional[float], band_high: Optional[float]):
+    """Verify that the ambiguous band of a cascade is either unset or a valid range."""
+    if (band_low is None) != (band_high is None):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Both cascade_band_low and cascade_band_high must be set, or neither"
+        )
+    if band_low is not None and band_low > band_high:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="cascade_band_low must not be greater than cascade_band_high"
+        )
+
+def verify_grading_mode(grading_mode: Optional[str]):
+    """Verify that a grading mode is known."""
+    if grading_mode not in (GradingMode.FULL, GradingMode.GRADE_ONLY):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown grading mode '{grading_mode}'"
+        )
+
 @router.delete("/{combination_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_combination(
     combination_id: int,
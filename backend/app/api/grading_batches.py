@@ -0,0 +1,269 @@
+# app/api/grading_batches.py
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+import asyncio
+import logging
+import os
+
+from app.database.connection import get_db, SessionLocal
+from app.models.collection import Collection
+from app.models.question import Question
+from app.models.student_answer import StudentAnswer
+from app.models.llm_response import LLMResponse
+from app.models.grading_batch import GradingBatch
+from app.schemas.scheduler_schema import GenerationPriority
+from app.schemas.grading_batch_schema import GradingBatchCreate, GradingBatchResponse, GradingBatchStatus, StaleAnswers
+from app.services.cluster_grading_service import ClusterGradingService
+from app.services.generation_scheduler import generation_scheduler
+from app.services.grading_service import GradingService
+from app.services.regrade_service import RegradeService
+from app.services.job_registry import job_registry
+from app.auth.auth import get_current_active_user
+
+router = APIRouter(prefix="/grading-batches", tags=["grading_batches"])
+
+# Ungraded answers a user may have in running batches before new batches are refused
+MAX_BATCH_BACKLOG_PER_USER = int(os.getenv("MAX_BATCH_BACKLOG_PER_USER", "5000"))
+
+@router.post("/", response_model=GradingBatchResponse, status_code=status.HTTP_201_CREATED)
+async def create_grading_batch(
+    batch: GradingBatchCreate,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_active_user)
+):
+    """
+    Grade the answers of a whole collection in the background.
+    
+    With only_stale, only answers whose latest grade was produced by an older combination
+    version, another model build or a different prompt are regraded. With a cluster
+    threshold, near-identical answers to a question are graded once and
+    the grade is copied to the rest of their cluster.
+    """
+    collection = db.query(Collection).filter(Collection.id == batch.collection_id).first()
+    if not collection:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Collection {batch.collection_id} not found"
+        )
+    if collection.deleting:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Collection {batch.collection_id} is being deleted"
+        )
+    
+    # Admission control: a user's running batches must drain before more are queued.
+    # Only batches this process is running count, so a batch left behind by a crash never blocks the user.
+    open_batches = db.query(
+        GradingBatch.id,
+        GradingBatch.total_answers - GradingBatch.graded_answers
+        - GradingBatch.failed_answers - GradingBatch.propagated_answers
+    ).join(Collection, GradingBatch.collection_id == Collection.id).filter(
+        Collection.user_id == collection.user_id,
+        GradingBatch.status.in_([GradingBatchStatus.PENDING, GradingBatchStatus.RUNNING])
+    ).all()
+    backlog = sum(remaining or 0 for batch_id, remaining in open_batches if job_registry.is_running(grading_batch_job_key(batch_id)))
+    if backlog >= MAX_BATCH_BACKLOG_PER_USER:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"{backlog} answers are still waiting in running grading batches; try again later",
+            headers={"Retry-After": str(generation_scheduler.estimate_wait(backlog - MAX_BATCH_BACKLOG_PER_USER + 1))}
+        )
+    
+    db_batch = GradingBatch(
+        collection_id=batch.collection_id,
+        only_ungraded=batch.only_ungraded,
+        only_stale=batch.only_stale,
+        cluster_threshold=batch.cluster_threshold,
+        status=GradingBatchStatus.PENDING
+    )
+    db.add(db_batch)
+    db.commit()
+    db.refresh(db_batch)
+    
+    job_registry.start(grading_batch_job_key(db_batch.id), process_grading_batch(db_batch.id))
+    return db_batch
+
+@router.get("/stale/{collection_id}", response_model=StaleAnswers)
+async def get_stale_answers(
+    collection_id: int,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_active_user)
+):
+    """List the graded answers of a collection whose grade is out of date."""
+    collection = db.query(Collection).filter(Collection.id == collection_id).first()
+    if not collection:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Collection {collection_id} not found"
+        )
+    
+    graded_answers, stale_answer_ids = await RegradeService.find_stale_answers(db, collection_id)
+    return StaleAnswers(collection_id=collection_id, graded_answers=graded_answers, stale_answer_ids=stale_answer_ids)
+
+@router.get("/{batch_id}", response_model=GradingBatchResponse)
+async def get_grading_batch(
+    batch_id: int,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_active_user)
+):
+    """Get the progress of a grading batch."""
+    db_batch = db.query(GradingBatch).filter(GradingBatch.id == batch_id).first()
+    if not db_batch:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Grading batch not found"
+        )
+    return db_batch
+
+@router.post("/{batch_id}/cancel", response_model=GradingBatchResponse)
+async def cancel_grading_batch(
+    batch_id: int,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_active_user)
+):
+    """Cancel a grading batch, keeping the grades produced so far."""
+    db_batch = db.query(GradingBatch).filter(GradingBatch.id == batch_id).first()
+    if not db_batch:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Grading batch not found"
+        )
+    
+    if db_batch.status not in (GradingBatchStatus.PENDING, GradingBatchStatus.RUNNING):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Grading batch is not running (status: {db_batch.status})"
+        )
+    
+    # Marking the batch cancelled also stops batches owned by other workers at their next answer
+    db_batch.status = GradingBatchStatus.CANCELLED
+    db.commit()
+    
+    # Abort the in-flight request of a batch owned by this process right away
+    await job_registry.cancel_and_wait(grading_batch_job_key(batch_id))
+    
+    db.refresh(db_batch)
+    return db_batch
+
+def grading_batch_job_key(batch_id: int):
+    """Key of a grading batch in the job registry."""
+    return ("grading_batch", batch_id)
+
+async def cancel_collection_batches(db: Session, collection_id: int):
+    """Cancel the pending and running grading batches of a collection, e.g. before it is deleted."""
+    batches = db.query(GradingBatch).filter(
+        GradingBatch.collection_id == collection_id,
+        GradingBatch.status.in_([GradingBatchStatus.PENDING, GradingBatchStatus.RUNNING])
+    ).all()
+    for db_batch in batches:
+        db_batch.status = GradingBatchStatus.CANCELLED
+    db.commit()
+    for db_batch in batches:
+        await job_registry.cancel_and_wait(grading_batch_job_key(db_batch.id))
+
+def resume_interrupted_grading_batches():
+    """
+    Resume the grading batches left pending or running by a previous process, e.g. after a crash or restart.
+
+    Batches that only grade ungraded or stale answers pick up where they stopped; a batch
+    regrading every answer cannot tell which answers it already regraded and is marked failed.
+    """
+    db = SessionLocal()
+    try:
+        batches = db.query(GradingBatch).filter(
+            GradingBatch.status.in_([GradingBatchStatus.PENDING, GradingBatchStatus.RUNNING])
+        ).all()
+        for db_batch in batches:
+            if job_registry.is_running(grading_batch_job_key(db_batch.id)):
+                continue
+            if not (db_batch.only_ungraded or db_batch.only_stale):
+                db_batch.status = GradingBatchStatus.FAILED
+                continue
+            logging.getLogger(__name__).info(f"Resuming interrupted grading batch {db_batch.id}")
+            job_registry.start(grading_batch_job_key(db_batch.id), process_grading_batch(db_batch.id))
+        db.commit()
+    finally:
+        db.close()
+
+async def process_grading_batch(batch_id: int):
+    """Grade every selected answer of a batch's collection, one answer (or cluster representative) at a time."""
+    logger = logging.getLogger(__name__)
+    
+    # The batch outlives the request that started it, so it owns its own session
+    db = SessionLocal()
+    try:
+        batch = db.query(GradingBatch).filter(GradingBatch.id == batch_id).first()
+        if not batch:
+            return
+        
+        if batch.only_stale:
+            _, answer_ids = await RegradeService.find_stale_answers(db, batch.collection_id)
+        else:
+            query = db.query(StudentAnswer.id).join(Question).filter(
+                Question.collection_id == batch.collection_id
+            )
+            if batch.only_ungraded:
+                query = query.filter(~StudentAnswer.llm_responses.any())
+            answer_ids = [row[0] for row in query.order_by(StudentAnswer.id).all()]
+        
+        # A resumed batch only selects what is left; the grades it already produced still count
+        batch.total_answers = (batch.graded_answers or 0) + (batch.propagated_answers or 0) + len(answer_ids)
+        batch.failed_answers = 0  # Failed answers are still ungraded and are selected again
+        batch.status = GradingBatchStatus.RUNNING
+        db.commit()
+        
+        # Each step grades one answer and copies its grade to the answers of its cluster
+        plan = [(answer_id, [], []) for answer_id in answer_ids]
+        if batch.cluster_threshold:
+            try:
+                plan = await ClusterGradingService.plan(db, answer_ids, batch.cluster_threshold)
+            except RuntimeError as e:
+                logger.warning(f"Clustering failed for grading batch {batch_id}, grading every answer: {str(e)}")
+        
+        step = 0
+        while step < len(plan):
+            student_answer_id, member_ids, similarities = plan[step]
+            step += 1
+            
+            db.refresh(batch)
+            if batch.status == GradingBatchStatus.CANCELLED:
+                logger.info(f"Grading batch {batch_id} cancelled")
+                return
+            
+            try:
+                graded = await GradingService.grade_student_answer(
+                    db=db, student_answer_id=student_answer_id, priority=GenerationPriority.BULK
+                )
+                batch.graded_answers += 1
+                if member_ids:
+                    batch.propagated_answers += ClusterGradingService.propagate(db, graded, member_ids, similarities)
+            except (ValueError, RuntimeError) as e:
+                logger.error(f"Failed to grade student answer {student_answer_id}: {str(e)}")
+                db.rollback()
+                batch.failed_answers += 1
+                # The members of a cluster whose representative failed are graded on their own
+                plan.extend((member_id, [], []) for member_id in member_ids)
+            db.commit()
+        
+        batch.status = GradingBatchStatus.COMPLETED
+        db.commit()
+    
+    except asyncio.CancelledError:
+        # Every finished grade is already committed; only the in-flight generation is dropped
+        logger.info(f"Grading batch {batch_id} cancelled")
+        db.rollback()
+        batch = db.query(GradingBatch).filter(GradingBatch.id == batch_id).first()
+        if batch:
+            batch.status = GradingBatchStatus.CANCELLED
+            db.commit()
+        raise
+    
+    except Exception as e:
+        logger.error(f"Error processing grading batch {batch_id}: {str(e)}")
+        db.rollback()
+        batch = db.query(GradingBatch).filter(GradingBatch.id == batch_id).first()
+        if batch:
+            batch.status = GradingBatchStatus.FAILED
+            db.commit()
+    finally:
+        db.close()
@@ -0,0 +1,175 @@
+# app/api/reextraction.py
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+import asyncio
+import logging
+
+from app.database.connection import get_db, SessionLocal
+from app.models.collection import Collection
+from app.models.reextraction_job import ReextractionJob
+from app.models.test import Test
+from app.schemas.reextraction_schema import (
+    ReextractionRequest,
+    LLMResponseReextractionRequest,
+    ReextractionJobResponse,
+    ReextractionJobStatus,
+    ReextractionTarget,
+    ExtractorList
+)
+from app.services.grade_extraction import EXTRACTORS, DEFAULT_EXTRACTOR_VERSION
+from app.services.reextraction_service import ReextractionService
+from app.services.job_registry import job_registry
+from app.auth.auth import get_admin_user
+
+router = APIRouter(prefix="/reextraction", tags=["reextraction"])
+
+@router.get("/extractors", response_model=ExtractorList)
+async def list_extractors(current_user = Depends(get_admin_user)):
+    """List the registered extractor versions."""
+    return ExtractorList(versions=list(EXTRACTORS), default_version=DEFAULT_EXTRACTOR_VERSION)
+
+@router.post("/tests/{test_id}", response_model=ReextractionJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def reextract_test(
+    test_id: int,
+    request: ReextractionRequest,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_admin_user)
+):
+    """
+    Re-extract the grades of a test from its stored responses without calling the LLM.
+
+    In "rewrite" mode extracted grades, accuracies and summaries are replaced; in "shadow"
+    mode the grades are written to the shadow columns for comparison. The job runs in the
+    background; poll GET /reextraction/jobs/{job_id} for its progress.
+    """
+    if not db.query(Test.id).filter(Test.id == test_id).first():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Test not found"
+        )
+    
+    return start_reextraction_job(db, ReextractionJob(
+        target=ReextractionTarget.TEST_RESULTS,
+        test_id=test_id,
+        extractor_version=request.extractor_version,
+        mode=request.mode
+    ))
+
+@router.post("/llm-responses", response_model=ReextractionJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def reextract_llm_responses(
+    request: LLMResponseReextractionRequest,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_admin_user)
+):
+    """Re-extract the grades and feedback of stored grading responses in the background, optionally for one collection."""
+    if request.collection_id is not None and not db.query(Collection.id).filter(Collection.id == request.collection_id).first():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Collection {request.collection_id} not found"
+        )
+    
+    return start_reextraction_job(db, ReextractionJob(
+        target=ReextractionTarget.LLM_RESPONSES,
+        collection_id=request.collection_id,
+        extractor_version=request.extractor_version,
+        mode=request.mode
+    ))
+
+@router.get("/jobs/{job_id}", response_model=ReextractionJobResponse)
+async def get_reextraction_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_admin_user)
+):
+    """Get the progress of a re-extraction job."""
+    db_job = db.query(ReextractionJob).filter(ReextractionJob.id == job_id).first()
+    if not db_job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Re-extraction job not found"
+        )
+    return db_job
+
+def reextraction_job_key(job_id: int):
+    """Key of a re-extraction job in the job registry."""
+    return ("reextraction", job_id)
+
+def start_reextraction_job(db: Session, db_job: ReextractionJob) -> ReextractionJob:
+    """Validate, store and start a re-extraction job."""
+    try:
+        ReextractionService.validate(db_job.extractor_version, db_job.mode)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    db_job.status = ReextractionJobStatus.PENDING
+    db.add(db_job)
+    db.commit()
+    db.refresh(db_job)
+    
+    job_registry.start(reextraction_job_key(db_job.id), process_reextraction_job(db_job.id))
+    return db_job
+
+def resume_interrupted_reextractions():
+    """Restart the re-extraction jobs left pending or running by a previous process; re-extraction is idempotent."""
+    db = SessionLocal()
+    try:
+        job_ids = [row.id for row in db.query(ReextractionJob.id).filter(
+            ReextractionJob.status.in_([ReextractionJobStatus.PENDING, ReextractionJobStatus.RUNNING])
+        )]
+    finally:
+        db.close()
+    for job_id in job_ids:
+        if not job_registry.is_running(reextraction_job_key(job_id)):
+            logging.getLogger(__name__).info(f"Resuming interrupted re-extraction job {job_id}")
+            job_registry.start(reextraction_job_key(job_id), process_reextraction_job(job_id))
+
+async def process_reextraction_job(job_id: int):
+    """Run a re-extraction job in a worker thread, so the event loop keeps serving requests."""
+    await asyncio.to_thread(run_reextraction_job, job_id)
+
+def run_reextraction_job(job_id: int):
+    """Re-extract the responses selected by a job, recording its progress after each chunk."""
+    logger = logging.getLogger(__name__)
+    
+    # The job outlives the request that started it, so it owns its own session
+    db = SessionLocal()
+    try:
+        job = db.query(ReextractionJob).filter(ReextractionJob.id == job_id).first()
+        if not job:
+            return
+        
+        job.status = ReextractionJobStatus.RUNNING
+        job.processed = 0
+        job.changed = 0
+        db.commit()
+        
+        def record_progress(stats):
+            job.processed = stats["processed"]
+            job.changed = stats["changed"]
+            db.commit()
+        
+        try:
+            if job.target == ReextractionTarget.TEST_RESULTS:
+                ReextractionService.reextract_test_results(
+                    db, job.test_id, job.extractor_version, job.mode, on_progress=record_progress
+                )
+            else:
+                ReextractionService.reextract_llm_responses(
+                    db, job.extractor_version, job.mode, collection_id=job.collection_id, on_progress=record_progress
+                )
+        except Exception as e:
+            logger.error(f"Re-extraction job {job_id} failed: {str(e)}")
+            db.rollback()
+            job.status = ReextractionJobStatus.FAILED
+            job.error = str(e)
+            db.commit()
+            return
+        
+        job.status = ReextractionJobStatus.COMPLETED
+        db.commit()
+        logger.info(f"Re-extraction job {job_id} completed: {job.processed} processed, {job.changed} changed")
+    finally:
+        db.close()
@@ -0,0 +1,13 @@
+# app/api/scheduler.py
+from fastapi import APIRouter, Depends
+
+from app.schemas.scheduler_schema import SchedulerStats
+from app.services.generation_scheduler import generation_scheduler
+from app.auth.auth import get_admin_user
+
+router = APIRouter(prefix="/scheduler", tags=["scheduler"])
+
+@router.get("/stats", response_model=SchedulerStats)
+async def get_scheduler_stats(current_user = Depends(get_admin_user)):
+    """Queue depth, running generations and waiting times of every priority class in this process."""
+    return generation_scheduler.stats()
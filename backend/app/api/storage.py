@@ -0,0 +1,102 @@
+# app/api/storage.py
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+
+from app.database.connection import get_db
+from app.schemas.storage_schema import (
+    CompressionStats,
+    DictionaryTrainingResult,
+    RecompressionResult,
+    RetentionRequest,
+    RetentionResult,
+    ArchivePage
+)
+from app.services.compression_service import CompressionService
+from app.services.json_rows import json_response
+from app.services.retention_service import RetentionService, RETENTION_KEEP_RESPONSES, RETENTION_TEST_RESULT_DAYS
+from app.auth.auth import get_admin_user
+
+router = APIRouter(prefix="/storage", tags=["storage"])
+
+@router.get("/compression", response_model=CompressionStats)
+def get_compression_stats(db: Session = Depends(get_db), current_user = Depends(get_admin_user)):
+    """Stored size of the compressed LLM output columns and the dictionary new values are compressed with."""
+    return CompressionService.storage_stats(db)
+
+@router.post("/compression/dictionary", response_model=DictionaryTrainingResult)
+def train_compression_dictionary(db: Session = Depends(get_db), current_user = Depends(get_admin_user)):
+    """
+    Train a compression dictionary on the newest stored LLM outputs.
+
+    Values written afterwards are compressed with it; run a recompression to rewrite the
+    values stored before.
+    """
+    try:
+        return CompressionService.train_dictionary(db)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+@router.post("/compression/recompress", response_model=RecompressionResult)
+def recompress_stored_outputs(db: Session = Depends(get_db), current_user = Depends(get_admin_user)):
+    """Rewrite the stored LLM outputs that are not compressed with the current dictionary."""
+    return CompressionService.recompress(db)
+
+@router.post("/retention/run", response_model=RetentionResult)
+def run_retention(
+    request: RetentionRequest,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_admin_user)
+):
+    """
+    Move the LLM responses beyond the newest few of each answer, and the results of old
+    finished tests, to the Parquet archive and delete them from the database.
+    """
+    try:
+        return RetentionService.run(
+            db,
+            keep_responses=RETENTION_KEEP_RESPONSES if request.keep_responses_per_answer is None
+            else request.keep_responses_per_answer,
+            test_result_days=RETENTION_TEST_RESULT_DAYS if request.test_result_days is None else request.test_result_days,
+            dry_run=request.dry_run
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except RuntimeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
+
+@router.get("/archive/llm-responses", response_model=ArchivePage)
+def get_archived_llm_responses(
+    student_answer_id: Optional[int] = None,
+    after_id: int = 0,
+    limit: int = 100,
+    current_user = Depends(get_admin_user)
+):
+    """Get one page of archived LLM responses, ordered by ID, optionally of one student answer."""
+    return json_response(RetentionService.query_archive(
+        "llm_responses", {"student_answer_id": student_answer_id}, after_id=after_id, limit=limit
+    ))
+
+@router.get("/archive/tests/{test_id}/results", response_model=ArchivePage)
+def get_archived_test_results(
+    test_id: int,
+    model_name: Optional[str] = None,
+    prompt_id: Optional[int] = None,
+    after_id: int = 0,
+    limit: int = 100,
+    current_user = Depends(get_admin_user)
+):
+    """Get one page of a test's archived results, ordered by ID, optionally of one model and prompt."""
+    return json_response(RetentionService.query_archive(
+        "test_results", {"test_id": test_id, "model_name": model_name, "prompt_id": prompt_id},
+        after_id=after_id, limit=limit
+    ))
@@ -1,17 +1,17 @@
 # app/api/student_answers.py
-from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi import APIRouter, Depends, HTTPException
 from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-import asyncio
 import json
 import logging
 from app.database.connection import get_db
 from app.database import crud
+from app.services.json_rows import json_response
 from app.schemas.student_answer_schema import StudentAnswerCreate, StudentAnswerResponse, StudentAnswerListResponse, StudentAnswerDeleteResponse
-from app.schemas.llm_response_schema import LLMResponseResponse, LLMResponseCreate
+from app.schemas.llm_response_schema import LLMResponseResponse
 from app.services.ollama_service import OllamaService
-from app.models.collection import Collection
-from app.models.combination import Combination
+from app.services.generation_scheduler import AdmissionRejected
+from app.services.grading_service import GradingService
 
 router = APIRouter(prefix="/student-answers", tags=["student_answers"])
 
@@ -25,14 +25,14 @@ def create_student_answer(student_answer: StudentAnswerCreate, db: Session = Dep
 @router.get("/student/{student_id}", response_model=StudentAnswerListResponse)
 def get_student_answers_by_student(student_id: int, db: Session = Depends(get_db)):
     try:
-        return crud.get_student_answers_by_student(db=db, student_id=student_id)
+        return json_response(crud.get_student_answers_by_student(db=db, student_id=student_id))
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
 @router.get("/question/{question_id}", response_model=StudentAnswerListResponse)
 def get_student_answers_by_question(question_id: int, db: Session = Depends(get_db)):
     try:
-        return crud.get_student_answers_by_question(db=db, question_id=question_id)
+        return json_response(crud.get_student_answers_by_question(db=db, question_id=question_id))
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
@@ -72,21 +72,9 @@ async def stream_grade_download_progress(student_answer_id: int, db: Session = D
     
     async def progress_stream():
         try:
-            # Get student answer
-            student_answer = crud.get_student_answer(db=db, student_answer_id=student_answer_id)
-            
-            # Get question and its associated collection
-            question = crud.get_question(db=db, question_id=student_answer.question_id)
-            collection = db.query(Collection).filter(Collection.id == question.collection_id).first()
-            
-            # Initialize variables for model and prompt
-            model_name = None
-            
-            # Check if collection has an associated combination
-            if collection and collection.combination_id:
-                combination = db.query(Combination).filter(Combination.id == collection.combination_id).first()
-                if combination:
-                    model_name = combination.model_name
+            # The model of the combination of the answer's collection, if any
+            _, _, combination = GradingService.load_context(db, student_answer_id)
+            model_name = combination.model_name if combination else None
             
             # Initialize Ollama service with custom model (if available)
             ollama_service = OllamaService(model_name=model_name) if model_name else OllamaService()
@@ -164,91 +152,39 @@ async def grade_student_answer(student_answer_id: int, db: Session = Depends(get
     logger.info(f"Starting grading for student answer ID {student_answer_id}")
     
     try:
-        # Get student answer
-        student_answer = crud.get_student_answer(db=db, student_answer_id=student_answer_id)
-        
-        # Get question and its associated collection
-        question = crud.get_question(db=db, question_id=student_answer.question_id)
-        collection = db.query(Collection).filter(Collection.id == question.collection_id).first()
-        
-        # Initialize variables for model and prompt
-        model_name = None
-        custom_prompt = None
-        
-        # Check if collection has an associated combination
-        if collection and collection.combination_id:
-            combination = db.query(Combination).filter(Combination.id == collection.combination_id).first()
-            if combination:
-                model_name = combination.model_name
-                custom_prompt = combination.prompt
-        
-        # Initialize Ollama service with custom model (if available)
-        ollama_service = OllamaService(model_name=model_name) if model_name else OllamaService()
-        logger.info(f"Using model: {ollama_service.model_name}")
-        
-        # Ensure model is downloaded - note that the UI should use the streaming endpoint to show progress
-        if not await ollama_service.check_model_exists():
-            logger.info(f"Model {ollama_service.model_name} not found, downloading...")
-            await ollama_service.download_model()
-        
-        # Create prompt - either use custom prompt or fall back to default
-        if custom_prompt:
-            # Replace placeholders in custom prompt with actual values
-            prompt = custom_prompt.replace("{{question}}", question.text)
-            prompt = prompt.replace("{{model_answer}}", question.model_answer)
-            prompt = prompt.replace("{{student_answer}}", student_answer.answer)
-        else:
-            # Use the default prompt format
-            prompt = ollama_service.create_grading_prompt(
-                question=question.text,
-                model_answer=question.model_answer,
-                student_answer=student_answer.answer
-            )
-        
-        # Generate response
-        logger.info(f"Generating response for student answer ID {student_answer_id}")
-        response_text = await ollama_service.generate_response(prompt)
-        
-        if not response_text:
-            logger.error("Failed to generate LLM response")
-            raise HTTPException(status_code=500, detail="Failed to generate LLM response")
-        
-        # Extract grade and feedback
-        grade, confidence = ollama_service.extract_grade(response_text)
-        feedback = ollama_service.extract_feedback(response_text)
-        logger.info(f"Grade extracted: {grade}, confidence: {confidence}")
-        
-        # Create LLM response record
-        llm_response_create = LLMResponseCreate(
-            raw_response=response_text,
-            grade=grade,
-            feedback=feedback,
-            student_answer_id=student_answer_id
-        )
-        
-        llm_response = crud.create_llm_response(db=db, llm_response=llm_response_create)
+        llm_response = await GradingService.grade_student_answer(db=db, student_answer_id=student_answer_id)
         logger.info(f"Successfully graded student answer {student_answer_id}")
         
         return llm_response
     except ValueError as e:
         logger.error(f"Value error: {str(e)}")
         raise HTTPException(status_code=404, detail=str(e))
+    except AdmissionRejected as e:
+        logger.warning(f"Rejected grading of student answer {student_answer_id}: {str(e)}")
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
     except Exception as e:
         logger.error(f"Error during grading: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Grading error: {str(e)}")
 
 @router.get("/{student_answer_id}/grades", response_model=LLMResponseResponse)
-def get_latest_grade(student_answer_id: int, db: Session = Depends(get_db)):
+async def get_latest_grade(student_answer_id: int, feedback: bool = False, db: Session = Depends(get_db)):
     """
     Get the latest grade for a student answer.
     
     Args:
         student_answer_id: ID of the student answer
+        feedback: Generate the feedback of a grade-only response if it has none yet
         
     Returns:
         The latest LLM response with grade and feedback
     """
     try:
+        if feedback:
+            return await GradingService.generate_feedback(db=db, student_answer_id=student_answer_id)
         return crud.get_latest_llm_response_by_student_answer(db=db, student_answer_id=student_answer_id)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
+    except AdmissionRejected as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except RuntimeError as e:
+        raise HTTPException(status_code=500, detail=f"Feedback error: {str(e)}")
@@ -3,6 +3,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from app.database.connection import get_db
 from app.database import crud
+from app.services.json_rows import json_response
 from app.schemas.student_schema import StudentCreate, StudentResponse, StudentListResponse, StudentDeleteResponse
 
 router = APIRouter(prefix="/students", tags=["students"])
@@ -17,7 +18,7 @@ def create_student(student: StudentCreate, db: Session = Depends(get_db)):
 @router.get("/collection/{collection_id}", response_model=StudentListResponse)
 def get_students_by_collection(collection_id: int, db: Session = Depends(get_db)):
     try:
-        return crud.get_students_by_collection(db=db, collection_id=collection_id)
+        return json_response(crud.get_students_by_collection(db=db, collection_id=collection_id))
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
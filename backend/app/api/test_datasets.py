@@ -0,0 +1,89 @@
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from sqlalchemy.orm import Session
+from typing import List, Optional
+
+from app.database.connection import get_db
+from app.models.test import Test, TestDataset
+from app.schemas.test_schema import TestDataset as TestDatasetSchema
+from app.services.test_dataset_service import TestDatasetService
+from app.auth.auth import get_admin_user
+
+router = APIRouter(prefix="/test-datasets", tags=["test_datasets"])
+
+@router.get("/", response_model=List[TestDatasetSchema])
+async def get_test_datasets(
+    skip: int = 0,
+    limit: int = 100,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_admin_user)
+):
+    """Get all stored test datasets."""
+    return db.query(TestDataset).order_by(TestDataset.created_at.desc()).offset(skip).limit(limit).all()
+
+@router.post("/", response_model=TestDatasetSchema, status_code=status.HTTP_201_CREATED)
+async def upload_test_dataset(
+    file: UploadFile = File(...),
+    name: Optional[str] = Form(None),
+    db: Session = Depends(get_db),
+    current_user = Depends(get_admin_user)
+):
+    """
+    Upload a test dataset CSV.
+    
+    The CSV must contain the columns Question, Model Answer, Student Answer and Model Grade.
+    Uploading rows that are already stored returns the existing dataset.
+    """
+    if not file.filename.endswith('.csv'):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Only CSV files are supported"
+        )
+    
+    contents = await file.read()
+    try:
+        rows = TestDatasetService.parse_csv(contents)
+        return TestDatasetService.get_or_create_dataset(db, name or file.filename, rows)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+@router.get("/{dataset_id}", response_model=TestDatasetSchema)
+async def get_test_dataset(
+    dataset_id: int,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_admin_user)
+):
+    """Get a stored test dataset."""
+    dataset = db.query(TestDataset).filter(TestDataset.id == dataset_id).first()
+    if not dataset:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Test dataset not found"
+        )
+    return dataset
+
+@router.delete("/{dataset_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_test_dataset(
+    dataset_id: int,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_admin_user)
+):
+    """Delete a test dataset that no test uses. Its items are kept, as other datasets may share them."""
+    dataset = db.query(TestDataset).filter(TestDataset.id == dataset_id).first()
+    if not dataset:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Test dataset not found"
+        )
+    
+    if db.query(Test.id).filter(Test.dataset_id == dataset_id).first():
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Test dataset is used by a test"
+        )
+    
+    db.delete(dataset)
+    db.commit()
+    return None
@@ -1,30 +1,62 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, BackgroundTasks
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Response, status, UploadFile, File
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func
+from sqlalchemy.orm import Session, undefer
 from typing import List, Dict, Any, Optional
-import pandas as pd
-import io
 import json
+import logging
+import os
 import asyncio
+import random
 import time
 from datetime import datetime
 
-from app.database.connection import get_db
-from app.models.test import Test, TestResult, TestSummary
+from app.database.connection import get_db, SessionLocal
+from app.models.collection import Collection
+from app.models.test import Test, TestResult, TestSummary, TestProgress, TestDataset, TestItem
 from app.models.prompt import Prompt
 from app.schemas.test_schema import (
     TestCreate,
     TestConfig,
     TestUpload,
+    TestRun,
     TestResult as TestResultSchema,
     TestWithResults,
-    TestStatus
+    TestWithSummaries,
+    TestResultPage,
+    TestSummary as TestSummarySchema,
+    TestStatus,
+    EvaluationMode
 )
+from app.schemas.scheduler_schema import GenerationPriority
 from app.services.ollama_service import OllamaService
+from app.services.deletion_service import DeletionService
+from app.services.job_registry import job_registry
+from app.services.json_rows import json_response, query_rows
+from app.services.test_progress_service import test_progress_service
+from app.services.metrics_service import MetricsService
+from app.services.test_dataset_service import TestDatasetService
+from app.services.racing_service import RacingService, PairStatistics
 from app.auth.auth import get_current_active_user, get_admin_user
 
 router = APIRouter(prefix="/tests", tags=["tests"])
 ollama_service = OllamaService()
 
+# Number of rows committed together with the progress checkpoint during a test run
+CHECKPOINT_BATCH_SIZE = int(os.getenv("TEST_CHECKPOINT_BATCH_SIZE", "25"))
+
+# Columns of a test result that can be selected on the paginated results endpoint
+RESULT_FIELDS = [
+    "model_name", "prompt_id", "question", "student_answer", "model_answer", "model_grade",
+    "extracted_grade", "confidence", "accuracy", "response_time", "full_response", "created_at"
+]
+DEFAULT_RESULT_FIELDS = [field for field in RESULT_FIELDS if field != "full_response"]
+ITEM_FIELDS = ["question", "student_answer", "model_answer"]  # Read from the shared test item
+MAX_RESULTS_PAGE_SIZE = 1000
+
+# Seconds without live events after which a progress stream resends the stored checkpoints
+PROGRESS_HEARTBEAT_SECONDS = 5.0
+
 @router.get("/", response_model=List[TestConfig])
 async def get_tests(
     skip: int = 0, 
@@ -75,12 +107,29 @@ async def create_test(
                 detail=f"Prompt with ID {prompt_id} not found"
             )
     
+    if test.evaluation_mode not in (EvaluationMode.EXHAUSTIVE, EvaluationMode.ADAPTIVE):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown evaluation mode '{test.evaluation_mode}'"
+        )
+    
+    if test.dataset_id is not None and not db.query(TestDataset.id).filter(TestDataset.id == test.dataset_id).first():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Test dataset with ID {test.dataset_id} not found"
+        )
+    
     # Create the test
     db_test = Test(
         name=test.name,
         description=test.description,
         model_names=test.model_names,
         prompt_ids=test.prompt_ids,
+        dataset_id=test.dataset_id,
+        evaluation_mode=test.evaluation_mode,
+        stopping_confidence=test.stopping_confidence,
+        min_rows=test.min_rows,
+        random_seed=random.randrange(2 ** 31) if test.evaluation_mode == EvaluationMode.ADAPTIVE else None,
         status=TestStatus.PENDING
     )
     db.add(db_test)
@@ -94,22 +143,252 @@ async def get_test(
     db: Session = Depends(get_db),
     current_user = Depends(get_admin_user)
 ):
-    """Get a specific test by ID with its results."""
+    """
+    Get a specific test by ID with all of its results, including full responses.
+    
+    This payload grows with the test size; the admin page uses the summary and
+    paginated results endpoints instead.
+    """
     test = db.query(Test).filter(Test.id == test_id).first()
     if not test:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Test not found"
         )
+    
+    # Results are fetched as plain rows: validating thousands of result models costs more than the query
+    columns = [
+        getattr(TestItem, field).label(field) if field in ITEM_FIELDS else getattr(TestResult, field)
+        for field in TestResultSchema.model_fields
+    ]
+    results = db.query(*columns).join(TestItem, TestResult.item_id == TestItem.id).filter(
+        TestResult.test_id == test_id
+    ).order_by(TestResult.id)
+    
+    content = TestWithSummaries.model_validate(test, from_attributes=True).model_dump(mode="json", exclude={"total_results"})
+    content["results"] = query_rows(results)
+    return json_response(content)
+
+@router.get("/{test_id}/summary", response_model=TestWithSummaries)
+async def get_test_summary(
+    test_id: int,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_admin_user)
+):
+    """Get a test with its summaries and progress, without loading any results."""
+    test = db.query(Test).filter(Test.id == test_id).first()
+    if not test:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Test not found"
+        )
+    
+    test.total_results = db.query(func.count(TestResult.id)).filter(TestResult.test_id == test_id).scalar()
     return test
 
+@router.get("/{test_id}/results", response_model=TestResultPage)
+async def get_test_results(
+    test_id: int,
+    after_id: int = 0,
+    limit: int = 100,
+    model_name: Optional[str] = None,
+    prompt_id: Optional[int] = None,
+    fields: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_admin_user)
+):
+    """
+    Get one page of a test's results, ordered by ID.
+    
+    Args:
+        after_id: Return results with an ID greater than this cursor (next_after_id of the previous page)
+        limit: Page size
+        model_name: Only return results of this model
+        prompt_id: Only return results of this prompt
+        fields: Comma-separated columns to return; full_response is only loaded when listed here
+        
+    Returns:
+        The page of results and the cursor of the next page, if any
+    """
+    if not db.query(Test.id).filter(Test.id == test_id).first():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Test not found"
+        )
+    
+    selected_fields = DEFAULT_RESULT_FIELDS
+    if fields:
+        selected_fields = [field.strip() for field in fields.split(",") if field.strip()]
+        unknown_fields = [field for field in selected_fields if field not in RESULT_FIELDS]
+        if unknown_fields:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown result fields: {', '.join(unknown_fields)}"
+            )
+    
+    limit = max(1, min(limit, MAX_RESULTS_PAGE_SIZE))
+    
+    # Only the selected columns are fetched, so large responses stay in the database unless asked for
+    columns = [TestResult.id] + [
+        getattr(TestItem, field).label(field) if field in ITEM_FIELDS else getattr(TestResult, field)
+        for field in selected_fields if field != "id"
+    ]
+    query = db.query(*columns).filter(TestResult.test_id == test_id, TestResult.id > after_id)
+    if any(field in ITEM_FIELDS for field in selected_fields):
+        query = query.join(TestItem, TestResult.item_id == TestItem.id)
+    if model_name is not None:
+        query = query.filter(TestResult.model_name == model_name)
+    if prompt_id is not None:
+        query = query.filter(TestResult.prompt_id == prompt_id)
+    rows = query.order_by(TestResult.id).limit(limit).all()
+    
+    results = query_rows(rows)
+    next_after_id = results[-1]["id"] if len(results) == limit else None
+    return json_response({"results": results, "next_after_id": next_after_id})
+
+@router.get("/{test_id}/progress")
+async def stream_test_progress(
+    test_id: int,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_admin_user)
+):
+    """
+    Stream lightweight progress events of a test run as newline-delimited JSON.
+    
+    The first event is a snapshot of every (model, prompt) pair. Runs owned by this process
+    then push an event per processed row with throughput, running accuracy and ETA; runs owned
+    by other workers get a fresh snapshot from the stored checkpoints every few seconds.
+    The stream ends once the test is no longer running; a pending test that no run was started
+    for gets its snapshot only.
+    """
+    test = db.query(Test).filter(Test.id == test_id).first()
+    if not test:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Test not found"
+        )
+    
+    async def progress_stream():
+        queue = test_progress_service.subscribe(test_id)
+        try:
+            snapshot = build_progress_snapshot(test_id)
+            yield json.dumps(snapshot) + "\n"
+            
+            while is_streamable(test_id, snapshot["status"]):
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=PROGRESS_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    snapshot = build_progress_snapshot(test_id)
+                    yield json.dumps(snapshot) + "\n"
+                    continue
+                
+                yield json.dumps(event) + "\n"
+                if event["type"] == "status":
+                    break
+        finally:
+            test_progress_service.unsubscribe(test_id, queue)
+    
+    return StreamingResponse(
+        progress_stream(),
+        media_type="application/x-ndjson"
+    )
+
+def is_streamable(test_id: int, test_status: str) -> bool:
+    """Whether a test has progress to stream: it is running, or this process is about to start its run."""
+    return test_status == TestStatus.RUNNING or (
+        test_status == TestStatus.PENDING and job_registry.is_running(test_job_key(test_id))
+    )
+
+def build_progress_snapshot(test_id: int) -> Dict[str, Any]:
+    """Progress of every pair of a test, live when the run belongs to this process."""
+    db = SessionLocal()
+    try:
+        test_status = db.query(Test.status).filter(Test.id == test_id).scalar()
+        
+        accuracies = {
+            (model_name, prompt_id): average_accuracy
+            for model_name, prompt_id, average_accuracy in db.query(
+                TestResult.model_name,
+                TestResult.prompt_id,
+                func.avg(TestResult.accuracy)
+            ).filter(
+                TestResult.test_id == test_id
+            ).group_by(TestResult.model_name, TestResult.prompt_id).all()
+        }
+        pairs = {
+            (progress.model_name, progress.prompt_id): {
+                "model_name": progress.model_name,
+                "prompt_id": progress.prompt_id,
+                "status": progress.status,
+                "rows_done": progress.rows_done,
+                "total_rows": progress.total_rows,
+                "rows_per_minute": None,
+                "tokens_per_second": None,
+                "accuracy": accuracies.get((progress.model_name, progress.prompt_id)),
+                "accuracy_lower": progress.accuracy_lower,
+                "accuracy_upper": progress.accuracy_upper,
+                "eta_seconds": None
+            }
+            for progress in db.query(TestProgress).filter(TestProgress.test_id == test_id).all()
+        }
+        
+        # Live figures replace the stored checkpoints when the run belongs to this process
+        for key, pair in (test_progress_service.get_pairs(test_id) or {}).items():
+            pairs[key] = pair.to_event()
+        
+        return {"type": "snapshot", "status": test_status, "pairs": list(pairs.values())}
+    finally:
+        db.close()
+
+@router.post("/{test_id}/metrics/recompute", response_model=List[TestSummarySchema])
+def recompute_test_metrics(
+    test_id: int,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_admin_user)
+):
+    """Recompute the summary metrics of a test from its stored results, without calling the LLM."""
+    db_test = db.query(Test.id, Test.archived_at).filter(Test.id == test_id).first()
+    if not db_test:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Test not found"
+        )
+    
+    if db_test.archived_at is not None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Test results are archived; its summaries are kept as they were"
+        )
+    
+    # Results stored before confidences were recorded get them from their stored response
+    last_id = 0
+    while True:
+        chunk = db.query(TestResult).options(undefer(TestResult.full_response)).filter(
+            TestResult.test_id == test_id,
+            TestResult.confidence.is_(None),
+            TestResult.id > last_id
+        ).order_by(TestResult.id).limit(MAX_RESULTS_PAGE_SIZE).all()
+        if not chunk:
+            break
+        for result in chunk:
+            _, result.confidence = ollama_service.extract_grade(result.full_response)
+        last_id = chunk[-1].id
+        db.commit()
+    
+    return MetricsService.summarize_test(db, test_id)
+
 @router.delete("/{test_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_test(
     test_id: int,
     db: Session = Depends(get_db),
     current_user = Depends(get_admin_user)
 ):
-    """Delete a test."""
+    """
+    Delete a test with its results.
+    
+    Responds 204 once the test is deleted, or 202 if it has so many results that they are
+    deleted in the background; the test then has the status "deleting" until it is gone.
+    """
     db_test = db.query(Test).filter(Test.id == test_id).first()
     if not db_test:
         raise HTTPException(
@@ -117,15 +396,18 @@ async def delete_test(
             detail="Test not found"
         )
     
-    db.delete(db_test)
-    db.commit()
+    # Stop a running test first so it does not keep generating for a deleted test
+    await job_registry.cancel_and_wait(test_job_key(test_id))
+    db.refresh(db_test)
+    
+    if not DeletionService.delete_test(db, db_test):
+        return Response(status_code=status.HTTP_202_ACCEPTED)
     return None
 
 @router.post("/{test_id}/upload")
 async def upload_test_data(
     test_id: int,
     file: UploadFile = File(...),
-    background_tasks: BackgroundTasks = BackgroundTasks(),
     db: Session = Depends(get_db),
     current_user = Depends(get_admin_user)
 ):
@@ -138,6 +420,18 @@ async def upload_test_data(
             detail="Test not found"
         )
     
+    if job_registry.is_running(test_job_key(test_id)):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Test is already running"
+        )
+    
+    if db_test.status == TestStatus.DELETING:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Test is being deleted"
+        )
+    
     # Check file extension
     if not file.filename.endswith('.csv'):
         raise HTTPException(
@@ -149,52 +443,196 @@ async def upload_test_data(
     contents = await file.read()
     
     try:
-        # Parse the CSV
-        df = pd.read_csv(io.StringIO(contents.decode('utf-8')))
-        
-        # Validate CSV columns
-        required_columns = ["Question", "Model Answer", "Student Answer", "Model Grade"]
-        for column in required_columns:
-            if column not in df.columns:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"CSV must contain column: {column}"
-                )
-        
-        # Update test status
-        db_test.status = TestStatus.RUNNING
-        db.commit()
-        
-        # Start processing in background
-        background_tasks.add_task(
-            process_test_data,
-            test_id=test_id,
-            df=df,
-            model_names=db_test.model_names,
-            prompt_ids=db_test.prompt_ids,
-            db=db
+        # Store the rows as a dataset; rows uploaded before are not stored again
+        rows = TestDatasetService.parse_csv(contents)
+        dataset = TestDatasetService.get_or_create_dataset(db, file.filename, rows)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error processing CSV file: {str(e)}"
+        )
+    
+    start_fresh_run(db, db_test, dataset.id)
+    return {"message": f"Test data uploaded and processing started for test ID {test_id}", "dataset_id": dataset.id}
+
+@router.post("/{test_id}/run")
+async def run_test(
+    test_id: int,
+    run: TestRun,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_admin_user)
+):
+    """Run a test from scratch on a stored dataset, without uploading it again."""
+    db_test = db.query(Test).filter(Test.id == test_id).first()
+    if not db_test:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Test not found"
+        )
+    
+    dataset_id = run.dataset_id if run.dataset_id is not None else db_test.dataset_id
+    if dataset_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Test has no dataset; pass a dataset_id or upload a CSV"
+        )
+    if not db.query(TestDataset.id).filter(TestDataset.id == dataset_id).first():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Test dataset not found"
+        )
+    
+    if job_registry.is_running(test_job_key(test_id)):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Test is already running"
         )
-        
-        return {"message": f"Test data uploaded and processing started for test ID {test_id}"}
     
-    except pd.errors.EmptyDataError:
+    if db_test.status == TestStatus.DELETING:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Test is being deleted"
+        )
+    
+    start_fresh_run(db, db_test, dataset_id)
+    return {"message": f"Processing started for test ID {test_id}", "dataset_id": dataset_id}
+
+@router.post("/{test_id}/resume")
+async def resume_test(
+    test_id: int,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_admin_user)
+):
+    """Resume an interrupted test run from its last checkpoint."""
+    db_test = db.query(Test).filter(Test.id == test_id).first()
+    if not db_test:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Test not found"
+        )
+    
+    if not db_test.dataset_id:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="The CSV file is empty"
+            detail="Test has no dataset to resume"
         )
-    except pd.errors.ParserError:
+    
+    if job_registry.is_running(test_job_key(test_id)):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Test is already running"
+        )
+    
+    if db_test.status == TestStatus.DELETING:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Test is being deleted"
+        )
+    
+    if db_test.status == TestStatus.COMPLETED:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Error parsing CSV file"
+            detail="Test has already completed"
         )
-    except Exception as e:
+    
+    if db_test.archived_at is not None:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error processing CSV file: {str(e)}"
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Test results are archived; run the test again instead"
+        )
+    
+    db_test.status = TestStatus.RUNNING
+    db.commit()
+    
+    start_test_run(test_id)
+    
+    return {"message": f"Processing resumed for test ID {test_id}"}
+
+@router.post("/{test_id}/cancel")
+async def cancel_test(
+    test_id: int,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_admin_user)
+):
+    """Cancel a running test, keeping the results produced so far."""
+    db_test = db.query(Test).filter(Test.id == test_id).first()
+    if not db_test:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Test not found"
+        )
+    
+    if db_test.status not in (TestStatus.PENDING, TestStatus.RUNNING):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Test is not running (status: {db_test.status})"
         )
+    
+    # Marking the test cancelled also stops runs owned by other workers at their next row
+    db_test.status = TestStatus.CANCELLED
+    db.commit()
+    
+    # Abort the in-flight request of a run owned by this process right away
+    await job_registry.cancel_and_wait(test_job_key(test_id))
+    
+    return {"message": f"Test ID {test_id} cancelled"}
 
-async def process_test_data(test_id: int, df: pd.DataFrame, model_names: List[str], prompt_ids: List[int], db: Session):
+def test_job_key(test_id: int):
+    """Key of a test run in the job registry."""
+    return ("test", test_id)
+
+def start_test_run(test_id: int) -> asyncio.Task:
+    """Start processing a test in the background of this process."""
+    return job_registry.start(test_job_key(test_id), process_test_data(test_id))
+
+def start_fresh_run(db: Session, db_test: Test, dataset_id: int) -> asyncio.Task:
+    """Discard the results of earlier runs and start the test on a dataset."""
+    db.query(TestResult).filter(TestResult.test_id == db_test.id).delete(synchronize_session=False)
+    db.query(TestSummary).filter(TestSummary.test_id == db_test.id).delete(synchronize_session=False)
+    db.query(TestProgress).filter(TestProgress.test_id == db_test.id).delete(synchronize_session=False)
+    
+    db_test.dataset_id = dataset_id
+    db_test.status = TestStatus.RUNNING
+    db_test.archived_at = None
+    db.commit()
+    
+    return start_test_run(db_test.id)
+
+def resume_interrupted_tests():
+    """
+    Resume every test left running, and every test or collection left deleting, by a previous
+    process, e.g. after a crash or restart.
+    """
+    db = SessionLocal()
+    try:
+        for (deleting_test_id,) in db.query(Test.id).filter(Test.status == TestStatus.DELETING):
+            DeletionService.start_background_delete(Test, deleting_test_id)
+        for (deleting_collection_id,) in db.query(Collection.id).filter(Collection.deleting.is_(True)):
+            DeletionService.start_background_delete(Collection, deleting_collection_id)
+        
+        tests = db.query(Test).filter(Test.status == TestStatus.RUNNING).all()
+        for test in tests:
+            if job_registry.is_running(test_job_key(test.id)):
+                continue
+            if not test.dataset_id:
+                # Runs started before checkpointing have nothing to resume from
+                test.status = TestStatus.FAILED
+                continue
+            logging.getLogger(__name__).info(f"Resuming interrupted test {test.id}")
+            start_test_run(test.id)
+        db.commit()
+    finally:
+        db.close()
+
+async def process_test_data(test_id: int):
     """Process test data with selected models and prompts."""
+    # The run outlives the request that started it, so it owns its own session
+    db = SessionLocal()
     try:
         # Fetch the test
         test = db.query(Test).filter(Test.id == test_id).first()
@@ -202,110 +640,277 @@ async def process_test_data(test_id: int, df: pd.DataFrame, model_names: List[st
             print(f"Test {test_id} not found")
             return
         
+        rows = TestDatasetService.load_rows(db, test.dataset) if test.dataset else []
+        
         # Fetch prompts
         prompts = {}
-        for prompt_id in prompt_ids:
+        for prompt_id in test.prompt_ids:
             prompt = db.query(Prompt).filter(Prompt.id == prompt_id).first()
             if prompt:
                 prompts[prompt_id] = prompt.prompt
         
-        for model_name in model_names:
-            for prompt_id, prompt_template in prompts.items():
-                await process_model_prompt_combination(
-                    test_id=test_id,
-                    model_name=model_name,
-                    prompt_id=prompt_id,
-                    prompt_template=prompt_template,
-                    df=df,
-                    db=db
-                )
+        if test.evaluation_mode == EvaluationMode.ADAPTIVE:
+            await race_model_prompt_combinations(test, rows, prompts, db)
+        else:
+            for model_name in test.model_names:
+                for prompt_id, prompt_template in prompts.items():
+                    progress = get_or_create_progress(db, test_id, model_name, prompt_id, len(rows))
+                    if progress.status == TestStatus.COMPLETED:
+                        continue
+                    
+                    await process_model_prompt_combination(
+                        test_id=test_id,
+                        model_name=model_name,
+                        prompt_id=prompt_id,
+                        prompt_template=prompt_template,
+                        rows=rows,
+                        progress=progress,
+                        db=db
+                    )
         
         # Update test status to completed
         test.status = TestStatus.COMPLETED
         db.commit()
+        test_progress_service.finish_test(test_id, TestStatus.COMPLETED)
+    
+    except (asyncio.CancelledError, TestCancelled) as e:
+        print(f"Test {test_id} cancelled")
+        test = db.query(Test).filter(Test.id == test_id).first()
+        if test:
+            test.status = TestStatus.CANCELLED
+            db.commit()
+        test_progress_service.finish_test(test_id, TestStatus.CANCELLED)
+        if isinstance(e, asyncio.CancelledError):
+            raise
     
     except Exception as e:
         print(f"Error processing test data: {str(e)}")
+        db.rollback()
         
-        # Update test status to failed
+        # Update test status to failed; committed batches are kept for a later resume
         test = db.query(Test).filter(Test.id == test_id).first()
         if test:
             test.status = TestStatus.FAILED
             db.commit()
+        test_progress_service.finish_test(test_id, TestStatus.FAILED)
+    finally:
+        db.close()
 
-async def process_model_prompt_combination(
-    test_id: int, 
-    model_name: str, 
-    prompt_id: int, 
-    prompt_template: str, 
-    df: pd.DataFrame, 
-    db: Session
-):
-    """Process test data for a specific model and prompt combination."""
-    results = []
-    total_accuracy = 0.0
-    total_response_time = 0.0
-    
-    service = OllamaService(model_name=model_name)
-    
-    for _, row in df.iterrows():
-        question = row["Question"]
-        model_answer = row["Model Answer"]
-        student_answer = row["Student Answer"]
-        model_grade = float(row["Model Grade"])
+async def race_model_prompt_combinations(test: Test, rows: List[Dict[str, Any]], prompts: Dict[int, str], db: Session):
+    """
+    Evaluate the pairs of an adaptive test in rounds, eliminating the ones that are clearly losing.
+    
+    Rows are visited in a random order fixed by the test's seed, so every prefix is an unbiased
+    sample and resumed runs continue the same order. Each round, every active pair processes one
+    checkpoint batch; afterwards pairs whose accuracy upper bound is below the leader's lower bound
+    stop, and only the remaining pairs go on.
+    """
+    order = list(range(len(rows)))
+    random.Random(test.random_seed).shuffle(order)
+    shuffled_rows = [rows[index] for index in order]
+    
+    pairs = {}
+    for model_name in test.model_names:
+        for prompt_id, prompt_template in prompts.items():
+            progress = get_or_create_progress(db, test.id, model_name, prompt_id, len(rows))
+            pairs[(model_name, prompt_id)] = (prompt_template, progress)
+    
+    while True:
+        active = [
+            pair for pair, (_, progress) in pairs.items()
+            if progress.status not in (TestStatus.COMPLETED, TestStatus.ELIMINATED)
+        ]
+        if not active:
+            return
         
-        # Format prompt using template
-        formatted_prompt = prompt_template.replace("{{question}}", question)
-        formatted_prompt = formatted_prompt.replace("{{model_answer}}", model_answer)
-        formatted_prompt = formatted_prompt.replace("{{student_answer}}", student_answer)
+        for model_name, prompt_id in active:
+            prompt_template, progress = pairs[(model_name, prompt_id)]
+            await process_model_prompt_combination(
+                test_id=test.id,
+                model_name=model_name,
+                prompt_id=prompt_id,
+                prompt_template=prompt_template,
+                rows=shuffled_rows,
+                progress=progress,
+                db=db,
+                max_rows=CHECKPOINT_BATCH_SIZE
+            )
         
-        start_time = time.time()
-        response = await service.generate_response(formatted_prompt)
-        response_time = time.time() - start_time
+        stats = {
+            (model_name, prompt_id): PairStatistics(count, accuracy_sum or 0.0, accuracy_square_sum or 0.0)
+            for model_name, prompt_id, count, accuracy_sum, accuracy_square_sum in db.query(
+                TestResult.model_name,
+                TestResult.prompt_id,
+                func.count(TestResult.id),
+                func.sum(TestResult.accuracy),
+                func.sum(TestResult.accuracy * TestResult.accuracy)
+            ).filter(
+                TestResult.test_id == test.id
+            ).group_by(TestResult.model_name, TestResult.prompt_id).all()
+        }
+        still_active = [pair for pair in active if pairs[pair][1].status == TestStatus.RUNNING]
+        eliminated, bounds = RacingService.select_eliminated(
+            stats, still_active, test.stopping_confidence, test.min_rows
+        )
         
-        # Extract grade from response
-        extracted_grade, _ = service.extract_grade(response)
+        for (model_name, prompt_id), (lower, upper) in bounds.items():
+            if (model_name, prompt_id) not in pairs:
+                continue
+            progress = pairs[(model_name, prompt_id)][1]
+            progress.accuracy_lower = lower
+            progress.accuracy_upper = upper
+            test_progress_service.set_bounds(test.id, model_name, prompt_id, lower, upper)
         
-        # Calculate accuracy (simple 1 - absolute difference)
-        accuracy = 1 - min(1.0, abs(extracted_grade - model_grade))
+        for model_name, prompt_id in eliminated:
+            logging.getLogger(__name__).info(f"Test {test.id}: eliminated {model_name} / prompt {prompt_id}")
+            pairs[(model_name, prompt_id)][1].status = TestStatus.ELIMINATED
+            test_progress_service.finish_pair(test.id, model_name, prompt_id, TestStatus.ELIMINATED)
+        db.commit()
         
-        # Store result
-        result = TestResult(
+        for model_name, prompt_id in eliminated:
+            write_summary(db, test.id, model_name, prompt_id)
+
+class TestCancelled(Exception):
+    """Raised inside a test run when the test was cancelled from another worker."""
+
+def is_test_cancelled(db: Session, test_id: int) -> bool:
+    """Check the stored status so cancellations made by other workers are seen."""
+    test_status = db.query(Test.status).filter(Test.id == test_id).scalar()
+    return test_status is None or test_status == TestStatus.CANCELLED
+
+def get_or_create_progress(db: Session, test_id: int, model_name: str, prompt_id: int, total_rows: int) -> TestProgress:
+    """Get the checkpoint for a model and prompt combination, creating it on first run."""
+    progress = db.query(TestProgress).filter(
+        TestProgress.test_id == test_id,
+        TestProgress.model_name == model_name,
+        TestProgress.prompt_id == prompt_id
+    ).first()
+    
+    if not progress:
+        progress = TestProgress(
             test_id=test_id,
             model_name=model_name,
             prompt_id=prompt_id,
-            question=question,
-            student_answer=student_answer,
-            model_answer=model_answer,
-            model_grade=model_grade,
-            extracted_grade=extracted_grade,
-            accuracy=accuracy,
-            response_time=response_time,
-            full_response=response
+            rows_done=0,
+            total_rows=total_rows,
+            status=TestStatus.PENDING
         )
-        
-        db.add(result)
-        results.append(result)
-        
-        total_accuracy += accuracy
-        total_response_time += response_time
+        db.add(progress)
+        db.commit()
+        db.refresh(progress)
     
-    # Commit all results
+    return progress
+
+async def process_model_prompt_combination(
+    test_id: int, 
+    model_name: str, 
+    prompt_id: int, 
+    prompt_template: str, 
+    rows: List[Dict[str, Any]], 
+    progress: TestProgress,
+    db: Session,
+    max_rows: Optional[int] = None
+):
+    """
+    Process test data for a specific model and prompt combination, resuming from its checkpoint.
+    
+    With max_rows, at most that many rows are processed and the pair stays running until its
+    last row is done, so adaptive tests can interleave pairs.
+    """
+    service = OllamaService(model_name=model_name, priority=GenerationPriority.BENCHMARK)
+    
+    progress.status = TestStatus.RUNNING
     db.commit()
     
-    # Create summary
-    if results:
-        average_accuracy = total_accuracy / len(results)
-        average_response_time = total_response_time / len(results)
-        
-        summary = TestSummary(
-            test_id=test_id,
-            model_name=model_name,
-            prompt_id=prompt_id,
-            average_accuracy=average_accuracy,
-            average_response_time=average_response_time,
-            total_questions=len(results)
+    if (model_name, prompt_id) not in (test_progress_service.get_pairs(test_id) or {}):
+        # Seed the live running accuracy with rows stored by earlier attempts
+        accuracy_sum, accuracy_count = db.query(
+            func.sum(TestResult.accuracy),
+            func.count(TestResult.id)
+        ).filter(
+            TestResult.test_id == test_id,
+            TestResult.model_name == model_name,
+            TestResult.prompt_id == prompt_id
+        ).one()
+        test_progress_service.start_pair(
+            test_id, model_name, prompt_id, progress.rows_done, progress.total_rows,
+            accuracy_sum or 0.0, accuracy_count
         )
+        if progress.accuracy_lower is not None:
+            test_progress_service.set_bounds(
+                test_id, model_name, prompt_id, progress.accuracy_lower, progress.accuracy_upper
+            )
+    
+    end = len(rows) if max_rows is None else progress.rows_done + max_rows
+    pending = 0
+    try:
+        for row in rows[progress.rows_done:end]:
+            if is_test_cancelled(db, test_id):
+                raise TestCancelled()
+            
+            question = row["question"]
+            model_answer = row["model_answer"]
+            student_answer = row["student_answer"]
+            model_grade = float(row["model_grade"])
+        
+            # Format prompt using template
+            formatted_prompt = prompt_template.replace("{{question}}", question)
+            formatted_prompt = formatted_prompt.replace("{{model_answer}}", model_answer)
+            formatted_prompt = formatted_prompt.replace("{{student_answer}}", student_answer)
+        
+            start_time = time.time()
+            response, stats = await service.generate_response_with_stats(formatted_prompt)
+            # Time spent queued behind interactive and bulk grading is not the model's
+            response_time = time.time() - start_time - stats.get("queue_duration", 0) / 1e9
+        
+            # Extract grade from response
+            extracted_grade, confidence = service.extract_grade(response)
+        
+            # Calculate accuracy (simple 1 - absolute difference)
+            accuracy = 1 - min(1.0, abs(extracted_grade - model_grade))
         
-        db.add(summary)
+            # Store result
+            db.add(TestResult(
+                test_id=test_id,
+                model_name=model_name,
+                prompt_id=prompt_id,
+                item_id=row["item_id"],
+                model_grade=model_grade,
+                extracted_grade=extracted_grade,
+                confidence=confidence,
+                extractor_version=service.extractor_version,
+                accuracy=accuracy,
+                response_time=response_time,
+                full_response=response
+            ))
+            pending += 1
+            test_progress_service.record_row(test_id, model_name, prompt_id, accuracy, stats)
+        
+            # Commit results together with the checkpoint so a crash loses at most one batch
+            if pending >= CHECKPOINT_BATCH_SIZE:
+                progress.rows_done += pending
+                db.commit()
+                pending = 0
+    except (asyncio.CancelledError, TestCancelled):
+        # Keep the rows generated before the cancellation, with a matching checkpoint
+        progress.rows_done += pending
+        progress.status = TestStatus.CANCELLED
+        db.commit()
+        test_progress_service.finish_pair(test_id, model_name, prompt_id, TestStatus.CANCELLED)
+        write_summary(db, test_id, model_name, prompt_id)
+        raise
+    
+    progress.rows_done += pending
+    if progress.rows_done < progress.total_rows:
         db.commit()
+        return
+    
+    progress.status = TestStatus.COMPLETED
+    db.commit()
+    test_progress_service.finish_pair(test_id, model_name, prompt_id, TestStatus.COMPLETED)
+    
+    write_summary(db, test_id, model_name, prompt_id)
+
+def write_summary(db: Session, test_id: int, model_name: str, prompt_id: int):
+    """Create the summary of a model and prompt combination from its stored results."""
+    MetricsService.summarize_test(db, test_id, model_name=model_name, prompt_id=prompt_id)
@@ -1,29 +1,34 @@
 from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from app.models.user import User
 from app.database.connection import get_db
+from app.auth.principal_cache import Principal, principal_cache
 
 SECRET_KEY = "your_secret_key"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
 # Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+@lru_cache(maxsize=None)
+def get_pwd_context():
+    """Password hashing context, created on first use so startup does not load passlib and its bcrypt backend."""
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 # OAuth2 token setup
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/login")
 
 def get_password_hash(password: str):
     """Hash the password using bcrypt."""
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
 
 def verify_password(plain_password: str, hashed_password: str):
     """Verify the password against its hash."""
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 def create_access_token(data: dict, expires_delta: timedelta = None, is_admin: bool = False):
     """Generate JWT token for authentication."""
@@ -40,7 +45,17 @@ def authenticate_user(db: Session, username: str, password: str):
     return user
 
 async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    """Decode JWT token and return the authenticated user."""
+    """
+    Decode JWT token and return the authenticated user.
+
+    The principal a token resolves to is cached until the token expires, so only the
+    first request with a token decodes it and looks its user up. The user is admin only
+    if the token was issued with the is_admin claim and the user is still an admin.
+    """
+    principal = principal_cache.get(token)
+    if principal is not None:
+        return principal
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -54,10 +69,12 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
     except JWTError:
         raise credentials_exception
     
-    user = db.query(User).filter(User.username == username).first()
+    user = db.query(User.id, User.username, User.isAdmin).filter(User.username == username).first()
     if user is None:
         raise credentials_exception
-    return user
+    principal = Principal(id=user.id, username=user.username, isAdmin=bool(payload.get("is_admin")) and bool(user.isAdmin))
+    principal_cache.put(token, principal, payload.get("exp", 0))
+    return principal
 
 async def get_current_active_user(current_user = Depends(get_current_user)):
     """Return the current authenticated user (if active)."""
@@ -0,0 +1,144 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Set, Tuple
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from app.models.user import User
+
+# Seconds a resolved token is trusted without looking its user up again; bounds staleness across workers
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", "60"))
+
+# Tokens kept in the cache; the least recently used are evicted first
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+
+# Session.info key of the usernames whose principals are dropped again once the session commits
+INVALIDATED_USERNAMES_KEY = "invalidated_principals"
+
+class Principal:
+    """The authenticated user of a request, detached from any database session."""
+
+    __slots__ = ("id", "username", "isAdmin")
+
+    def __init__(self, id: int, username: str, isAdmin: bool):
+        self.id = id
+        self.username = username
+        self.isAdmin = isAdmin
+
+
+class PrincipalCache:
+    """
+    Caches the principal each access token resolves to.
+
+    An entry lives until the token expires or for PRINCIPAL_CACHE_TTL, whichever is
+    sooner. Deleting a user, or changing their username or admin flag, drops the
+    entries of all their tokens in this process; other workers pick the change up
+    within the TTL.
+    """
+
+    def __init__(self, ttl: float = PRINCIPAL_CACHE_TTL, max_size: int = PRINCIPAL_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max(1, max_size)
+        self._entries: "OrderedDict[str, Tuple[Principal, float]]" = OrderedDict()
+        self._tokens: Dict[str, Set[str]] = {}
+        # Sync endpoints run in the threadpool, so users are invalidated from other threads
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[Principal]:
+        """The cached principal of a token, if its entry has not expired."""
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            principal, expires_at = entry
+            if time.monotonic() >= expires_at:
+                self._remove(token)
+                return None
+            self._entries.move_to_end(token)
+            return principal
+
+    def put(self, token: str, principal: Principal, token_expires_at: float):
+        """
+        Cache the principal of a token.
+
+        Args:
+            token: Encoded access token
+            principal: User the token resolved to
+            token_expires_at: Expiry of the token as a UNIX timestamp
+        """
+        lifetime = min(self.ttl, token_expires_at - time.time())
+        if lifetime <= 0:
+            return
+        with self._lock:
+            self._remove(token)
+            self._entries[token] = (principal, time.monotonic() + lifetime)
+            self._tokens.setdefault(principal.username, set()).add(token)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, username: str):
+        """Drop the cached principals of every token of a user."""
+        with self._lock:
+            for token in list(self._tokens.get(username, ())):
+                self._remove(token)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tokens.clear()
+
+    def _remove(self, token: str):
+        entry = self._entries.pop(token, None)
+        if entry is None:
+            return
+        username = entry[0].username
+        tokens = self._tokens.get(username)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens[username]
+
+
+# Shared principal cache of this process
+principal_cache = PrincipalCache()
+
+
+def _invalidate_user(target: User):
+    """
+    Drop the principals of a changed user now, and again once the change is committed.
+
+    The second pass discards a principal another request may have cached from the old
+    row between the flush and the commit.
+    """
+    usernames = {target.username}
+    usernames.update(inspect(target).attrs.username.history.deleted or ())
+    for username in usernames:
+        principal_cache.invalidate(username)
+
+    session = Session.object_session(target)
+    if session is not None:
+        session.info.setdefault(INVALIDATED_USERNAMES_KEY, set()).update(usernames)
+
+
+@event.listens_for(User, "after_delete")
+def _user_deleted(mapper, connection, target: User):
+    _invalidate_user(target)
+
+
+@event.listens_for(User, "after_update")
+def _user_updated(mapper, connection, target: User):
+    attrs = inspect(target).attrs
+    if attrs.isAdmin.history.has_changes() or attrs.username.history.has_changes():
+        _invalidate_user(target)
+
+
+@event.listens_for(Session, "after_commit")
+def _session_committed(session: Session):
+    for username in session.info.pop(INVALIDATED_USERNAMES_KEY, ()):
+        principal_cache.invalidate(username)
+
+
+@event.listens_for(Session, "after_rollback")
+def _session_rolled_back(session: Session):
+    session.info.pop(INVALIDATED_USERNAMES_KEY, None)
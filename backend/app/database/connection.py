@@ -1,8 +1,9 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from app.models.base import Base
 import os
 from pathlib import Path
+import logging
 from dotenv import load_dotenv
 
 # Calculate the project root dynamically
@@ -16,9 +17,15 @@ else:
 
 
 DATABASE_URL = os.getenv("DATABASE_URL")
-print("Using DATABASE_URL:", DATABASE_URL)
 
 engine = create_engine(DATABASE_URL)
+logging.getLogger(__name__).info(f"Using database {engine.url.render_as_string(hide_password=True)}")
+
+if engine.dialect.name == "sqlite":
+    @event.listens_for(engine, "connect")
+    def enable_foreign_keys(dbapi_connection, connection_record):
+        # SQLite only enforces foreign keys, and with them ON DELETE CASCADE, when enabled per connection
+        dbapi_connection.execute("PRAGMA foreign_keys=ON")
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
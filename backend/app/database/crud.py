@@ -1,5 +1,5 @@
 # app/database/crud.py
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, undefer_group
 from app.models.user import User
 from app.models.collection import Collection
 from app.models.student import Student
@@ -11,8 +11,10 @@ from app.schemas.collection_schema import CollectionCreate, CollectionResponse,
 from app.schemas.student_schema import StudentCreate, StudentResponse, StudentListResponse, StudentDeleteResponse
 from app.schemas.question_schema import QuestionCreate, QuestionResponse, QuestionListResponse, QuestionDeleteResponse
 from app.schemas.student_answer_schema import StudentAnswerCreate, StudentAnswerResponse, StudentAnswerListResponse, StudentAnswerDeleteResponse
-from app.schemas.llm_response_schema import LLMResponseCreate, LLMResponseResponse, LLMResponseListResponse
+from app.schemas.llm_response_schema import GradeProvenance, LLMResponseCreate, LLMResponseResponse, LLMResponseListResponse
 from app.auth.auth import get_password_hash 
+from app.services.deletion_service import DeletionService
+from app.services.json_rows import query_rows, schema_columns
 
 """
 User Database Functions
@@ -72,32 +74,18 @@ def create_collection(db: Session, collection: CollectionCreate) -> CollectionRe
     db.refresh(db_collection)
     return CollectionResponse.model_validate(db_collection)
 
-def get_all_collections(db: Session) -> CollectionListResponse:
-    collections = db.query(Collection).all()
-    return CollectionListResponse(collections=[
-        CollectionResponse(
-            id=col.id, 
-            name=col.name, 
-            description=col.description, 
-            user_id=col.user_id,
-            combination_id=col.combination_id
-        ) for col in collections
-    ])
+def get_all_collections(db: Session) -> dict:
+    """List all collections as plain rows shaped like CollectionListResponse."""
+    collections = db.query(*schema_columns(Collection, CollectionResponse))
+    return {"collections": query_rows(collections)}
 
-def get_collections(db: Session, user_id: int) -> CollectionListResponse:
+def get_collections(db: Session, user_id: int) -> dict:
+    """List the collections of a user as plain rows shaped like CollectionListResponse."""
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise ValueError(f"User {user_id} not found") 
-    collections = db.query(Collection).where(Collection.user_id == user_id).all()
-    return CollectionListResponse(collections=[
-        CollectionResponse(
-            id=col.id, 
-            name=col.name, 
-            description=col.description, 
-            user_id=col.user_id,
-            combination_id=col.combination_id
-        ) for col in collections
-    ])
+    collections = db.query(*schema_columns(Collection, CollectionResponse)).where(Collection.user_id == user_id)
+    return {"collections": query_rows(collections)}
 
 def get_collection(db: Session, user_id: int, collection_id: int) -> CollectionResponse:
     user = db.query(User).filter(User.id == user_id).first()
@@ -116,9 +104,9 @@ def delete_collection(db: Session, user_id: int, collection_id: int) -> Collecti
     collection = db.query(Collection).filter(Collection.user_id == user_id, Collection.id == collection_id).first()
     if not collection:
         raise ValueError(f"Collection {collection_id} not found") 
-    db.delete(collection)
-    db.commit()
-    return UserDeleteResponse(message=f"Collection {collection_id} for User {user_id} deleted successfully")
+    if not DeletionService.delete_collection(db, collection):
+        return CollectionDeleteResponse(message=f"Collection {collection_id} for User {user_id} is being deleted in the background")
+    return CollectionDeleteResponse(message=f"Collection {collection_id} for User {user_id} deleted successfully")
     
 def update_collection(db: Session, user_id: int, collection_id: int, new_collection: CollectionCreate) -> Collection:
     user = db.query(User).filter(User.id == user_id).first()
@@ -138,6 +126,8 @@ def create_student(db: Session, student: StudentCreate) -> StudentResponse:
     collection = db.query(Collection).filter(Collection.id == student.collection_id).first()
     if not collection:
         raise ValueError(f"Collection {student.collection_id} not found")
+    if collection.deleting:
+        raise ValueError(f"Collection {student.collection_id} is being deleted")
     
     db_student = Student(
         name=student.name,
@@ -149,9 +139,10 @@ def create_student(db: Session, student: StudentCreate) -> StudentResponse:
     db.refresh(db_student)
     return StudentResponse.model_validate(db_student)
 
-def get_students_by_collection(db: Session, collection_id: int) -> StudentListResponse:
-    students = db.query(Student).filter(Student.collection_id == collection_id).all()
-    return StudentListResponse(students=[StudentResponse.model_validate(s) for s in students])
+def get_students_by_collection(db: Session, collection_id: int) -> dict:
+    """List the students of a collection as plain rows shaped like StudentListResponse."""
+    students = db.query(*schema_columns(Student, StudentResponse)).filter(Student.collection_id == collection_id)
+    return {"students": query_rows(students)}
 
 def get_student(db: Session, student_id: int) -> StudentResponse:
     student = db.query(Student).filter(Student.id == student_id).first()
@@ -186,6 +177,8 @@ def create_question(db: Session, question: QuestionCreate) -> QuestionResponse:
     collection = db.query(Collection).filter(Collection.id == question.collection_id).first()
     if not collection:
         raise ValueError(f"Collection {question.collection_id} not found")
+    if collection.deleting:
+        raise ValueError(f"Collection {question.collection_id} is being deleted")
     
     db_question = Question(
         text=question.text,
@@ -238,6 +231,8 @@ def create_student_answer(db: Session, student_answer: StudentAnswerCreate) -> S
     question = db.query(Question).filter(Question.id == student_answer.question_id).first()
     if not question:
         raise ValueError(f"Question {student_answer.question_id} not found")
+    if question.collection.deleting:
+        raise ValueError(f"Collection {question.collection_id} is being deleted")
     
     db_student_answer = StudentAnswer(
         answer=student_answer.answer,
@@ -249,13 +244,15 @@ def create_student_answer(db: Session, student_answer: StudentAnswerCreate) -> S
     db.refresh(db_student_answer)
     return StudentAnswerResponse.model_validate(db_student_answer)
 
-def get_student_answers_by_student(db: Session, student_id: int) -> StudentAnswerListResponse:
-    student_answers = db.query(StudentAnswer).filter(StudentAnswer.student_id == student_id).all()
-    return StudentAnswerListResponse(student_answers=[StudentAnswerResponse.model_validate(sa) for sa in student_answers])
+def get_student_answers_by_student(db: Session, student_id: int) -> dict:
+    """List the answers of a student as plain rows shaped like StudentAnswerListResponse."""
+    student_answers = db.query(*schema_columns(StudentAnswer, StudentAnswerResponse)).filter(StudentAnswer.student_id == student_id)
+    return {"student_answers": query_rows(student_answers)}
 
-def get_student_answers_by_question(db: Session, question_id: int) -> StudentAnswerListResponse:
-    student_answers = db.query(StudentAnswer).filter(StudentAnswer.question_id == question_id).all()
-    return StudentAnswerListResponse(student_answers=[StudentAnswerResponse.model_validate(sa) for sa in student_answers])
+def get_student_answers_by_question(db: Session, question_id: int) -> dict:
+    """List the answers to a question as plain rows shaped like StudentAnswerListResponse."""
+    student_answers = db.query(*schema_columns(StudentAnswer, StudentAnswerResponse)).filter(StudentAnswer.question_id == question_id)
+    return {"student_answers": query_rows(student_answers)}
 
 def get_student_answer(db: Session, student_answer_id: int) -> StudentAnswerResponse:
     student_answer = db.query(StudentAnswer).filter(StudentAnswer.id == student_answer_id).first()
@@ -295,7 +292,20 @@ def create_llm_response(db: Session, llm_response: LLMResponseCreate) -> LLMResp
         raw_response=llm_response.raw_response,
         grade=llm_response.grade,
         feedback=llm_response.feedback,
-        student_answer_id=llm_response.student_answer_id
+        student_answer_id=llm_response.student_answer_id,
+        extractor_version=llm_response.extractor_version,
+        model_name=llm_response.model_name,
+        confidence=llm_response.confidence,
+        combination_id=llm_response.combination_id,
+        escalated=llm_response.escalated,
+        escalation_path=llm_response.escalation_path,
+        grading_mode=llm_response.grading_mode,
+        provenance=llm_response.provenance or GradeProvenance.LLM,
+        cluster_representative_id=llm_response.cluster_representative_id,
+        cluster_similarity=llm_response.cluster_similarity,
+        combination_version=llm_response.combination_version,
+        model_digest=llm_response.model_digest,
+        prompt_hash=llm_response.prompt_hash
     )
     db.add(db_llm_response)
     db.commit()
@@ -303,11 +313,13 @@ def create_llm_response(db: Session, llm_response: LLMResponseCreate) -> LLMResp
     return LLMResponseResponse.model_validate(db_llm_response)
 
 def get_llm_responses_by_student_answer(db: Session, student_answer_id: int) -> LLMResponseListResponse:
-    llm_responses = db.query(LLMResponse).filter(LLMResponse.student_answer_id == student_answer_id).all()
+    llm_responses = db.query(LLMResponse).options(undefer_group("llm_output")).filter(
+        LLMResponse.student_answer_id == student_answer_id
+    ).all()
     return LLMResponseListResponse(llm_responses=[LLMResponseResponse.model_validate(lr) for lr in llm_responses])
 
 def get_latest_llm_response_by_student_answer(db: Session, student_answer_id: int) -> LLMResponseResponse:
-    llm_response = db.query(LLMResponse).filter(
+    llm_response = db.query(LLMResponse).options(undefer_group("llm_output")).filter(
         LLMResponse.student_answer_id == student_answer_id
     ).order_by(LLMResponse.timestamp.desc()).first()
     
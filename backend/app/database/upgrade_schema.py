@@ -0,0 +1,260 @@
+"""
+Bring a database created by an older version of the app up to date with the models.
+
+init_db (create_all) only creates the tables that are missing; it never changes a table
+that exists. This script applies every other schema change, in order, and can be run
+again safely:
+
+1. Missing tables are created.
+2. Columns added to existing tables are added with their default, so rows written before
+   get it.
+3. Test results used to store their question, model answer and student answer themselves;
+   their rows become the test items of one dataset per test, each result is pointed to its
+   item and the old text columns are dropped.
+4. Foreign keys whose ON DELETE action differs from the model's, such as
+   test_results.test_id from before tests deleted their results with ON DELETE CASCADE, are
+   dropped and created again. SQLite cannot alter a constraint in place; a SQLite database
+   with such foreign keys must be recreated.
+5. Missing indexes of existing tables are created.
+6. llm_responses.raw_response, llm_responses.feedback and test_results.full_response used to
+   be TEXT columns; CompressedText stores them as binary values that start with a codec and
+   dictionary header. On PostgreSQL every one of these columns still of type text is
+   converted to bytea in place, each value prefixed with the header of an uncompressed value
+   so it stays readable. SQLite keeps the strings written before as they are and
+   CompressedText reads them as such.
+7. The values written before their column was compressed are compressed, in chunks by ID.
+
+Run it once after upgrading, with the app stopped, from the backend directory:
+    python -m app.database.upgrade_schema
+"""
+import logging
+import sys
+from typing import Dict, List
+from sqlalchemy import LargeBinary, MetaData, Table, bindparam, inspect, literal, select, text, type_coerce, update
+from app.database.connection import SessionLocal, engine, init_db
+from app.models import Base, combination, prompt, test  # noqa: F401 (registers every table for init_db)
+from app.models.compressed_text import CODEC_IDS, COMPRESSION_MIN_BYTES, VALUE_HEADER, Codec, compression_store
+from app.models.test import Test
+from app.services.compression_service import COMPRESSED_COLUMNS, COMPRESSION_CHUNK_SIZE
+from app.services.test_dataset_service import TestDatasetService
+
+# Header of a value stored uncompressed, without a dictionary
+RAW_HEADER = VALUE_HEADER.pack(CODEC_IDS[Codec.RAW], 0)
+
+# Answer texts test results stored before they moved to the shared test items
+LEGACY_TEST_RESULT_COLUMNS = ("question", "model_answer", "student_answer")
+
+def add_missing_columns() -> List:
+    """
+    Add the model columns missing from existing tables.
+
+    Returns:
+        The added columns that are NOT NULL without a default; they are added nullable, to be backfilled
+    """
+    logger = logging.getLogger(__name__)
+    inspector = inspect(engine)
+    backfilled = []
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            stored_columns = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in stored_columns:
+                    continue
+
+                definition = f"{column.name} {column.type.compile(dialect=engine.dialect)}"
+                if column.default is not None and column.default.is_scalar:
+                    value = literal(column.default.arg, column.type).compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True})
+                    definition += f" DEFAULT {value}"
+                    if not column.nullable:
+                        definition += " NOT NULL"
+                elif not column.nullable:
+                    backfilled.append(column)
+                for foreign_key in column.foreign_keys:
+                    definition += f" REFERENCES {foreign_key.column.table.name} ({foreign_key.column.name})"
+                    if foreign_key.ondelete:
+                        definition += f" ON DELETE {foreign_key.ondelete}"
+
+                connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {definition}"))
+                logger.info(f"Added column {table.name}.{column.name}")
+    return backfilled
+
+def move_test_results_to_items():
+    """Store the answer texts of old test results as test items, one dataset per test, and drop them from the results."""
+    logger = logging.getLogger(__name__)
+    results = Table("test_results", MetaData(), autoload_with=engine)
+    if not all(name in results.c for name in LEGACY_TEST_RESULT_COLUMNS):
+        return
+
+    db = SessionLocal()
+    try:
+        test_ids = [row.test_id for row in db.execute(
+            select(results.c.test_id).where(results.c.item_id.is_(None)).distinct().order_by(results.c.test_id)
+        )]
+        for test_id in test_ids:
+            rows = db.execute(
+                select(results.c.id, results.c.question, results.c.model_answer, results.c.student_answer, results.c.model_grade)
+                .where(results.c.test_id == test_id).order_by(results.c.id)
+            ).all()
+
+            # The rows of the test in the order they were first graded; every pair graded the same rows
+            unique_rows: Dict[str, Dict] = {}
+            result_hashes = []
+            for row in rows:
+                item = {
+                    "question": row.question,
+                    "model_answer": row.model_answer,
+                    "student_answer": row.student_answer,
+                    "model_grade": row.model_grade
+                }
+                row_hash = TestDatasetService.hash_row(item)
+                unique_rows.setdefault(row_hash, item)
+                result_hashes.append(row_hash)
+
+            test = db.query(Test).filter(Test.id == test_id).first()
+            dataset = TestDatasetService.get_or_create_dataset(db, test.name if test else f"Test {test_id}", list(unique_rows.values()))
+            item_ids = dict(zip(unique_rows, dataset.item_ids))
+
+            db.execute(
+                update(results).where(results.c.id == bindparam("result_id")).values(item_id=bindparam("new_item_id")),
+                [{"result_id": row.id, "new_item_id": item_ids[row_hash]} for row, row_hash in zip(rows, result_hashes)]
+            )
+            if test and test.dataset_id is None:
+                test.dataset_id = dataset.id
+            db.commit()
+            logger.info(f"Moved the {len(unique_rows)} rows of test {test_id} to dataset {dataset.id}")
+    finally:
+        db.close()
+
+    with engine.begin() as connection:
+        for name in LEGACY_TEST_RESULT_COLUMNS:
+            connection.execute(text(f"ALTER TABLE test_results DROP COLUMN {name}"))
+    logger.info(f"Dropped test_results.{', test_results.'.join(LEGACY_TEST_RESULT_COLUMNS)}")
+
+def require_backfilled_columns(columns: List):
+    """Make the backfilled columns NOT NULL, as in the models; SQLite cannot, and keeps them nullable."""
+    if engine.dialect.name != "postgresql":
+        return
+    with engine.begin() as connection:
+        for column in columns:
+            connection.execute(text(f"ALTER TABLE {column.table.name} ALTER COLUMN {column.name} SET NOT NULL"))
+
+def rebuild_foreign_keys():
+    """Recreate the foreign keys whose ON DELETE action differs from the model's; PostgreSQL only."""
+    logger = logging.getLogger(__name__)
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            stored_keys = stored_foreign_keys(connection, inspector, table.name)
+            for constraint in table.foreign_key_constraints:
+                columns = [column.name for column in constraint.columns]
+                ondelete = (constraint.ondelete or "NO ACTION").upper()
+                stored = next((key for key in stored_keys if key["constrained_columns"] == columns), None)
+                if stored is None or (stored["options"].get("ondelete") or "NO ACTION").upper() == ondelete:
+                    continue
+                if engine.dialect.name != "postgresql":
+                    logger.warning(f"Foreign key {table.name}({', '.join(columns)}) lacks ON DELETE {ondelete}; "
+                                   f"{engine.dialect.name} cannot alter it, recreate the database")
+                    continue
+
+                referred = constraint.elements[0].column.table.name
+                referred_columns = [element.column.name for element in constraint.elements]
+                connection.execute(text(f'ALTER TABLE {table.name} DROP CONSTRAINT "{stored["name"]}"'))
+                connection.execute(text(
+                    f'ALTER TABLE {table.name} ADD CONSTRAINT "{stored["name"]}" FOREIGN KEY ({", ".join(columns)}) '
+                    f'REFERENCES {referred} ({", ".join(referred_columns)}) ON DELETE {ondelete}'
+                ))
+                logger.info(f"Recreated foreign key {table.name}({', '.join(columns)}) with ON DELETE {ondelete}")
+
+def create_missing_indexes():
+    """Create the model indexes missing from existing tables."""
+    logger = logging.getLogger(__name__)
+    inspector = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        stored_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in stored_indexes:
+                index.create(engine)
+                logger.info(f"Created index {index.name}")
+
+def stored_foreign_keys(connection, inspector, table_name: str) -> List[Dict]:
+    """Foreign keys of a table as the inspector lists them."""
+    if engine.dialect.name != "sqlite":
+        return inspector.get_foreign_keys(table_name)
+    # The SQLite inspector misses the ON DELETE action of columns added by ALTER TABLE; the pragma has it
+    keys: Dict[int, Dict] = {}
+    for row in connection.execute(text(f"PRAGMA foreign_key_list({table_name})")).mappings():
+        key = keys.setdefault(row["id"], {"name": None, "constrained_columns": [], "options": {"ondelete": row["on_delete"]}})
+        key["constrained_columns"].append(row["from"])
+    return list(keys.values())
+
+def convert_text_columns():
+    """Change the compressed columns still of type text to bytea; PostgreSQL only."""
+    logger = logging.getLogger(__name__)
+    if engine.dialect.name != "postgresql":
+        return
+
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for column in COMPRESSED_COLUMNS:
+            table = column.class_.__tablename__
+            stored_type = next(stored["type"] for stored in inspector.get_columns(table) if stored["name"] == column.key)
+            if isinstance(stored_type, LargeBinary):
+                continue
+            connection.execute(text(
+                f"ALTER TABLE {table} ALTER COLUMN {column.key} TYPE bytea "
+                f"USING '\\x{RAW_HEADER.hex()}'::bytea || convert_to({column.key}, 'UTF8')"
+            ))
+            logger.info(f"Converted {table}.{column.key} from {stored_type} to bytea")
+
+def compress_legacy_values():
+    """Compress the values written before their column was compressed."""
+    logger = logging.getLogger(__name__)
+    db = SessionLocal()
+    try:
+        for column in COMPRESSED_COLUMNS:
+            model = column.class_
+            query = db.query(model.id, type_coerce(column, LargeBinary).label("stored")).filter(column.isnot(None))
+            compressed = 0
+            last_id = 0
+            while True:
+                chunk = query.filter(model.id > last_id).order_by(model.id).limit(COMPRESSION_CHUNK_SIZE).all()
+                if not chunk:
+                    break
+                last_id = chunk[-1].id
+
+                # Strings left by SQLite, and the values the conversion stored uncompressed
+                updates = [
+                    {"id": row.id, column.key: compression_store.decode(row.stored)}
+                    for row in chunk
+                    if isinstance(row.stored, str)
+                    or (bytes(row.stored[:VALUE_HEADER.size]) == RAW_HEADER and len(row.stored) >= VALUE_HEADER.size + COMPRESSION_MIN_BYTES)
+                ]
+                if updates:
+                    db.execute(update(model), updates)
+                    db.commit()
+                compressed += len(updates)
+            logger.info(f"Compressed {compressed} legacy values of {model.__tablename__}.{column.key}")
+    finally:
+        db.close()
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    init_db()  # Missing tables only
+    backfilled = add_missing_columns()
+    move_test_results_to_items()
+    require_backfilled_columns(backfilled)
+    rebuild_foreign_keys()
+    create_missing_indexes()
+    convert_text_columns()
+    compress_legacy_values()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
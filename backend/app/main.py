@@ -1,9 +1,20 @@
 import sys
 from pathlib import Path
 # app/main.py
+import logging
+import os
+import time
+
+# Startup profile mode: log how long importing the app and each startup step took
+STARTUP_PROFILE = os.getenv("STARTUP_PROFILE", "false").lower() == "true"
+if STARTUP_PROFILE:
+    logging.basicConfig(level=logging.INFO)
+_imports_started_at = time.perf_counter()
+
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-import os
+from fastapi.middleware.gzip import GZipMiddleware
+from starlette.middleware.gzip import DEFAULT_EXCLUDED_CONTENT_TYPES
 from app.services.ollama_service import OllamaService
 from app.api.users import router as users_router
 from app.api.login import router as login_router
@@ -13,9 +24,22 @@ from app.api.students import router as students_router
 from app.api.questions import router as questions_router
 from app.api.student_answers import router as student_answers_router
 from app.api.prompts import router as prompts_router
-from app.api.tests import router as tests_router
+from app.api.tests import router as tests_router, resume_interrupted_tests
+from app.api.test_datasets import router as test_datasets_router
+from app.api.grading_batches import router as grading_batches_router, resume_interrupted_grading_batches
+from app.api.reextraction import router as reextraction_router, resume_interrupted_reextractions
+from app.api.scheduler import router as scheduler_router
+from app.api.storage import router as storage_router
 from app.database.connection import init_db
 
+# Create missing tables and the default combination on startup; turn off once migrations manage the schema
+INIT_DB_ON_STARTUP = os.getenv("INIT_DB_ON_STARTUP", "true").lower() == "true"
+
+logger = logging.getLogger(__name__)
+if STARTUP_PROFILE:
+    logger.info(f"Startup profile: importing the app took {(time.perf_counter() - _imports_started_at) * 1000:.1f} ms; "
+                f"run `python -m benchmarks.profile_startup` for the cost of each import")
+
 app = FastAPI()
 
 # Add CORS middleware
@@ -27,21 +51,52 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress large JSON payloads such as test results; event and progress streams are left uncompressed
+app.add_middleware(
+    GZipMiddleware,
+    minimum_size=1000,
+    exclude_content_types=DEFAULT_EXCLUDED_CONTENT_TYPES + ("application/x-ndjson",)
+)
+
 @app.on_event("startup")
 async def startup_event():
-    init_db()
     """Initialize the database and create default combination if needed."""
+    started_at = time.perf_counter()
+    if INIT_DB_ON_STARTUP:
+        init_db()
+        log_startup_step("create_all", started_at)
+        
+        step_started_at = time.perf_counter()
+        seed_default_combination()
+        log_startup_step("seed default combination", step_started_at)
     
-    # Create default combination if none exists
-    from sqlalchemy.orm import Session
-    from app.database.connection import get_db
-    from app.models.combination import Combination
+    # Pick up test runs, grading batches and re-extractions that were interrupted by a crash or restart
+    if os.getenv("RESUME_TESTS_ON_STARTUP", "true").lower() == "true":
+        step_started_at = time.perf_counter()
+        resume_interrupted_tests()
+        resume_interrupted_grading_batches()
+        resume_interrupted_reextractions()
+        log_startup_step("resume interrupted jobs", step_started_at)
     
-    db = next(get_db())
-    combination_count = db.query(Combination).count()
+    log_startup_step("startup", started_at)
+
+def log_startup_step(step: str, started_at: float):
+    """Log the duration of a startup step in startup profile mode."""
+    if STARTUP_PROFILE:
+        logger.info(f"Startup profile: {step} took {(time.perf_counter() - started_at) * 1000:.1f} ms")
+
+def seed_default_combination():
+    """Create the default combination if no combination exists."""
+    from app.database.connection import SessionLocal
+    from app.models.combination import Combination
     
-    # Default prompt template for grading
-    DEFAULT_PROMPT = """Question: {{question}}
+    db = SessionLocal()
+    try:
+        if db.query(Combination.id).first() is not None:
+            return
+        
+        # Default prompt template for grading
+        DEFAULT_PROMPT = """Question: {{question}}
 
 Correct Answer: {{model_answer}}
 
@@ -49,8 +104,7 @@ Student's Answer: {{student_answer}}
 
 Grade the student's answer based on the correct answer from (0.0 - 1.0). 
 Provide a brief explanation for your grade."""
-    
-    if combination_count == 0:
+        
         # Create default combination
         default_combination = Combination(
             name="Default Grading Pair",
@@ -61,7 +115,9 @@ Provide a brief explanation for your grade."""
         
         db.add(default_combination)
         db.commit()
-        print("Created default combination with gemma3:4b model")
+        logger.info("Created default combination with gemma3:4b model")
+    finally:
+        db.close()
 
 # Include the model router
 # app.include_router(model_router.router, prefix="/api/model", tags=["model"])
@@ -95,3 +151,8 @@ app.include_router(questions_router, prefix="/api")
 app.include_router(student_answers_router, prefix="/api")
 app.include_router(prompts_router, prefix="/api")
 app.include_router(tests_router, prefix="/api")
+app.include_router(test_datasets_router, prefix="/api")
+app.include_router(grading_batches_router, prefix="/api")
+app.include_router(reextraction_router, prefix="/api")
+app.include_router(scheduler_router, prefix="/api")
+app.include_router(storage_router, prefix="/api")
@@ -5,3 +5,7 @@ from .student import Student
 from .question import Question
 from .student_answer import StudentAnswer
 from .llm_response import LLMResponse
+from .grading_batch import GradingBatch
+from .answer_embedding import AnswerEmbedding
+from .compression_dictionary import CompressionDictionary
+from .reextraction_job import ReextractionJob
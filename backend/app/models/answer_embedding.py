@@ -0,0 +1,14 @@
+# app/models/answer_embedding.py
+from sqlalchemy import Column, Integer, String, DateTime, LargeBinary, UniqueConstraint
+import datetime
+from .base import Base
+
+class AnswerEmbedding(Base):
+    __tablename__ = "answer_embeddings"
+    __table_args__ = (UniqueConstraint("model_name", "content_hash", name="uq_answer_embeddings_model_hash"),)
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    model_name = Column(String, nullable=False)  # Embedding model that produced the vector
+    content_hash = Column(String(64), nullable=False)  # SHA-256 of the embedded text
+    dimension = Column(Integer, nullable=False)
+    vector = Column(LargeBinary, nullable=False)  # Unit-normalized float32 values
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
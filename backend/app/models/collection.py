@@ -1,5 +1,5 @@
 # app/models/collection.py
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, ForeignKey, Boolean
 from sqlalchemy.orm import relationship
 from .base import Base
 
@@ -10,9 +10,10 @@ class Collection(Base):
     description = Column(String)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     combination_id = Column(Integer, ForeignKey("combinations.id", ondelete="SET NULL"), nullable=True)
+    deleting = Column(Boolean, default=False)  # Set while a background delete empties the collection
 
     # Define relationships
     owner = relationship("User", back_populates="collections")
-    students = relationship("Student", back_populates="collection", cascade="all, delete")
-    questions = relationship("Question", back_populates="collection", cascade="all, delete")
+    students = relationship("Student", back_populates="collection", cascade="all, delete", passive_deletes=True)
+    questions = relationship("Question", back_populates="collection", cascade="all, delete", passive_deletes=True)
     combination = relationship("Combination", back_populates="collections")
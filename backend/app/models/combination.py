@@ -1,5 +1,5 @@
 # app/models/combination.py
-from sqlalchemy import Column, Integer, String, Text, DateTime
+from sqlalchemy import Column, Integer, String, Text, DateTime, Float
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .base import Base
@@ -11,6 +11,13 @@ class Combination(Base):
     description = Column(Text, nullable=True)
     prompt = Column(Text, nullable=False)
     model_name = Column(String, nullable=False)
+    # Optional cascade: answers graded by model_name with low confidence or a grade inside the
+    # ambiguous band are graded again by cascade_model_name
+    cascade_model_name = Column(String, nullable=True)
+    cascade_band_low = Column(Float, nullable=True)
+    cascade_band_high = Column(Float, nullable=True)
+    grading_mode = Column(String, default="full")  # "full", or "grade_only" with feedback generated on request
+    version = Column(Integer, default=1, nullable=False)  # Bumped whenever a change can alter the grades
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
@@ -0,0 +1,194 @@
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+from typing import Dict, Optional, Tuple
+from sqlalchemy import LargeBinary, select
+from sqlalchemy.types import TypeDecorator
+
+try:
+    import zstandard
+except ImportError:  # Values are compressed with zlib instead, the dictionary serving as its preset dictionary
+    zstandard = None
+
+# Values shorter than this many UTF-8 bytes are stored uncompressed
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "64"))
+
+# zstd compression level; the zlib fallback uses it capped at 9
+COMPRESSION_LEVEL = int(os.getenv("COMPRESSION_LEVEL", "3"))
+
+# Seconds between checks for a dictionary trained by another worker
+COMPRESSION_DICTIONARY_REFRESH_SECONDS = float(os.getenv("COMPRESSION_DICTIONARY_REFRESH_SECONDS", "300"))
+
+# Codec and dictionary ID (0 for none) that precede every stored value
+VALUE_HEADER = struct.Struct(">BI")
+
+class Codec(str):
+    """Compression codec enum."""
+    RAW = "raw"
+    ZLIB = "zlib"
+    ZSTD = "zstd"
+
+CODEC_IDS = {Codec.RAW: 0, Codec.ZLIB: 1, Codec.ZSTD: 2}
+CODEC_NAMES = {codec_id: codec for codec, codec_id in CODEC_IDS.items()}
+
+def default_codec() -> str:
+    """Codec of new dictionaries and of values compressed without one."""
+    return Codec.ZSTD if zstandard is not None else Codec.ZLIB
+
+
+class CompressionStore:
+    """
+    Compresses and decompresses stored LLM outputs with the shared trained dictionaries.
+
+    Every value starts with its codec and the ID of the dictionary it was compressed with,
+    so values written with older dictionaries stay readable after a new one is trained.
+    Dictionaries are loaded from the compression_dictionaries table when first needed;
+    new values are compressed with the newest dictionary, checked for every
+    COMPRESSION_DICTIONARY_REFRESH_SECONDS so a dictionary trained by another worker is
+    picked up.
+    """
+
+    def __init__(self):
+        self._engine = None
+        self._dictionaries: Dict[int, Tuple[str, bytes]] = {}
+        self._current_id = 0
+        self._checked_at: Optional[float] = None
+        self._lock = threading.Lock()
+        # zstd compressors and decompressors must not be shared between threads
+        self._local = threading.local()
+
+    def bind(self, engine):
+        """Load dictionaries through another engine than the app's, and forget the loaded ones."""
+        with self._lock:
+            self._engine = engine
+            self._dictionaries.clear()
+            self._current_id = 0
+            self._checked_at = None
+            self._local = threading.local()
+
+    def activate(self, dictionary_id: int, codec: str, data: bytes):
+        """Compress new values with a dictionary that was just trained."""
+        with self._lock:
+            self._dictionaries[dictionary_id] = (codec, data)
+            self._current_id = dictionary_id
+            self._checked_at = time.monotonic()
+
+    def current_id(self) -> int:
+        """ID of the dictionary new values are compressed with, 0 if none was trained yet."""
+        now = time.monotonic()
+        if self._checked_at is None or now - self._checked_at > COMPRESSION_DICTIONARY_REFRESH_SECONDS:
+            with self._lock:
+                if self._checked_at is None or now - self._checked_at > COMPRESSION_DICTIONARY_REFRESH_SECONDS:
+                    self._checked_at = now
+                    latest = self._load(newest=True)
+                    if latest is not None:
+                        self._current_id = latest
+        return self._current_id
+
+    def encode(self, text: str) -> bytes:
+        data = text.encode("utf-8")
+        if len(data) >= COMPRESSION_MIN_BYTES:
+            dictionary_id = self.current_id()
+            codec, dictionary = self._dictionary(dictionary_id)
+            if codec == Codec.ZSTD:
+                compressed = self._zstd(dictionary_id, dictionary, compress=True).compress(data)
+            else:
+                compressor = zlib.compressobj(min(COMPRESSION_LEVEL, 9), zdict=dictionary) if dictionary \
+                    else zlib.compressobj(min(COMPRESSION_LEVEL, 9))
+                compressed = compressor.compress(data) + compressor.flush()
+            if len(compressed) < len(data):
+                return VALUE_HEADER.pack(CODEC_IDS[codec], dictionary_id) + compressed
+        return VALUE_HEADER.pack(CODEC_IDS[Codec.RAW], 0) + data
+
+    def decode(self, value) -> str:
+        if isinstance(value, str):
+            return value  # Written before the column was compressed
+        value = bytes(value)
+        codec_id, dictionary_id = VALUE_HEADER.unpack_from(value)
+        payload = value[VALUE_HEADER.size:]
+        codec = CODEC_NAMES[codec_id]
+        if codec == Codec.RAW:
+            return payload.decode("utf-8")
+
+        _, dictionary = self._dictionary(dictionary_id)
+        if codec == Codec.ZSTD:
+            if zstandard is None:
+                raise RuntimeError("The zstandard package is required to read values compressed with zstd")
+            data = self._zstd(dictionary_id, dictionary, compress=False).decompress(payload)
+        else:
+            decompressor = zlib.decompressobj(zdict=dictionary) if dictionary else zlib.decompressobj()
+            data = decompressor.decompress(payload) + decompressor.flush()
+        return data.decode("utf-8")
+
+    def is_current(self, value) -> bool:
+        """Whether a stored value is compressed with the current dictionary, or too small to compress."""
+        if value is None:
+            return True
+        if isinstance(value, str):
+            return False
+        codec_id, dictionary_id = VALUE_HEADER.unpack_from(bytes(value[:VALUE_HEADER.size]))
+        return codec_id == CODEC_IDS[Codec.RAW] or dictionary_id == self.current_id()
+
+    def _dictionary(self, dictionary_id: int) -> Tuple[str, Optional[bytes]]:
+        if dictionary_id == 0:
+            return default_codec(), None
+        if dictionary_id not in self._dictionaries:
+            with self._lock:
+                if dictionary_id not in self._dictionaries and self._load(dictionary_id=dictionary_id) is None:
+                    raise ValueError(f"Compression dictionary {dictionary_id} not found")
+        return self._dictionaries[dictionary_id]
+
+    def _zstd(self, dictionary_id: int, dictionary: Optional[bytes], compress: bool):
+        """This thread's zstd compressor or decompressor for a dictionary."""
+        cache = getattr(self._local, "compressors" if compress else "decompressors", None)
+        if cache is None:
+            cache = {}
+            setattr(self._local, "compressors" if compress else "decompressors", cache)
+        if dictionary_id not in cache:
+            dict_data = zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+            if compress:
+                cache[dictionary_id] = zstandard.ZstdCompressor(level=COMPRESSION_LEVEL, dict_data=dict_data)
+            else:
+                cache[dictionary_id] = zstandard.ZstdDecompressor(dict_data=dict_data)
+        return cache[dictionary_id]
+
+    def _load(self, dictionary_id: Optional[int] = None, newest: bool = False) -> Optional[int]:
+        """Load one dictionary, or the newest one this process can use; returns its ID. Holds the lock."""
+        from app.models.compression_dictionary import CompressionDictionary
+        if self._engine is None:
+            from app.database.connection import engine
+            self._engine = engine
+
+        query = select(CompressionDictionary.id, CompressionDictionary.codec, CompressionDictionary.data)
+        if newest:
+            usable = [Codec.ZSTD, Codec.ZLIB] if zstandard is not None else [Codec.ZLIB]
+            query = query.filter(CompressionDictionary.codec.in_(usable)).order_by(CompressionDictionary.id.desc()).limit(1)
+        else:
+            query = query.filter(CompressionDictionary.id == dictionary_id)
+        with self._engine.connect() as connection:
+            row = connection.execute(query).first()
+        if row is None:
+            return None
+        if row.id not in self._dictionaries:
+            self._dictionaries[row.id] = (row.codec, bytes(row.data))
+            logging.getLogger(__name__).info(f"Loaded {row.codec} compression dictionary {row.id}")
+        return row.id
+
+
+# Shared by all compressed columns
+compression_store = CompressionStore()
+
+
+class CompressedText(TypeDecorator):
+    """Text column stored compressed with the shared dictionaries; reads and writes plain strings."""
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else compression_store.encode(value)
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else compression_store.decode(value)
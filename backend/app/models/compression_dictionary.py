@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Integer, String, LargeBinary, DateTime
+import datetime
+from .base import Base
+
+class CompressionDictionary(Base):
+    """Dictionary trained on stored LLM outputs, shared by every value compressed with it."""
+    __tablename__ = "compression_dictionaries"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    codec = Column(String, nullable=False)  # "zstd", or "zlib" where zstandard is not installed
+    data = Column(LargeBinary, nullable=False)
+    sample_count = Column(Integer, nullable=False)  # Values the dictionary was trained on
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
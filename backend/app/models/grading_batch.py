@@ -0,0 +1,23 @@
+# app/models/grading_batch.py
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Boolean, Float
+from sqlalchemy.orm import relationship
+import datetime
+from .base import Base
+
+class GradingBatch(Base):
+    __tablename__ = "grading_batches"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    collection_id = Column(Integer, ForeignKey("collections.id", ondelete="CASCADE"), nullable=False)
+    only_ungraded = Column(Boolean, default=True)  # Skip answers that already have a grade
+    only_stale = Column(Boolean, default=False)  # Only regrade answers whose grade fingerprint is out of date
+    cluster_threshold = Column(Float, nullable=True)  # Grade one representative per cluster of similar answers; None grades every answer
+    status = Column(String, default="pending")
+    total_answers = Column(Integer, default=0)
+    graded_answers = Column(Integer, default=0)
+    failed_answers = Column(Integer, default=0)
+    propagated_answers = Column(Integer, default=0)  # Graded by copying their cluster representative's grade
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+    
+    # Define relationship
+    collection = relationship("Collection")
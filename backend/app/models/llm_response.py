@@ -1,17 +1,35 @@
 # app/models/llm_response.py
-from sqlalchemy import Column, Integer, String, ForeignKey, Text, Float, DateTime
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, ForeignKey, Float, DateTime, Boolean, JSON
+from sqlalchemy.orm import relationship, deferred
 import datetime
 from .base import Base
+from .compressed_text import CompressedText
 
 class LLMResponse(Base):
     __tablename__ = "llm_responses"
     id = Column(Integer, primary_key=True, autoincrement=True)
-    raw_response = Column(Text)  # Full LLM response text
+    # Large LLM outputs, stored compressed and only loaded when requested (undefer_group("llm_output"))
+    raw_response = deferred(Column(CompressedText), group="llm_output")  # Full LLM response text
     grade = Column(Float)  # Extracted numerical grade (0.0-1.0)
-    feedback = Column(Text)  # Optional extracted feedback
+    feedback = deferred(Column(CompressedText), group="llm_output")  # Optional extracted feedback
+    extractor_version = Column(String, nullable=True)  # Extractor that produced grade and feedback
+    model_name = Column(String, nullable=True)  # Model that produced the final grade
+    confidence = Column(String, nullable=True)  # Extraction confidence of the final grade
+    combination_id = Column(Integer, ForeignKey("combinations.id", ondelete="SET NULL"), nullable=True)
+    escalated = Column(Boolean, default=False)  # Graded again by the combination's cascade model
+    escalation_path = Column(JSON, nullable=True)  # Every grading step: model, grade, confidence, response time
+    grading_mode = Column(String, default="full")  # In "grade_only" mode feedback stays empty until first requested
+    provenance = Column(String, default="llm")  # "llm", "lexical" (auto-accepted at upload) or "cluster" (copied from a representative)
+    cluster_representative_id = Column(Integer, ForeignKey("student_answers.id", ondelete="SET NULL"), nullable=True)
+    cluster_similarity = Column(Float, nullable=True)  # Embedding similarity to the cluster representative
+    # Fingerprint of what produced the grade; a grade is stale once the current fingerprint differs
+    combination_version = Column(Integer, nullable=True)
+    model_digest = Column(String, nullable=True)  # Ollama digest of the combination's model
+    prompt_hash = Column(String(64), nullable=True)  # SHA-256 of the rendered prompt (of the scorer input for "lexical")
+    shadow_grade = Column(Float, nullable=True)  # Grade from a trial extractor, for comparison
+    shadow_extractor_version = Column(String, nullable=True)
     timestamp = Column(DateTime, default=datetime.datetime.utcnow)
     student_answer_id = Column(Integer, ForeignKey("student_answers.id", ondelete="CASCADE"), nullable=False)
     
     # Define relationship
-    student_answer = relationship("StudentAnswer", back_populates="llm_responses")
+    student_answer = relationship("StudentAnswer", back_populates="llm_responses", foreign_keys=[student_answer_id])
@@ -12,4 +12,4 @@ class Question(Base):
     
     # Define relationships
     collection = relationship("Collection", back_populates="questions")
-    student_answers = relationship("StudentAnswer", back_populates="question", cascade="all, delete")
+    student_answers = relationship("StudentAnswer", back_populates="question", cascade="all, delete", passive_deletes=True)
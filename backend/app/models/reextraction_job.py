@@ -0,0 +1,19 @@
+# app/models/reextraction_job.py
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text
+import datetime
+from .base import Base
+
+class ReextractionJob(Base):
+    __tablename__ = "reextraction_jobs"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    target = Column(String, nullable=False)  # "test_results" or "llm_responses"
+    test_id = Column(Integer, ForeignKey("tests.id", ondelete="CASCADE"), nullable=True)
+    collection_id = Column(Integer, ForeignKey("collections.id", ondelete="CASCADE"), nullable=True)  # None re-extracts every collection
+    extractor_version = Column(String, nullable=False)
+    mode = Column(String, nullable=False)
+    status = Column(String, default="pending")
+    processed = Column(Integer, default=0)
+    changed = Column(Integer, default=0)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
@@ -12,4 +12,4 @@ class Student(Base):
     
     # Define relationships
     collection = relationship("Collection", back_populates="students")
-    answers = relationship("StudentAnswer", back_populates="student", cascade="all, delete")
+    answers = relationship("StudentAnswer", back_populates="student", cascade="all, delete", passive_deletes=True)
@@ -1,5 +1,5 @@
 # app/models/student_answer.py
-from sqlalchemy import Column, Integer, String, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, ForeignKey, Text, Float
 from sqlalchemy.orm import relationship
 from .base import Base
 
@@ -7,10 +7,14 @@ class StudentAnswer(Base):
     __tablename__ = "student_answers"
     id = Column(Integer, primary_key=True, autoincrement=True)
     answer = Column(Text)  # Student's answer to the question
+    provisional_score = Column(Float, nullable=True)  # Lexical similarity to the model answer, scored at upload
     student_id = Column(Integer, ForeignKey("students.id", ondelete="CASCADE"), nullable=False)
     question_id = Column(Integer, ForeignKey("questions.id", ondelete="CASCADE"), nullable=False)
     
     # Define relationships
     student = relationship("Student", back_populates="answers")
     question = relationship("Question", back_populates="student_answers")
-    llm_responses = relationship("LLMResponse", back_populates="student_answer", cascade="all, delete")
+    llm_responses = relationship(
+        "LLMResponse", back_populates="student_answer", cascade="all, delete", passive_deletes=True,
+        foreign_keys="LLMResponse.student_answer_id"
+    )
@@ -1,8 +1,37 @@
-from sqlalchemy import Column, Integer, String, Float, Text, DateTime, ForeignKey, JSON
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Float, Text, DateTime, ForeignKey, JSON, Index
+from sqlalchemy.orm import relationship, deferred
 from datetime import datetime
 
 from app.models.base import Base
+from app.models.compressed_text import CompressedText
+
+
+class TestDataset(Base):
+    """Model for storing an uploaded test dataset, reusable across tests."""
+    __tablename__ = "test_datasets"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, nullable=False)
+    content_hash = Column(String(64), unique=True, index=True, nullable=False)  # Hash of the item hashes, in order
+    item_ids = Column(JSON, nullable=False)  # Ordered test item IDs, one per uploaded row
+    row_count = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    # Relationships
+    tests = relationship("Test", back_populates="dataset")
+
+
+class TestItem(Base):
+    """Model for storing one graded answer of a test dataset, shared by every dataset that contains it."""
+    __tablename__ = "test_items"
+
+    id = Column(Integer, primary_key=True, index=True)
+    content_hash = Column(String(64), unique=True, index=True, nullable=False)
+    question = Column(Text, nullable=False)
+    model_answer = Column(Text, nullable=False)
+    student_answer = Column(Text, nullable=False)
+    model_grade = Column(Float, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
 
 
 class Test(Base):
@@ -15,34 +44,63 @@ class Test(Base):
     model_names = Column(JSON, nullable=False)  # Store as JSON array
     prompt_ids = Column(JSON, nullable=False)  # Store as JSON array
     status = Column(String, default="pending")
+    dataset_id = Column(Integer, ForeignKey("test_datasets.id"), nullable=True)  # Rows the test runs on
+    evaluation_mode = Column(String, default="exhaustive")  # "exhaustive" or "adaptive" (racing)
+    stopping_confidence = Column(Float, default=0.95)  # Adaptive: confidence required to eliminate a pair
+    min_rows = Column(Integer, default=30)  # Adaptive: rows a pair is evaluated on before it can be eliminated
+    random_seed = Column(Integer, nullable=True)  # Adaptive: seed of the row order, so resumed runs keep it
+    archived_at = Column(DateTime, nullable=True)  # When retention moved the test's results to the archive
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-    # Relationships
-    results = relationship("TestResult", back_populates="test", cascade="all, delete-orphan")
-    summaries = relationship("TestSummary", back_populates="test", cascade="all, delete-orphan")
+    # Relationships; results, summaries and progress are deleted by the database (ON DELETE CASCADE)
+    dataset = relationship("TestDataset", back_populates="tests")
+    results = relationship("TestResult", back_populates="test", cascade="all, delete-orphan", passive_deletes=True)
+    summaries = relationship("TestSummary", back_populates="test", cascade="all, delete-orphan", passive_deletes=True)
+    progress = relationship("TestProgress", back_populates="test", cascade="all, delete-orphan", passive_deletes=True)
 
 
 class TestResult(Base):
     """Model for storing individual test results."""
     __tablename__ = "test_results"
+    __table_args__ = (
+        # Keyset pagination of a test's results, optionally filtered by model and prompt
+        Index("ix_test_results_test_id_id", "test_id", "id"),
+        Index("ix_test_results_test_pair_id", "test_id", "model_name", "prompt_id", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    test_id = Column(Integer, ForeignKey("tests.id"), nullable=False)
+    test_id = Column(Integer, ForeignKey("tests.id", ondelete="CASCADE"), nullable=False)
     model_name = Column(String, nullable=False)
     prompt_id = Column(Integer, nullable=False)
-    question = Column(Text, nullable=False)
-    student_answer = Column(Text, nullable=False)
-    model_answer = Column(Text, nullable=False)
-    model_grade = Column(Float, nullable=False)
+    item_id = Column(Integer, ForeignKey("test_items.id"), nullable=False)
+    model_grade = Column(Float, nullable=False)  # Copied from the item for the metrics queries
     extracted_grade = Column(Float, nullable=False)
+    confidence = Column(String, nullable=True)  # Confidence level reported by the grade extraction
+    extractor_version = Column(String, nullable=True)  # Extractor that produced extracted_grade
+    shadow_extracted_grade = Column(Float, nullable=True)  # Grade from a trial extractor, for comparison
+    shadow_extractor_version = Column(String, nullable=True)
     accuracy = Column(Float, nullable=False)
     response_time = Column(Float, nullable=False)
-    full_response = Column(Text, nullable=False)
+    full_response = deferred(Column(CompressedText, nullable=False))  # Large and stored compressed; only loaded when requested
     created_at = Column(DateTime, default=datetime.utcnow)
 
     # Relationships
     test = relationship("Test", back_populates="results")
+    item = relationship("TestItem")
+
+    # The answer texts live on the shared test item
+    @property
+    def question(self) -> str:
+        return self.item.question
+
+    @property
+    def student_answer(self) -> str:
+        return self.item.student_answer
+
+    @property
+    def model_answer(self) -> str:
+        return self.item.model_answer
 
 
 class TestSummary(Base):
@@ -50,13 +108,42 @@ class TestSummary(Base):
     __tablename__ = "test_summaries"
 
     id = Column(Integer, primary_key=True, index=True)
-    test_id = Column(Integer, ForeignKey("tests.id"), nullable=False)
+    test_id = Column(Integer, ForeignKey("tests.id", ondelete="CASCADE"), nullable=False)
     model_name = Column(String, nullable=False)
     prompt_id = Column(Integer, nullable=False)
     average_accuracy = Column(Float, nullable=False)
     average_response_time = Column(Float, nullable=False)
     total_questions = Column(Integer, nullable=False)
+    mae = Column(Float, nullable=True)  # Mean absolute error against the reference grade
+    rmse = Column(Float, nullable=True)
+    pearson = Column(Float, nullable=True)
+    spearman = Column(Float, nullable=True)
+    quadratic_weighted_kappa = Column(Float, nullable=True)  # On grades binned to 0.1 steps
+    exact_agreement = Column(Float, nullable=True)  # Share of results that match the reference grade
+    latency_p50 = Column(Float, nullable=True)
+    latency_p95 = Column(Float, nullable=True)
+    latency_p99 = Column(Float, nullable=True)
+    confidence_breakdown = Column(JSON, nullable=True)  # Result count per extraction confidence level
     created_at = Column(DateTime, default=datetime.utcnow)
 
     # Relationships
     test = relationship("Test", back_populates="summaries")
+
+
+class TestProgress(Base):
+    """Model for storing per (model, prompt) checkpoint progress of a test run."""
+    __tablename__ = "test_progress"
+
+    id = Column(Integer, primary_key=True, index=True)
+    test_id = Column(Integer, ForeignKey("tests.id", ondelete="CASCADE"), nullable=False)
+    model_name = Column(String, nullable=False)
+    prompt_id = Column(Integer, nullable=False)
+    rows_done = Column(Integer, nullable=False, default=0)  # Rows committed so far, in upload order
+    total_rows = Column(Integer, nullable=False)
+    status = Column(String, default="pending")
+    accuracy_lower = Column(Float, nullable=True)  # Adaptive: confidence interval of the mean accuracy
+    accuracy_upper = Column(Float, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Relationships
+    test = relationship("Test", back_populates="progress")
@@ -10,4 +10,4 @@ class User(Base):
     isAdmin = Column(Boolean, default=False)  # Added isAdmin field
 
     # Define relationship (one-to-many)
-    collections = relationship("Collection", back_populates="owner", cascade="all, delete")
+    collections = relationship("Collection", back_populates="owner", cascade="all, delete", passive_deletes=True)
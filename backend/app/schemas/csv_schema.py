@@ -19,5 +19,7 @@ class AnswerUploadResponse(BaseModel):
     students_updated: int
     answers_created: int
     answers_updated: int
+    provisionally_scored: int = 0
+    auto_accepted: int = 0
     errors: int
     error_details: List[ErrorDetail]
@@ -1,14 +1,23 @@
 # app/schemas/evaluation_schema.py
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional
 from datetime import datetime
 
+class GradingMode(str):
+    """Grading mode enum."""
+    FULL = "full"
+    GRADE_ONLY = "grade_only"
+
 # Combination schemas
 class CombinationBase(BaseModel):
     name: str
     description: Optional[str] = None
     prompt: str
     model_name: str
+    cascade_model_name: Optional[str] = None  # Larger model for answers the first model is unsure about
+    cascade_band_low: Optional[float] = Field(None, ge=0, le=1)  # Grades in [low, high] also escalate
+    cascade_band_high: Optional[float] = Field(None, ge=0, le=1)
+    grading_mode: str = "full"  # "full", or "grade_only" to generate feedback only when requested
 
 class CombinationCreate(CombinationBase):
     pass
@@ -18,9 +27,14 @@ class CombinationUpdate(BaseModel):
     description: Optional[str] = None
     prompt: Optional[str] = None
     model_name: Optional[str] = None
+    cascade_model_name: Optional[str] = None
+    cascade_band_low: Optional[float] = Field(None, ge=0, le=1)
+    cascade_band_high: Optional[float] = Field(None, ge=0, le=1)
+    grading_mode: Optional[str] = None
 
 class Combination(CombinationBase):
     id: int
+    version: int = 1
     created_at: datetime
     updated_at: Optional[datetime] = None
 
@@ -37,6 +51,13 @@ class CollectionInCombination(BaseModel):
 class CombinationWithCollections(Combination):
     collections: List[CollectionInCombination] = []
 
+class CascadeStats(BaseModel):
+    combination_id: int
+    total_grades: int
+    escalated_grades: int
+    escalation_rate: Optional[float] = None
+    grades_by_model: Dict[str, int]
+
 # Model schemas for Ollama API
 class ModelDetails(BaseModel):
     format: Optional[str] = None
@@ -0,0 +1,36 @@
+# app/schemas/grading_batch_schema.py
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from datetime import datetime
+
+class GradingBatchCreate(BaseModel):
+    collection_id: int
+    only_ungraded: bool = True
+    only_stale: bool = False  # Regrade only answers graded with an outdated combination, model or prompt
+    cluster_threshold: Optional[float] = Field(None, gt=0, le=1)  # Minimum embedding similarity within a cluster
+
+class GradingBatchResponse(GradingBatchCreate):
+    id: int
+    status: str
+    total_answers: int
+    graded_answers: int
+    failed_answers: int
+    propagated_answers: int = 0
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class StaleAnswers(BaseModel):
+    collection_id: int
+    graded_answers: int
+    stale_answer_ids: List[int]
+
+class GradingBatchStatus(str):
+    """Grading batch status enum."""
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
@@ -1,13 +1,32 @@
 # app/schemas/llm_response_schema.py
 from pydantic import BaseModel
-from typing import Optional
+from typing import Any, Dict, List, Optional
 from datetime import datetime
 
+class GradeProvenance(str):
+    """Where a stored grade comes from."""
+    LLM = "llm"
+    LEXICAL = "lexical"
+    CLUSTER = "cluster"
+
 class LLMResponseCreate(BaseModel):
     raw_response: str
     grade: float
     feedback: Optional[str] = None
     student_answer_id: int
+    extractor_version: Optional[str] = None
+    model_name: Optional[str] = None
+    confidence: Optional[str] = None
+    combination_id: Optional[int] = None
+    escalated: bool = False
+    escalation_path: Optional[List[Dict[str, Any]]] = None
+    grading_mode: Optional[str] = None
+    provenance: Optional[str] = None
+    cluster_representative_id: Optional[int] = None
+    cluster_similarity: Optional[float] = None
+    combination_version: Optional[int] = None
+    model_digest: Optional[str] = None
+    prompt_hash: Optional[str] = None
 
 class LLMResponseResponse(LLMResponseCreate):
     id: int
@@ -0,0 +1,43 @@
+from pydantic import BaseModel
+from typing import List, Optional
+from datetime import datetime
+
+class ReextractionRequest(BaseModel):
+    extractor_version: str
+    mode: str = "shadow"  # "rewrite" or "shadow"
+
+class LLMResponseReextractionRequest(ReextractionRequest):
+    collection_id: Optional[int] = None
+
+class ReextractionJobResponse(BaseModel):
+    id: int
+    target: str  # "test_results" or "llm_responses"
+    test_id: Optional[int] = None
+    collection_id: Optional[int] = None
+    extractor_version: str
+    mode: str
+    status: str
+    processed: int
+    changed: int
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class ExtractorList(BaseModel):
+    versions: List[str]
+    default_version: str
+
+class ReextractionTarget(str):
+    """Re-extraction job target enum."""
+    TEST_RESULTS = "test_results"
+    LLM_RESPONSES = "llm_responses"
+
+class ReextractionJobStatus(str):
+    """Re-extraction job status enum."""
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
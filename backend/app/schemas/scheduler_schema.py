@@ -0,0 +1,23 @@
+from pydantic import BaseModel
+from typing import Dict, Optional
+
+class GenerationPriority(str):
+    """Priority class of a generation request, from most to least urgent."""
+    INTERACTIVE = "interactive"  # A teacher grading one answer
+    BULK = "bulk"  # Grading batches over a collection
+    BENCHMARK = "benchmark"  # Admin test runs
+
+class PriorityClassStats(BaseModel):
+    queued: int
+    running: int
+    completed: int
+    average_wait_seconds: Optional[float] = None
+    max_wait_seconds: float
+
+class SchedulerStats(BaseModel):
+    slots: int
+    busy_slots: int
+    aging_seconds: float
+    average_generation_seconds: float
+    classes: Dict[str, PriorityClassStats]
+    pending_by_user: Dict[str, int]  # Queued and running generations per collection owner
@@ -0,0 +1,38 @@
+from pydantic import BaseModel
+from typing import Any, Dict, List, Optional
+
+class CompressedColumnStats(BaseModel):
+    column: str
+    rows: int  # Rows with a value
+    stored_bytes: int
+
+class CompressionStats(BaseModel):
+    codec: str
+    dictionary_id: Optional[int] = None  # None until a dictionary is trained
+    dictionary_size: int
+    columns: List[CompressedColumnStats]
+
+class DictionaryTrainingResult(BaseModel):
+    dictionary_id: int
+    codec: str
+    size: int
+    sample_count: int
+
+class RecompressionResult(BaseModel):
+    dictionary_id: int
+    processed: int
+    recompressed: int
+
+class RetentionRequest(BaseModel):
+    keep_responses_per_answer: Optional[int] = None  # Defaults to RETENTION_KEEP_RESPONSES
+    test_result_days: Optional[int] = None  # Defaults to RETENTION_TEST_RESULT_DAYS
+    dry_run: bool = False
+
+class RetentionResult(BaseModel):
+    dry_run: bool
+    llm_responses: int  # Rows archived, or that would be archived in a dry run
+    test_results: int
+
+class ArchivePage(BaseModel):
+    rows: List[Dict[str, Any]]
+    next_after_id: Optional[int] = None
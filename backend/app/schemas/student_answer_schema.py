@@ -9,6 +9,7 @@ class StudentAnswerCreate(BaseModel):
 
 class StudentAnswerResponse(StudentAnswerCreate):
     id: int
+    provisional_score: Optional[float] = None
 
     class Config:
         from_attributes = True
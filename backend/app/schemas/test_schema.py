@@ -12,6 +12,27 @@ class TestCreate(TestConfigBase):
     """Schema for creating a new test."""
     model_names: List[str] = Field(..., title="Model names", description="Names of models to use for testing")
     prompt_ids: List[int] = Field(..., title="Prompt IDs", description="IDs of prompts to use for testing")
+    dataset_id: Optional[int] = Field(None, title="Dataset ID", description="Stored dataset to run the test on")
+    evaluation_mode: str = Field("exhaustive", title="Evaluation mode", description="'exhaustive' evaluates every pair on every row; 'adaptive' stops evaluating pairs that are clearly losing")
+    stopping_confidence: float = Field(0.95, gt=0, lt=1, title="Stopping confidence", description="Adaptive mode: confidence required to eliminate a pair")
+    min_rows: int = Field(30, ge=1, title="Minimum rows", description="Adaptive mode: rows a pair is evaluated on before it can be eliminated")
+
+
+class TestRun(BaseModel):
+    """Schema for running a test on a stored dataset."""
+    dataset_id: Optional[int] = Field(None, title="Dataset ID", description="Dataset to run on; the test's current dataset if omitted")
+
+
+class TestDataset(BaseModel):
+    """Schema for a stored test dataset."""
+    id: int
+    name: str
+    content_hash: str
+    row_count: int
+    created_at: datetime
+
+    class Config:
+        orm_mode = True
 
 
 class TestUpload(BaseModel):
@@ -26,6 +47,15 @@ class TestStatus(str):
     RUNNING = "running"
     COMPLETED = "completed"
     FAILED = "failed"
+    CANCELLED = "cancelled"
+    ELIMINATED = "eliminated"  # Pair stopped early by an adaptive test
+    DELETING = "deleting"  # Results are being deleted in the background
+
+
+class EvaluationMode(str):
+    """Test evaluation mode enum."""
+    EXHAUSTIVE = "exhaustive"
+    ADAPTIVE = "adaptive"
 
 
 class TestConfig(TestConfigBase):
@@ -33,7 +63,12 @@ class TestConfig(TestConfigBase):
     id: int
     model_names: List[str]
     prompt_ids: List[int]
+    dataset_id: Optional[int] = None
+    evaluation_mode: str = EvaluationMode.EXHAUSTIVE
+    stopping_confidence: Optional[float] = None
+    min_rows: Optional[int] = None
     status: str = Field(TestStatus.PENDING, title="Status", description="Status of the test")
+    archived_at: Optional[datetime] = Field(None, title="Archived at", description="When retention archived the results of the test")
     created_at: datetime
     updated_at: datetime
 
@@ -51,6 +86,7 @@ class TestResultBase(BaseModel):
     model_answer: str
     model_grade: float
     extracted_grade: float
+    confidence: Optional[str] = None
     accuracy: float
     response_time: float
     full_response: str
@@ -78,15 +114,56 @@ class TestSummary(BaseModel):
     average_accuracy: float
     average_response_time: float
     total_questions: int
+    mae: Optional[float] = None
+    rmse: Optional[float] = None
+    pearson: Optional[float] = None
+    spearman: Optional[float] = None
+    quadratic_weighted_kappa: Optional[float] = None
+    exact_agreement: Optional[float] = None
+    latency_p50: Optional[float] = None
+    latency_p95: Optional[float] = None
+    latency_p99: Optional[float] = None
+    confidence_breakdown: Optional[Dict[str, int]] = None
+
+    class Config:
+        orm_mode = True
+
+
+class TestProgress(BaseModel):
+    """Schema for the checkpoint progress of a model and prompt combination."""
+    model_name: str
+    prompt_id: int
+    rows_done: int
+    total_rows: int
+    status: str
+    accuracy_lower: Optional[float] = None
+    accuracy_upper: Optional[float] = None
 
     class Config:
         orm_mode = True
 
 
+class TestWithSummaries(TestConfig):
+    """Schema for a test with its summaries and progress, without individual results."""
+    summaries: List[TestSummary] = []
+    progress: List[TestProgress] = []
+    total_results: int = 0
+
+    class Config:
+        orm_mode = True
+
+
+class TestResultPage(BaseModel):
+    """Schema for one keyset-paginated page of test results with the selected columns."""
+    results: List[Dict[str, Any]]
+    next_after_id: Optional[int] = Field(None, title="Next cursor", description="Pass as after_id to fetch the next page")
+
+
 class TestWithResults(TestConfig):
     """Schema for a test with its results."""
     results: List[TestResult] = []
     summaries: List[TestSummary] = []
+    progress: List[TestProgress] = []
 
     class Config:
         orm_mode = True
@@ -0,0 +1,141 @@
+import logging
+from typing import Dict, List, Tuple
+import numpy as np
+from sqlalchemy.orm import Session
+from app.models.llm_response import LLMResponse
+from app.models.student_answer import StudentAnswer
+from app.schemas.llm_response_schema import GradeProvenance, LLMResponseResponse
+from app.services.embedding_service import LOOKUP_CHUNK_SIZE, EmbeddingService
+from app.services.regrade_service import RegradeService
+
+class ClusterGradingService:
+    """
+    Service for grading near-identical answers once.
+
+    The answers to each question are grouped by the cosine similarity of their
+    embeddings. A cluster is tight by construction: every member is at least as similar
+    to the cluster's representative as the threshold. Only the representative is graded
+    by the LLM and its grade is copied to the members, marked with provenance "cluster".
+    Answers without a close enough neighbour are graded individually.
+    """
+
+    @staticmethod
+    def cluster(vectors: np.ndarray, threshold: float) -> List[Tuple[int, List[int], List[float]]]:
+        """
+        Group unit-normalized vectors into tight clusters.
+
+        The unassigned vector with the most unassigned neighbours above the threshold
+        becomes a representative and takes those neighbours as members, until every vector
+        is assigned; a vector without neighbours is its own cluster.
+
+        Args:
+            vectors: Unit-normalized vectors, one per row
+            threshold: Minimum cosine similarity of a member to its representative
+
+        Returns:
+            List of (representative index, member indices, member similarities)
+        """
+        count = len(vectors)
+        if count == 0:
+            return []
+        similarity = vectors @ vectors.T
+        neighbours = similarity >= threshold
+        unassigned = np.ones(count, dtype=bool)
+        # Neighbour counts among the unassigned vectors, updated as vectors are assigned
+        degrees = neighbours.sum(axis=1, dtype=np.int64)
+
+        clusters = []
+        while unassigned.any():
+            representative = int(np.argmax(degrees))
+            members = np.flatnonzero(neighbours[representative] & unassigned)
+            members = members[members != representative]
+
+            clusters.append((representative, members.tolist(), similarity[representative, members].tolist()))
+            assigned = np.append(members, representative)
+            unassigned[assigned] = False
+            degrees -= neighbours[:, assigned].sum(axis=1, dtype=np.int64)
+            degrees[~unassigned] = -1  # Assigned vectors never win; every unassigned vector neighbours itself
+        return clusters
+
+    @staticmethod
+    async def plan(db: Session, answer_ids: List[int], threshold: float) -> List[Tuple[int, List[int], List[float]]]:
+        """
+        Plan the grading of answers: the answers to each question are clustered separately.
+
+        Args:
+            db: Database session
+            answer_ids: Student answers to grade
+            threshold: Minimum embedding similarity of a member to its representative
+
+        Returns:
+            List of (answer ID to grade, member answer IDs to copy its grade to, member similarities),
+            in answer ID order of the graded answers
+        """
+        rows = []
+        for start in range(0, len(answer_ids), LOOKUP_CHUNK_SIZE):
+            rows.extend(db.query(StudentAnswer.id, StudentAnswer.question_id, StudentAnswer.answer).filter(
+                StudentAnswer.id.in_(answer_ids[start:start + LOOKUP_CHUNK_SIZE])
+            ).all())
+
+        by_question: Dict[int, List[Tuple[int, str]]] = {}
+        for answer_id, question_id, answer in rows:
+            by_question.setdefault(question_id, []).append((answer_id, answer or ""))
+
+        vectors = await EmbeddingService.get_embeddings(
+            db, [answer for question_answers in by_question.values() for _, answer in question_answers]
+        )
+
+        plan = []
+        offset = 0
+        for question_answers in by_question.values():
+            question_vectors = vectors[offset:offset + len(question_answers)]
+            offset += len(question_answers)
+            for representative, members, similarities in ClusterGradingService.cluster(question_vectors, threshold):
+                plan.append((
+                    question_answers[representative][0],
+                    [question_answers[member][0] for member in members],
+                    similarities
+                ))
+
+        plan.sort(key=lambda step: step[0])
+        logging.getLogger(__name__).info(
+            f"Clustered {len(rows)} answers into {len(plan)} grading calls"
+        )
+        return plan
+
+    @staticmethod
+    def propagate(db: Session, graded: LLMResponseResponse, member_ids: List[int], similarities: List[float]) -> int:
+        """
+        Copy the grade of a representative to the members of its cluster.
+
+        Each copy carries the member's own prompt hash, so editing a member's answer makes
+        only that copy stale.
+
+        Returns:
+            Number of member answers graded
+        """
+        fingerprints = RegradeService.prompt_fingerprints(db, member_ids)
+        db.add_all([
+            LLMResponse(
+                raw_response=graded.raw_response,
+                grade=graded.grade,
+                feedback=graded.feedback,
+                student_answer_id=member_id,
+                extractor_version=graded.extractor_version,
+                model_name=graded.model_name,
+                confidence=graded.confidence,
+                combination_id=graded.combination_id,
+                escalated=graded.escalated,
+                escalation_path=graded.escalation_path,
+                grading_mode=graded.grading_mode,
+                provenance=GradeProvenance.CLUSTER,
+                cluster_representative_id=graded.student_answer_id,
+                cluster_similarity=similarity,
+                combination_version=graded.combination_version,
+                model_digest=graded.model_digest,
+                prompt_hash=fingerprints[member_id][1]
+            )
+            for member_id, similarity in zip(member_ids, similarities)
+        ])
+        db.commit()
+        return len(member_ids)
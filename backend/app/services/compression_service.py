@@ -0,0 +1,135 @@
+import logging
+import os
+from typing import Dict, List
+from sqlalchemy import LargeBinary, func, type_coerce, update
+from sqlalchemy.orm import Session
+from app.models.compressed_text import Codec, compression_store, default_codec, zstandard
+from app.models.compression_dictionary import CompressionDictionary
+from app.models.llm_response import LLMResponse
+from app.models.test import TestResult
+
+# Newest values of each compressed column a dictionary is trained on
+COMPRESSION_TRAINING_SAMPLES = int(os.getenv("COMPRESSION_TRAINING_SAMPLES", "2000"))
+
+# Size of a trained zstd dictionary in bytes
+COMPRESSION_DICTIONARY_BYTES = int(os.getenv("COMPRESSION_DICTIONARY_BYTES", str(64 * 1024)))
+
+# Stored values rewritten per round trip when recompressing
+COMPRESSION_CHUNK_SIZE = int(os.getenv("COMPRESSION_CHUNK_SIZE", "1000"))
+
+# Fewer samples than this are too few to train a useful dictionary
+MIN_TRAINING_SAMPLES = 50
+
+# zlib only uses the last 32 KB of a preset dictionary
+ZLIB_DICTIONARY_BYTES = 32 * 1024
+
+# Columns stored with CompressedText
+COMPRESSED_COLUMNS = (LLMResponse.raw_response, LLMResponse.feedback, TestResult.full_response)
+
+class CompressionService:
+    """
+    Service for the shared compression dictionaries of the stored LLM outputs.
+
+    A dictionary is trained on the newest raw responses, feedback and test responses;
+    values written after training are compressed with it, and recompress rewrites the
+    values stored before it, in chunks by ID.
+    """
+
+    @staticmethod
+    def train_dictionary(db: Session, samples_per_column: int = COMPRESSION_TRAINING_SAMPLES,
+                         dictionary_bytes: int = COMPRESSION_DICTIONARY_BYTES) -> Dict:
+        """
+        Train a dictionary on stored values and compress new values with it.
+
+        Returns:
+            Dict describing the new dictionary
+
+        Raises:
+            ValueError: If too few values are stored to train on
+        """
+        samples: List[bytes] = []
+        for column in COMPRESSED_COLUMNS:
+            rows = db.query(column).filter(column.isnot(None)).order_by(column.class_.id.desc()).limit(samples_per_column)
+            samples.extend(value.encode("utf-8") for value, in rows if value)
+        if len(samples) < MIN_TRAINING_SAMPLES:
+            raise ValueError(f"At least {MIN_TRAINING_SAMPLES} stored responses are needed to train a dictionary, found {len(samples)}")
+
+        codec = default_codec()
+        if codec == Codec.ZSTD:
+            try:
+                data = zstandard.train_dictionary(dictionary_bytes, samples).as_bytes()
+            except zstandard.ZstdError as e:
+                raise ValueError(f"Training the dictionary failed: {e}")
+        else:
+            # The most recent samples go last, where zlib finds its matches first
+            data = b"".join(reversed(samples))[-ZLIB_DICTIONARY_BYTES:]
+
+        dictionary = CompressionDictionary(codec=codec, data=data, sample_count=len(samples))
+        db.add(dictionary)
+        db.commit()
+        db.refresh(dictionary)
+        compression_store.activate(dictionary.id, codec, data)
+        logging.getLogger(__name__).info(
+            f"Trained {codec} compression dictionary {dictionary.id} of {len(data)} bytes on {len(samples)} values"
+        )
+        return {"dictionary_id": dictionary.id, "codec": codec, "size": len(data), "sample_count": len(samples)}
+
+    @staticmethod
+    def recompress(db: Session) -> Dict:
+        """
+        Rewrite the stored values that are not compressed with the current dictionary.
+
+        Returns:
+            Dict with processing statistics
+        """
+        logger = logging.getLogger(__name__)
+        stats = {"dictionary_id": compression_store.current_id(), "processed": 0, "recompressed": 0}
+
+        for column in COMPRESSED_COLUMNS:
+            model = column.class_
+            # The stored bytes, so values already compressed with the current dictionary are not decompressed
+            query = db.query(model.id, type_coerce(column, LargeBinary).label("stored")).filter(column.isnot(None))
+            last_id = 0
+            while True:
+                chunk = query.filter(model.id > last_id).order_by(model.id).limit(COMPRESSION_CHUNK_SIZE).all()
+                if not chunk:
+                    break
+                last_id = chunk[-1].id
+
+                updates = [
+                    {"id": row.id, column.key: compression_store.decode(row.stored)}
+                    for row in chunk if not compression_store.is_current(row.stored)
+                ]
+                if updates:
+                    db.execute(update(model), updates)
+                    db.commit()
+                stats["processed"] += len(chunk)
+                stats["recompressed"] += len(updates)
+            logger.info(f"Recompressed {model.__tablename__}.{column.key}: {stats['recompressed']} of {stats['processed']} values so far")
+
+        return stats
+
+    @staticmethod
+    def storage_stats(db: Session) -> Dict:
+        """Row count and stored bytes of each compressed column, and the current dictionary."""
+        columns = []
+        for column in COMPRESSED_COLUMNS:
+            rows, stored_bytes = db.query(
+                func.count(column), func.coalesce(func.sum(func.length(type_coerce(column, LargeBinary))), 0)
+            ).one()
+            columns.append({
+                "column": f"{column.class_.__tablename__}.{column.key}",
+                "rows": rows,
+                "stored_bytes": int(stored_bytes)
+            })
+
+        dictionary_id = compression_store.current_id()
+        dictionary = db.query(CompressionDictionary.codec, func.length(CompressionDictionary.data)).filter(
+            CompressionDictionary.id == dictionary_id
+        ).first()
+        return {
+            "codec": dictionary[0] if dictionary else default_codec(),
+            "dictionary_id": dictionary_id or None,
+            "dictionary_size": dictionary[1] if dictionary else 0,
+            "columns": columns
+        }
@@ -1,15 +1,24 @@
 import csv
 import io
 from typing import Dict, List, Tuple, Optional
+from sqlalchemy import update
 from sqlalchemy.orm import Session
 from app.database import crud
 from app.models.collection import Collection
+from app.models.llm_response import LLMResponse
 from app.models.question import Question
 from app.models.student import Student
 from app.models.student_answer import StudentAnswer
 from app.schemas.question_schema import QuestionCreate
 from app.schemas.student_schema import StudentCreate
 from app.schemas.student_answer_schema import StudentAnswerCreate
+from app.schemas.llm_response_schema import GradeProvenance
+from app.schemas.evaluation_schema import GradingMode
+from app.services.fingerprint_service import FingerprintService
+from app.services.lexical_scoring_service import LexicalScoringService
+
+# Feedback stored with answers accepted at upload without the LLM
+AUTO_ACCEPT_FEEDBACK = "The answer matches the model answer."
 
 class CSVService:
     """Service for handling CSV file uploads and processing."""
@@ -31,6 +40,8 @@ class CSVService:
         collection = db.query(Collection).filter(Collection.id == collection_id).first()
         if not collection:
             raise ValueError(f"Collection with ID {collection_id} does not exist")
+        if collection.deleting:
+            raise ValueError(f"Collection with ID {collection_id} is being deleted")
         
         # Parse CSV
         csv_text = csv_content.decode('utf-8')
@@ -92,14 +103,19 @@ class CSVService:
         return stats
     
     @staticmethod
-    def process_answers_csv(db: Session, collection_id: int, csv_content: bytes) -> Dict:
+    def process_answers_csv(db: Session, collection_id: int, csv_content: bytes, auto_accept_threshold: Optional[float] = None) -> Dict:
         """
         Process a CSV file containing student answers for a collection.
         
+        Every uploaded answer gets a provisional score, its lexical similarity to the model
+        answer. With an auto-accept threshold, answers scoring at least the threshold are
+        graded 1.0 right away without the LLM.
+        
         Args:
             db: Database session
             collection_id: Collection ID
             csv_content: CSV file content as bytes
+            auto_accept_threshold: Provisional score from which answers are accepted, None to disable
             
         Returns:
             Dict with processing statistics
@@ -108,6 +124,8 @@ class CSVService:
         collection = db.query(Collection).filter(Collection.id == collection_id).first()
         if not collection:
             raise ValueError(f"Collection with ID {collection_id} does not exist")
+        if collection.deleting:
+            raise ValueError(f"Collection with ID {collection_id} is being deleted")
         
         # Parse CSV
         csv_text = csv_content.decode('utf-8')
@@ -133,6 +151,8 @@ class CSVService:
             'students_updated': 0,
             'answers_created': 0,
             'answers_updated': 0,
+            'provisionally_scored': 0,
+            'auto_accepted': 0,
             'errors': 0,
             'error_details': []
         }
@@ -140,6 +160,9 @@ class CSVService:
         # Track processed students by PID to avoid duplicates
         processed_students = {}
         
+        # Answers of this upload with their model answers, scored together at the end
+        uploaded_answers = {}
+        
         for i, row in enumerate(csv_reader, start=1):
             stats['total'] += 1
             
@@ -197,6 +220,7 @@ class CSVService:
                     existing_answer.answer = answer_text
                     db.commit()
                     stats['answers_updated'] += 1
+                    uploaded_answers[existing_answer.id] = (answer_text, question.model_answer)
                 else:
                     # Create new answer
                     answer_create = StudentAnswerCreate(
@@ -204,8 +228,9 @@ class CSVService:
                         student_id=student.id,
                         question_id=question.id
                     )
-                    crud.create_student_answer(db, answer_create)
+                    created_answer = crud.create_student_answer(db, answer_create)
                     stats['answers_created'] += 1
+                    uploaded_answers[created_answer.id] = (answer_text, question.model_answer)
                     
             except Exception as e:
                 stats['errors'] += 1
@@ -214,4 +239,38 @@ class CSVService:
                     'error': str(e)
                 })
         
+        if uploaded_answers:
+            CSVService._score_answers(db, uploaded_answers, auto_accept_threshold, stats)
+        
         return stats
+    
+    @staticmethod
+    def _score_answers(db: Session, uploaded_answers: Dict[int, Tuple[str, str]], auto_accept_threshold: Optional[float], stats: Dict):
+        """Store the provisional scores of uploaded answers and accept the ones at or above the threshold."""
+        answer_ids = list(uploaded_answers)
+        scores = LexicalScoringService.score(list(uploaded_answers.values()))
+        
+        db.execute(update(StudentAnswer), [
+            {"id": answer_id, "provisional_score": float(score)}
+            for answer_id, score in zip(answer_ids, scores)
+        ])
+        stats['provisionally_scored'] = len(answer_ids)
+        
+        if auto_accept_threshold is not None:
+            accepted = [answer_id for answer_id, score in zip(answer_ids, scores) if score >= auto_accept_threshold]
+            db.add_all([
+                LLMResponse(
+                    raw_response="",
+                    grade=1.0,
+                    feedback=AUTO_ACCEPT_FEEDBACK,
+                    student_answer_id=answer_id,
+                    confidence="high",
+                    grading_mode=GradingMode.FULL,
+                    provenance=GradeProvenance.LEXICAL,
+                    prompt_hash=FingerprintService.lexical_hash(*uploaded_answers[answer_id])
+                )
+                for answer_id in accepted
+            ])
+            stats['auto_accepted'] = len(accepted)
+        
+        db.commit()
@@ -0,0 +1,132 @@
+import asyncio
+import logging
+import os
+from typing import List, Tuple
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.database.connection import SessionLocal
+from app.models.collection import Collection
+from app.models.llm_response import LLMResponse
+from app.models.question import Question
+from app.models.student_answer import StudentAnswer
+from app.models.test import Test, TestResult
+from app.schemas.test_schema import TestStatus
+from app.services.job_registry import job_registry
+
+# Parents with more rows than this in one child table are deleted in the background, in batches
+BULK_DELETE_THRESHOLD = int(os.getenv("BULK_DELETE_THRESHOLD", "20000"))
+
+# Rows deleted per transaction by a background delete
+BULK_DELETE_BATCH_SIZE = int(os.getenv("BULK_DELETE_BATCH_SIZE", "5000"))
+
+class DeletionService:
+    """
+    Service for deleting tests and collections with everything below them.
+
+    Child rows are deleted by the database (ON DELETE CASCADE), so deleting a parent is
+    a single statement and no child is loaded into Python. Parents with more than
+    BULK_DELETE_THRESHOLD rows in one child table are deleted in the background: the
+    largest child tables are emptied in batches of BULK_DELETE_BATCH_SIZE rows, each in
+    its own short transaction, and the parent is deleted last.
+    """
+
+    @staticmethod
+    def delete_test(db: Session, test: Test) -> bool:
+        """
+        Delete a test with its results, summaries and progress.
+
+        Returns:
+            True if the test was deleted, False if its deletion continues in the background
+        """
+        if not DeletionService._is_large(db, DeletionService._test_steps(test.id)):
+            db.delete(test)
+            db.commit()
+            return True
+
+        # Marked so the test is not run, resumed or archived while its results are deleted
+        test.status = TestStatus.DELETING
+        db.commit()
+        DeletionService.start_background_delete(Test, test.id)
+        return False
+
+    @staticmethod
+    def delete_collection(db: Session, collection: Collection) -> bool:
+        """
+        Delete a collection with its students, questions, answers, grades and grading batches.
+
+        Returns:
+            True if the collection was deleted, False if its deletion continues in the background
+        """
+        if not DeletionService._is_large(db, DeletionService._collection_steps(collection.id)):
+            db.delete(collection)
+            db.commit()
+            return True
+
+        # Marked so nothing is added to or graded in the collection while its rows are deleted
+        collection.deleting = True
+        db.commit()
+        DeletionService.start_background_delete(Collection, collection.id)
+        return False
+
+    @staticmethod
+    def start_background_delete(model, parent_id: int):
+        """Start deleting a test or collection in the background, unless this process already is."""
+        key = deletion_job_key(model.__tablename__, parent_id)
+        if not job_registry.is_running(key):
+            job_registry.start(key, asyncio.to_thread(DeletionService._delete_in_batches, model, parent_id))
+
+    @staticmethod
+    def _delete_in_batches(model, parent_id: int):
+        """Empty the largest child tables of a parent in batches, then delete the parent."""
+        logger = logging.getLogger(__name__)
+        steps = DeletionService._test_steps(parent_id) if model is Test else DeletionService._collection_steps(parent_id)
+        db = SessionLocal()
+        try:
+            for child, condition in steps:
+                deleted = 0
+                while True:
+                    ids = [row.id for row in db.query(child.id).filter(condition).limit(BULK_DELETE_BATCH_SIZE)]
+                    if not ids:
+                        break
+                    db.query(child).filter(child.id.in_(ids)).delete(synchronize_session=False)
+                    db.commit()
+                    deleted += len(ids)
+                logger.info(f"Deleted {deleted} rows of {child.__tablename__} under {model.__tablename__} {parent_id}")
+
+            # The remaining children are few; the database deletes them with the parent
+            db.query(model).filter(model.id == parent_id).delete(synchronize_session=False)
+            db.commit()
+            logger.info(f"Deleted {model.__tablename__} {parent_id}")
+        except Exception as e:
+            logger.error(f"Deleting {model.__tablename__} {parent_id} failed: {e}")
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    @staticmethod
+    def _test_steps(test_id: int) -> List[Tuple]:
+        return [(TestResult, TestResult.test_id == test_id)]
+
+    @staticmethod
+    def _collection_steps(collection_id: int) -> List[Tuple]:
+        """Children of a collection, deepest first: grades, then answers."""
+        question_ids = select(Question.id).where(Question.collection_id == collection_id)
+        answer_ids = select(StudentAnswer.id).where(StudentAnswer.question_id.in_(question_ids))
+        return [
+            (LLMResponse, LLMResponse.student_answer_id.in_(answer_ids)),
+            (StudentAnswer, StudentAnswer.question_id.in_(question_ids)),
+        ]
+
+    @staticmethod
+    def _is_large(db: Session, steps: List[Tuple]) -> bool:
+        """Whether a child table has more than BULK_DELETE_THRESHOLD rows under the parent, without counting them all."""
+        return any(
+            db.query(child.id).filter(condition).offset(BULK_DELETE_THRESHOLD).limit(1).first() is not None
+            for child, condition in steps
+        )
+
+
+def deletion_job_key(table_name: str, parent_id: int):
+    """Key of a background delete in the job registry."""
+    return ("delete", table_name, parent_id)
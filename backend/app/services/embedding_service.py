@@ -0,0 +1,105 @@
+import hashlib
+import logging
+import os
+from typing import Dict, List
+import numpy as np
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.models.answer_embedding import AnswerEmbedding
+from app.schemas.scheduler_schema import GenerationPriority
+from app.services.ollama_service import OllamaService
+
+# Ollama model used to embed answers
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "nomic-embed-text")
+
+# Texts sent to Ollama per embed request
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+
+# Values per IN (...) lookup, below the bound parameter limit of every supported database
+LOOKUP_CHUNK_SIZE = 500
+
+class EmbeddingService:
+    """
+    Service for answer embeddings, cached by content hash.
+
+    An answer is embedded once per embedding model: vectors are stored normalized under
+    the SHA-256 of the text, so identical answers in any collection share one vector and
+    regrading a collection makes no embedding requests.
+    """
+
+    @staticmethod
+    async def get_embeddings(db: Session, texts: List[str], model_name: str = EMBEDDING_MODEL) -> np.ndarray:
+        """
+        Get the unit-normalized embeddings of texts, embedding only the ones not cached yet.
+
+        Args:
+            db: Database session
+            texts: Texts to embed
+            model_name: Embedding model
+
+        Returns:
+            Array of shape (len(texts), dimension)
+        """
+        hashes = [EmbeddingService.hash_text(text) for text in texts]
+        vectors = EmbeddingService._get_cached(db, model_name, set(hashes))
+
+        missing = {}
+        for content_hash, text in zip(hashes, texts):
+            if content_hash not in vectors:
+                missing[content_hash] = text
+
+        if missing:
+            logging.getLogger(__name__).info(f"Embedding {len(missing)} texts with {model_name}")
+            # Embeddings are only needed to plan grading batches
+            ollama_service = OllamaService(model_name=model_name, priority=GenerationPriority.BULK)
+            missing_hashes = list(missing)
+            for start in range(0, len(missing_hashes), EMBEDDING_BATCH_SIZE):
+                batch = missing_hashes[start:start + EMBEDDING_BATCH_SIZE]
+                embeddings = await ollama_service.generate_embeddings([missing[content_hash] for content_hash in batch])
+                if len(embeddings) != len(batch):
+                    raise RuntimeError(f"Failed to generate embeddings with {model_name}")
+
+                for content_hash, embedding in zip(batch, embeddings):
+                    vector = np.asarray(embedding, dtype=np.float32)
+                    norm = np.linalg.norm(vector)
+                    vectors[content_hash] = vector / norm if norm > 0 else vector
+
+                EmbeddingService._store(db, model_name, {content_hash: vectors[content_hash] for content_hash in batch})
+
+        return np.stack([vectors[content_hash] for content_hash in hashes]) if hashes else np.zeros((0, 0), dtype=np.float32)
+
+    @staticmethod
+    def hash_text(text: str) -> str:
+        """Content hash of an embedded text."""
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _get_cached(db: Session, model_name: str, hashes: set) -> Dict[str, np.ndarray]:
+        """Cached vectors of the given hashes."""
+        hash_list = list(hashes)
+        vectors = {}
+        for start in range(0, len(hash_list), LOOKUP_CHUNK_SIZE):
+            rows = db.query(AnswerEmbedding.content_hash, AnswerEmbedding.vector).filter(
+                AnswerEmbedding.model_name == model_name,
+                AnswerEmbedding.content_hash.in_(hash_list[start:start + LOOKUP_CHUNK_SIZE])
+            ).all()
+            for content_hash, vector in rows:
+                vectors[content_hash] = np.frombuffer(vector, dtype=np.float32)
+        return vectors
+
+    @staticmethod
+    def _store(db: Session, model_name: str, vectors: Dict[str, np.ndarray]):
+        """Cache new vectors; a concurrent run that cached the same texts first wins."""
+        try:
+            db.add_all([
+                AnswerEmbedding(
+                    model_name=model_name,
+                    content_hash=content_hash,
+                    dimension=len(vector),
+                    vector=vector.astype(np.float32).tobytes()
+                )
+                for content_hash, vector in vectors.items()
+            ])
+            db.commit()
+        except IntegrityError:
+            db.rollback()
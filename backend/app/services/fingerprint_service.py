@@ -0,0 +1,47 @@
+import hashlib
+import json
+import os
+import time
+from typing import Dict, Optional, Tuple
+from app.services.ollama_service import OllamaService
+
+# Seconds a model digest is reused before Ollama is asked again
+MODEL_DIGEST_TTL = float(os.getenv("MODEL_DIGEST_TTL", "300"))
+
+# Model name -> (time fetched, digest or None if the model is not downloaded)
+_digest_cache: Dict[str, Tuple[float, Optional[str]]] = {}
+
+class FingerprintService:
+    """
+    Fingerprints of stored grades: combination version, model digest and prompt hash.
+
+    Editing a combination bumps its version, re-pulling a model changes its digest, and
+    editing an answer, question or prompt template changes the rendered prompt, so a
+    grade whose fingerprint differs from the current one is stale.
+    """
+
+    @staticmethod
+    def prompt_hash(prompt: str) -> str:
+        """Hash of a rendered prompt."""
+        return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def lexical_hash(answer: str, model_answer: str) -> str:
+        """Hash of the input of the lexical scorer, which stands in for the prompt of auto-accepted grades."""
+        return FingerprintService.prompt_hash(json.dumps([answer, model_answer], ensure_ascii=False))
+
+    @staticmethod
+    async def model_digest(model_name: str) -> Optional[str]:
+        """Digest of a downloaded model, cached for MODEL_DIGEST_TTL seconds; None if unknown."""
+        cached = _digest_cache.get(model_name)
+        if cached and time.monotonic() - cached[0] < MODEL_DIGEST_TTL:
+            return cached[1]
+
+        # One listing refreshes every model; a single attempt keeps an unreachable Ollama from stalling grading
+        digests = await OllamaService(max_retries=1).get_model_digests()
+        now = time.monotonic()
+        for name, digest in digests.items():
+            _digest_cache[name] = (now, digest)
+        if digests:
+            _digest_cache.setdefault(model_name, (now, None))
+        return digests.get(model_name)
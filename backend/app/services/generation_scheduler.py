@@ -0,0 +1,252 @@
+import asyncio
+import itertools
+import logging
+import math
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Dict, Hashable, List, Optional, Tuple
+from app.schemas.scheduler_schema import GenerationPriority
+
+# Generations sent to Ollama at once; match Ollama's OLLAMA_NUM_PARALLEL so requests queue here, not there
+GENERATION_SLOTS = int(os.getenv("GENERATION_SLOTS", os.getenv("OLLAMA_NUM_PARALLEL", "1")))
+
+# Seconds of waiting that promote a request by one priority class
+SCHEDULER_AGING_SECONDS = float(os.getenv("SCHEDULER_AGING_SECONDS", "30"))
+
+# Prompt characters a user may send per deficit round-robin turn in the bulk and benchmark classes
+FAIR_SHARE_QUANTUM = int(os.getenv("FAIR_SHARE_QUANTUM", "4000"))
+
+# Queued and running generations a user may have before new requests are rejected
+MAX_PENDING_PER_USER = int(os.getenv("MAX_PENDING_PER_USER", "20"))
+
+# Assumed generation time until the first generations have been timed
+DEFAULT_SERVICE_SECONDS = 5.0
+
+PRIORITY_RANKS = {
+    GenerationPriority.INTERACTIVE: 0,
+    GenerationPriority.BULK: 1,
+    GenerationPriority.BENCHMARK: 2,
+}
+
+class AdmissionRejected(Exception):
+    """Raised when a user has too much work pending; retry_after is the suggested wait in seconds."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class _Ticket:
+    """A request waiting for a generation slot."""
+
+    def __init__(self, priority: str, cost: int, owner: Optional[Hashable], seq: int):
+        self.priority = priority
+        self.cost = cost
+        self.owner = owner
+        self.seq = seq
+        self.enqueued_at = time.monotonic()
+        self.granted = asyncio.get_running_loop().create_future()
+
+
+class _ClassStats:
+    """Counters of one priority class."""
+
+    def __init__(self):
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def to_dict(self) -> Dict:
+        return {
+            "queued": self.queued,
+            "running": self.running,
+            "completed": self.completed,
+            "average_wait_seconds": self.total_wait / self.completed if self.completed else None,
+            "max_wait_seconds": self.max_wait,
+        }
+
+
+class _FairShare:
+    """Deficit round-robin between the owners of the tickets in one scheduling group."""
+
+    def __init__(self):
+        self.ring = deque()
+        self.deficits: Dict[Hashable, float] = {}
+
+    def next_owner(self, costs: Dict[Hashable, int], quantum: int) -> Hashable:
+        """Pick the owner served next, given the cost of each waiting owner's first ticket."""
+        # Owners that stopped waiting leave the round with their deficit, as in classic DRR
+        for owner in list(self.ring):
+            if owner not in costs:
+                self.ring.remove(owner)
+                del self.deficits[owner]
+        for owner in costs:
+            if owner not in self.deficits:
+                self.ring.append(owner)
+                self.deficits[owner] = 0
+
+        while True:
+            owner = self.ring[0]
+            if self.deficits[owner] >= costs[owner]:
+                self.deficits[owner] -= costs[owner]
+                return owner
+            self.deficits[owner] += quantum
+            self.ring.rotate(-1)
+
+
+class GenerationScheduler:
+    """
+    Hands out the generation slots of the shared Ollama by priority class and fair share.
+
+    Interactive requests are served first. Bulk and benchmark requests are served
+    shortest prompt first within their class. Waiting promotes a request by one class
+    every aging period, and a request that has aged past the top is served in arrival
+    order right after interactive requests, so long prompts and benchmarks are never
+    starved.
+
+    Within a class, users (the owners of the graded collections) take turns by deficit
+    round-robin over prompt characters, so a user with thousands of queued answers gets
+    the same share of the GPU as a user with one. A user whose pending generations
+    exceed MAX_PENDING_PER_USER is refused with AdmissionRejected.
+    """
+
+    def __init__(self, slots: int = GENERATION_SLOTS, aging_seconds: float = SCHEDULER_AGING_SECONDS,
+                 quantum: int = FAIR_SHARE_QUANTUM, max_pending_per_user: int = MAX_PENDING_PER_USER):
+        self.slots = max(1, slots)
+        self.aging_seconds = aging_seconds
+        self.quantum = max(1, quantum)
+        self.max_pending_per_user = max_pending_per_user
+        self._busy = 0
+        self._waiting: List[_Ticket] = []
+        self._seq = itertools.count()
+        self._stats = {priority: _ClassStats() for priority in PRIORITY_RANKS}
+        self._pending: Dict[Hashable, int] = {}
+        self._fair_shares: Dict[Tuple, _FairShare] = {}
+        self._service_seconds = DEFAULT_SERVICE_SECONDS
+        self.logger = logging.getLogger(__name__)
+
+    @asynccontextmanager
+    async def slot(self, priority: str, cost: int = 0, owner: Optional[Hashable] = None) -> AsyncIterator[float]:
+        """
+        Hold a generation slot for the duration of the block.
+
+        Args:
+            priority: Priority class of the request
+            cost: Estimated size of the request, e.g. the prompt length
+            owner: User the request is made for; requests without one share a single turn
+
+        Yields:
+            Seconds spent waiting for the slot
+        """
+        if priority not in PRIORITY_RANKS:
+            raise ValueError(f"Unknown priority class '{priority}'")
+        stats = self._stats[priority]
+        ticket = _Ticket(priority, cost, owner, next(self._seq))
+        self._pending[owner] = self._pending.get(owner, 0) + 1
+
+        try:
+            if self._busy < self.slots and not self._waiting:
+                self._busy += 1
+            else:
+                self._waiting.append(ticket)
+                stats.queued += 1
+                try:
+                    await ticket.granted
+                except asyncio.CancelledError:
+                    if ticket.granted.done() and not ticket.granted.cancelled():
+                        # Granted just before the cancellation: hand the slot on
+                        self._release()
+                    else:
+                        self._waiting.remove(ticket)
+                        stats.queued -= 1
+                    raise
+
+            wait = time.monotonic() - ticket.enqueued_at
+            started_at = time.monotonic()
+            stats.running += 1
+            try:
+                yield wait
+            finally:
+                stats.running -= 1
+                stats.completed += 1
+                stats.total_wait += wait
+                stats.max_wait = max(stats.max_wait, wait)
+                # Moving average of the generation time, for Retry-After estimates
+                self._service_seconds += 0.1 * (time.monotonic() - started_at - self._service_seconds)
+                self._release()
+        finally:
+            self._pending[owner] -= 1
+            if not self._pending[owner]:
+                del self._pending[owner]
+
+    def check_admission(self, owner: Optional[Hashable]):
+        """Raise AdmissionRejected if the owner already has the maximum of pending generations."""
+        pending = self._pending.get(owner, 0)
+        if owner is not None and pending >= self.max_pending_per_user:
+            raise AdmissionRejected(
+                f"Too many pending grading requests ({pending}); try again later",
+                self.estimate_wait(pending - self.max_pending_per_user + 1)
+            )
+
+    def estimate_wait(self, generations: int) -> int:
+        """Estimated seconds until the given number of generations has been served, at least 1."""
+        return max(1, math.ceil(generations * self._service_seconds / self.slots))
+
+    def stats(self) -> Dict:
+        """Queue depth, running requests and waiting times per priority class, and pending generations per user."""
+        return {
+            "slots": self.slots,
+            "busy_slots": self._busy,
+            "aging_seconds": self.aging_seconds,
+            "average_generation_seconds": self._service_seconds,
+            "classes": {priority: stats.to_dict() for priority, stats in self._stats.items()},
+            "pending_by_user": {str(owner): pending for owner, pending in self._pending.items()},
+        }
+
+    def _order(self, ticket: _Ticket, now: float) -> Tuple:
+        """
+        Sort key of a waiting ticket: (rank, tier, cost, seq).
+
+        Tickets sharing rank and tier form one fair-share group.
+        """
+        if ticket.priority == GenerationPriority.INTERACTIVE:
+            return (0, 0, 0, ticket.seq)
+        rank = PRIORITY_RANKS[ticket.priority] - int((now - ticket.enqueued_at) // self.aging_seconds)
+        if rank <= 0:
+            return (0, 1, 0, ticket.seq)
+        return (rank, 1, ticket.cost, ticket.seq)
+
+    def _next_ticket(self, now: float) -> _Ticket:
+        """Pick the next ticket: the most urgent group, then the owner whose turn it is, then that owner's first ticket."""
+        keys = [(self._order(ticket, now), ticket) for ticket in self._waiting]
+        group = min(key for key, _ in keys)[:2]
+
+        heads: Dict[Hashable, Tuple[Tuple, _Ticket]] = {}
+        for key, ticket in keys:
+            if key[:2] == group and (ticket.owner not in heads or key < heads[ticket.owner][0]):
+                heads[ticket.owner] = (key, ticket)
+
+        # Interactive and aged tickets take turns one request at a time, the others by prompt size
+        cost: Callable[[_Ticket], int] = (lambda ticket: ticket.cost) if group[0] > 0 else (lambda ticket: 1)
+        quantum = self.quantum if group[0] > 0 else 1
+        fair_share = self._fair_shares.setdefault(group, _FairShare())
+        owner = fair_share.next_owner({owner: cost(ticket) for owner, (_, ticket) in heads.items()}, quantum)
+        return heads[owner][1]
+
+    def _release(self):
+        self._busy -= 1
+        now = time.monotonic()
+        while self._busy < self.slots and self._waiting:
+            ticket = self._next_ticket(now)
+            self._waiting.remove(ticket)
+            self._stats[ticket.priority].queued -= 1
+            self._busy += 1
+            ticket.granted.set_result(None)
+
+
+# Shared scheduler of every generation this process sends to Ollama
+generation_scheduler = GenerationScheduler()
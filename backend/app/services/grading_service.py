@@ -0,0 +1,295 @@
+import logging
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import func
+from sqlalchemy.orm import Session, undefer_group
+from app.database import crud
+from app.models.collection import Collection
+from app.models.combination import Combination
+from app.models.llm_response import LLMResponse
+from app.models.question import Question
+from app.models.student_answer import StudentAnswer
+from app.schemas.evaluation_schema import GradingMode
+from app.schemas.llm_response_schema import LLMResponseCreate, LLMResponseResponse
+from app.schemas.scheduler_schema import GenerationPriority
+from app.services.fingerprint_service import FingerprintService
+from app.services.generation_scheduler import generation_scheduler
+from app.services.ollama_service import OllamaService
+from app.services.single_flight import advisory_lock, grading_flights
+
+# Extraction confidences that send a grade to the cascade model
+ESCALATION_CONFIDENCES = ("low", "very low")
+
+# Grade-only mode: the model is asked for the number alone and may decode at most this many tokens
+GRADE_ONLY_NUM_PREDICT = int(os.getenv("GRADE_ONLY_NUM_PREDICT", "16"))
+GRADE_ONLY_INSTRUCTION = "\n\nRespond with only the numeric grade between 0.0 and 1.0, in the form \"Grade: X.X\". Do not explain."
+
+# Appended to the grading prompt when the feedback of a grade-only response is first requested
+FEEDBACK_INSTRUCTION = "\n\nThe student's answer was graded {grade}. Briefly explain this grade to the student."
+
+class GradingService:
+    """Service for grading student answers with the LLM of their collection's combination."""
+
+    @staticmethod
+    async def grade_student_answer(
+        db: Session, student_answer_id: int, priority: str = GenerationPriority.INTERACTIVE
+    ) -> LLMResponseResponse:
+        """
+        Grade a student's answer and store the LLM response.
+
+        In grade-only mode only the grade is generated; the feedback is generated the first
+        time it is requested (see generate_feedback).
+
+        Concurrent requests to grade the same answer with the same combination version and
+        prompt share one generation: in this process they wait for the first request's
+        response, and across workers a PostgreSQL advisory lock lets a waiting worker reuse
+        the response stored by the worker that held it.
+
+        Generations are scheduled in the fair share of the collection's owner; an
+        interactive request from an owner with too many pending generations raises
+        AdmissionRejected.
+
+        Args:
+            db: Database session
+            student_answer_id: ID of the student answer to grade
+            priority: Scheduling class of the generations
+
+        Returns:
+            The stored LLM response with the grade and feedback
+        """
+        student_answer, question, combination = GradingService.load_context(db, student_answer_id)
+        prompt = GradingService.render_prompt(combination, question.text, question.model_answer, student_answer.answer)
+        prompt_hash = FingerprintService.prompt_hash(prompt)
+        key = (
+            student_answer_id,
+            combination.id if combination else None,
+            combination.version if combination else None,
+            prompt_hash
+        )
+        owner = GradingService._owner(db, question)
+
+        # Joining a grade that is already in flight adds no load
+        if priority == GenerationPriority.INTERACTIVE and not grading_flights.is_running(key):
+            generation_scheduler.check_admission(owner)
+
+        llm_response, shared = await grading_flights.do(
+            key, lambda: GradingService._grade_exclusive(db, student_answer_id, combination, prompt, key, priority, owner)
+        )
+        if shared:
+            logging.getLogger(__name__).info(f"Reused the in-flight grade of student answer ID {student_answer_id}")
+        return llm_response
+
+    @staticmethod
+    async def _grade_exclusive(
+        db: Session, student_answer_id: int, combination: Optional[Combination], prompt: str, key: Tuple,
+        priority: str, owner: Optional[int]
+    ) -> LLMResponseResponse:
+        """Grade an answer under the cross-worker lock of its key, reusing a grade stored while waiting."""
+        latest_id = db.query(func.max(LLMResponse.id)).filter(LLMResponse.student_answer_id == student_answer_id).scalar() or 0
+
+        async with advisory_lock(db, ("grade",) + key) as waited:
+            if waited:
+                existing = db.query(LLMResponse).options(undefer_group("llm_output")).filter(
+                    LLMResponse.student_answer_id == student_answer_id,
+                    LLMResponse.id > latest_id,
+                    LLMResponse.combination_id == key[1],
+                    LLMResponse.combination_version == key[2],
+                    LLMResponse.prompt_hash == key[3]
+                ).order_by(LLMResponse.id.desc()).first()
+                if existing:
+                    logging.getLogger(__name__).info(
+                        f"Reused the grade another worker stored for student answer ID {student_answer_id}"
+                    )
+                    return LLMResponseResponse.model_validate(existing)
+
+            return await GradingService._grade(db, student_answer_id, combination, prompt, priority, owner)
+
+    @staticmethod
+    async def _grade(
+        db: Session, student_answer_id: int, combination: Optional[Combination], prompt: str,
+        priority: str, owner: Optional[int]
+    ) -> LLMResponseResponse:
+        """Generate, extract and store the grade of an answer."""
+        logger = logging.getLogger(__name__)
+
+        # Initialize Ollama service with custom model (if available)
+        ollama_service = OllamaService(
+            model_name=combination.model_name if combination else None, priority=priority, owner=owner
+        )
+        logger.info(f"Using model: {ollama_service.model_name}")
+
+        grading_mode = GradingService._grading_mode(combination)
+        options = {"num_predict": GRADE_ONLY_NUM_PREDICT} if grading_mode == GradingMode.GRADE_ONLY else None
+
+        # Fingerprint of this grade, taken before generation so a concurrent edit marks it stale
+        model_digest = await FingerprintService.model_digest(ollama_service.model_name)
+
+        # Generate response
+        logger.info(f"Generating response for student answer ID {student_answer_id}")
+        escalation_path = []
+        response_text, grade, confidence, feedback = await GradingService._grade_with_model(
+            ollama_service, prompt, escalation_path, options
+        )
+
+        # Escalate answers the first model is unsure about to the cascade model
+        escalated = False
+        if combination and combination.cascade_model_name and GradingService.should_escalate(combination, grade, confidence):
+            logger.info(
+                f"Escalating student answer ID {student_answer_id} to {combination.cascade_model_name} "
+                f"(grade {grade}, confidence {confidence})"
+            )
+            ollama_service = OllamaService(model_name=combination.cascade_model_name, priority=priority, owner=owner)
+            response_text, grade, confidence, feedback = await GradingService._grade_with_model(
+                ollama_service, prompt, escalation_path, options
+            )
+            escalated = True
+
+        logger.info(f"Grade extracted: {grade}, confidence: {confidence}")
+
+        # Create LLM response record
+        llm_response_create = LLMResponseCreate(
+            raw_response=response_text,
+            grade=grade,
+            feedback=feedback if grading_mode == GradingMode.FULL else None,
+            student_answer_id=student_answer_id,
+            extractor_version=ollama_service.extractor_version,
+            model_name=ollama_service.model_name,
+            confidence=confidence,
+            combination_id=combination.id if combination else None,
+            escalated=escalated,
+            escalation_path=escalation_path,
+            grading_mode=grading_mode,
+            combination_version=combination.version if combination else None,
+            model_digest=model_digest,
+            prompt_hash=FingerprintService.prompt_hash(prompt)
+        )
+
+        return crud.create_llm_response(db=db, llm_response=llm_response_create)
+
+    @staticmethod
+    async def generate_feedback(db: Session, student_answer_id: int) -> LLMResponseResponse:
+        """
+        Get the latest grade of a student answer with its feedback, generating the feedback
+        of a grade-only response on first request and caching it on the response.
+
+        Args:
+            db: Database session
+            student_answer_id: ID of the student answer
+
+        Returns:
+            The latest LLM response with its feedback
+        """
+        llm_response = db.query(LLMResponse).options(undefer_group("llm_output")).filter(
+            LLMResponse.student_answer_id == student_answer_id
+        ).order_by(LLMResponse.timestamp.desc()).first()
+        if not llm_response:
+            raise ValueError(f"No grades found for student answer {student_answer_id}")
+
+        if llm_response.feedback is not None or llm_response.grading_mode != GradingMode.GRADE_ONLY:
+            return LLMResponseResponse.model_validate(llm_response)
+
+        student_answer, question, combination = GradingService.load_context(db, student_answer_id)
+        owner = GradingService._owner(db, question)
+        generation_scheduler.check_admission(owner)
+
+        # The model that produced the grade explains it
+        ollama_service = OllamaService(model_name=llm_response.model_name, owner=owner)
+        prompt = GradingService._build_prompt(combination, question.text, question.model_answer, student_answer.answer)
+        prompt += FEEDBACK_INSTRUCTION.format(grade=llm_response.grade)
+
+        logging.getLogger(__name__).info(f"Generating feedback for student answer ID {student_answer_id}")
+        response_text = await ollama_service.generate_response(prompt)
+        if not response_text:
+            raise RuntimeError("Failed to generate feedback")
+
+        _, _, llm_response.feedback = ollama_service.extract(response_text)
+        db.commit()
+        db.refresh(llm_response)
+        return LLMResponseResponse.model_validate(llm_response)
+
+    @staticmethod
+    def should_escalate(combination: Combination, grade: float, confidence: str) -> bool:
+        """Check if a grade from the first model of a cascade needs the cascade model."""
+        if confidence in ESCALATION_CONFIDENCES:
+            return True
+        if combination.cascade_band_low is not None and combination.cascade_band_high is not None:
+            return combination.cascade_band_low <= grade <= combination.cascade_band_high
+        return False
+
+    @staticmethod
+    def _owner(db: Session, question: Question) -> Optional[int]:
+        """User whose fair share the generations for a question's answers count against."""
+        return db.query(Collection.user_id).filter(Collection.id == question.collection_id).scalar()
+
+    @staticmethod
+    def load_context(db: Session, student_answer_id: int) -> Tuple[StudentAnswer, Question, Optional[Combination]]:
+        """Get a student answer with its question and the combination of its collection, if any."""
+        # Get student answer
+        student_answer = crud.get_student_answer(db=db, student_answer_id=student_answer_id)
+
+        # Get question and its associated collection
+        question = crud.get_question(db=db, question_id=student_answer.question_id)
+        collection = db.query(Collection).filter(Collection.id == question.collection_id).first()
+
+        # Check if collection has an associated combination
+        combination = None
+        if collection and collection.combination_id:
+            combination = db.query(Combination).filter(Combination.id == collection.combination_id).first()
+
+        return student_answer, question, combination
+
+    @staticmethod
+    def render_prompt(combination: Optional[Combination], question: str, model_answer: str, student_answer: str) -> str:
+        """Render the exact prompt an answer is graded with."""
+        prompt = GradingService._build_prompt(combination, question, model_answer, student_answer)
+        if GradingService._grading_mode(combination) == GradingMode.GRADE_ONLY:
+            prompt += GRADE_ONLY_INSTRUCTION
+        return prompt
+
+    @staticmethod
+    def _grading_mode(combination: Optional[Combination]) -> str:
+        return combination.grading_mode if combination and combination.grading_mode else GradingMode.FULL
+
+    @staticmethod
+    def _build_prompt(combination: Optional[Combination], question: str, model_answer: str, student_answer: str) -> str:
+        """Create the grading prompt - either the combination's custom prompt or the default one."""
+        if combination and combination.prompt:
+            # Replace placeholders in custom prompt with actual values
+            prompt = combination.prompt.replace("{{question}}", question)
+            prompt = prompt.replace("{{model_answer}}", model_answer)
+            return prompt.replace("{{student_answer}}", student_answer)
+
+        # Use the default prompt format
+        return OllamaService.create_grading_prompt(
+            question=question,
+            model_answer=model_answer,
+            student_answer=student_answer
+        )
+
+    @staticmethod
+    async def _grade_with_model(
+        ollama_service: OllamaService, prompt: str, escalation_path: List[Dict], options: Optional[Dict] = None
+    ) -> Tuple[str, float, str, str]:
+        """Generate and extract a grade with one model, recording the step in the escalation path."""
+        # Ensure model is downloaded - note that the UI should use the streaming endpoint to show progress
+        if not await ollama_service.check_model_exists():
+            logging.getLogger(__name__).info(f"Model {ollama_service.model_name} not found, downloading...")
+            await ollama_service.download_model()
+
+        start_time = time.time()
+        response_text = await ollama_service.generate_response(prompt, options=options)
+        response_time = time.time() - start_time
+
+        if not response_text:
+            raise RuntimeError("Failed to generate LLM response")
+
+        # Extract grade and feedback
+        grade, confidence, feedback = ollama_service.extract(response_text)
+        escalation_path.append({
+            "model_name": ollama_service.model_name,
+            "grade": grade,
+            "confidence": confidence,
+            "response_time": response_time
+        })
+        return response_text, grade, confidence, feedback
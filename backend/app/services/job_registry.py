@@ -0,0 +1,61 @@
+import asyncio
+import logging
+from typing import Awaitable, Dict, Hashable
+
+class JobRegistry:
+    """
+    Tracks the long running background jobs of this process (test runs, grading batches)
+    so they can be cancelled cooperatively.
+
+    Cancelling a job cancels its asyncio task, which aborts any in-flight Ollama request
+    at its current await point. Jobs are expected to catch asyncio.CancelledError, persist
+    the work they already produced, and re-raise.
+    """
+
+    def __init__(self):
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+        self.logger = logging.getLogger(__name__)
+
+    def start(self, key: Hashable, job: Awaitable) -> asyncio.Task:
+        """Start a job in the background under the given key."""
+        if self.is_running(key):
+            raise ValueError(f"Job {key} is already running")
+        task = asyncio.create_task(job)
+        self._tasks[key] = task
+        task.add_done_callback(lambda _: self._forget(key, task))
+        return task
+
+    def is_running(self, key: Hashable) -> bool:
+        """Check if a job is currently running in this process."""
+        task = self._tasks.get(key)
+        return task is not None and not task.done()
+
+    def cancel(self, key: Hashable) -> bool:
+        """Request cancellation of a job. Returns False if it is not running in this process."""
+        task = self._tasks.get(key)
+        if task is None or task.done():
+            return False
+        self.logger.info(f"Cancelling job {key}")
+        task.cancel()
+        return True
+
+    async def cancel_and_wait(self, key: Hashable, timeout: float = 10.0) -> bool:
+        """Cancel a job and wait until it has persisted its partial results and stopped."""
+        task = self._tasks.get(key)
+        if not self.cancel(key):
+            return False
+        try:
+            await asyncio.wait_for(asyncio.shield(task), timeout)
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            pass
+        except Exception as e:
+            self.logger.error(f"Job {key} failed while cancelling: {e}")
+        return True
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+
+
+# Shared registry for every background job of this process
+job_registry = JobRegistry()
@@ -0,0 +1,110 @@
+import re
+from typing import List, Sequence, Tuple
+import numpy as np
+
+# Word unigrams and bigrams are the terms compared between an answer and its model answer
+_WORD = re.compile(r"\w+")
+NGRAM_RANGE = (1, 2)
+
+class LexicalScoringService:
+    """
+    Service for instant provisional scores from the lexical similarity of an answer to its model answer.
+
+    Answers and model answers are turned into TF-IDF vectors of word n-grams, with the
+    document frequencies taken over the whole upload, and every answer is scored with the
+    cosine similarity to the model answer of its question. The term matrix is kept sparse
+    as coordinate arrays, so the scores of a whole collection come out of a few vectorized
+    NumPy operations.
+    """
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Case- and whitespace-insensitive form of a text, used for exact matches."""
+        return " ".join(_WORD.findall(text.lower()))
+
+    @staticmethod
+    def terms(text: str) -> List[str]:
+        """Word n-grams of a text."""
+        words = _WORD.findall(text.lower())
+        terms = []
+        for n in range(NGRAM_RANGE[0], NGRAM_RANGE[1] + 1):
+            terms.extend(" ".join(words[i:i + n]) for i in range(len(words) - n + 1))
+        return terms
+
+    @staticmethod
+    def score(pairs: Sequence[Tuple[str, str]]) -> np.ndarray:
+        """
+        Score answers against their model answers.
+
+        Args:
+            pairs: (answer, model_answer) tuples
+
+        Returns:
+            Array of cosine similarities in [0, 1], one per pair; exact matches score 1.0
+        """
+        answer_count = len(pairs)
+        if answer_count == 0:
+            return np.zeros(0)
+
+        # Documents 0..answer_count-1 are the answers, followed by each distinct model answer once
+        model_docs = {}
+        targets = np.empty(answer_count, dtype=np.int64)
+        documents = [answer for answer, _ in pairs]
+        for i, (_, model_answer) in enumerate(pairs):
+            if model_answer not in model_docs:
+                model_docs[model_answer] = answer_count + len(model_docs)
+                documents.append(model_answer)
+            targets[i] = model_docs[model_answer]
+
+        # Sparse term counts as (document, term) coordinates
+        vocabulary = {}
+        doc_index = []
+        term_index = []
+        for doc, text in enumerate(documents):
+            for term in LexicalScoringService.terms(text):
+                doc_index.append(doc)
+                term_index.append(vocabulary.setdefault(term, len(vocabulary)))
+
+        scores = np.zeros(answer_count)
+        if vocabulary:
+            scores = LexicalScoringService._cosine(
+                np.array(doc_index, dtype=np.int64),
+                np.array(term_index, dtype=np.int64),
+                len(documents),
+                len(vocabulary),
+                targets
+            )
+
+        # Identical texts match regardless of tokenization and floating point; two blank texts do not
+        normalized = [
+            (LexicalScoringService.normalize(answer), LexicalScoringService.normalize(model_answer))
+            for answer, model_answer in pairs
+        ]
+        exact = np.array([bool(answer) and answer == model_answer for answer, model_answer in normalized], dtype=bool)
+        scores[exact] = 1.0
+        return np.clip(scores, 0.0, 1.0)
+
+    @staticmethod
+    def _cosine(doc_index: np.ndarray, term_index: np.ndarray, doc_count: int, term_count: int, targets: np.ndarray) -> np.ndarray:
+        """Cosine similarity of every answer document to its target document, from sparse coordinates."""
+        # Collapse repeated terms into counts; keys come back sorted by (document, term)
+        keys, counts = np.unique(doc_index * term_count + term_index, return_counts=True)
+        docs = keys // term_count
+        terms = keys % term_count
+
+        # Smoothed IDF, as in scikit-learn's TfidfVectorizer
+        document_frequency = np.bincount(terms, minlength=term_count)
+        idf = np.log((1 + doc_count) / (1 + document_frequency)) + 1
+        weights = counts * idf[terms]
+        norms = np.sqrt(np.bincount(docs, weights=weights ** 2, minlength=doc_count))
+        weights = weights / np.where(norms > 0, norms, 1)[docs]
+
+        # Dot products: look every answer term up in its target document's sorted keys
+        answer_count = len(targets)
+        is_answer = docs < answer_count
+        answer_docs = docs[is_answer]
+        lookup = targets[answer_docs] * term_count + terms[is_answer]
+        positions = np.minimum(np.searchsorted(keys, lookup), len(keys) - 1)
+        matched = keys[positions] == lookup
+        products = np.where(matched, weights[is_answer] * weights[positions], 0.0)
+        return np.bincount(answer_docs, weights=products, minlength=answer_count)
@@ -0,0 +1,227 @@
+import numpy as np
+from typing import Dict, List, Optional
+from sqlalchemy.orm import Session
+from app.models.test import TestResult, TestSummary
+
+# Confidence levels reported by OllamaService.extract_grade
+CONFIDENCE_LEVELS = ["high", "medium", "low", "very low"]
+
+# Grades are binned to steps of 1 / KAPPA_STEPS for the quadratic weighted kappa
+KAPPA_STEPS = 10
+
+class MetricsService:
+    """Vectorized agreement and latency metrics for test results, grouped by (model, prompt)."""
+
+    @staticmethod
+    def compute_metrics(
+        model_names: np.ndarray,
+        prompt_ids: np.ndarray,
+        model_grades: np.ndarray,
+        extracted_grades: np.ndarray,
+        response_times: np.ndarray,
+        confidences: np.ndarray
+    ) -> List[Dict]:
+        """
+        Compute the metrics of every (model, prompt) group in one pass over columnar arrays.
+
+        Args:
+            model_names: Model name of each result
+            prompt_ids: Prompt ID of each result
+            model_grades: Reference grade of each result
+            extracted_grades: Grade extracted from the LLM response of each result
+            response_times: Response time in seconds of each result
+            confidences: Extraction confidence of each result (None when unknown)
+
+        Returns:
+            List of metric dicts, one per (model, prompt) group
+        """
+        if len(model_names) == 0:
+            return []
+
+        # Dense group code per (model, prompt)
+        model_keys, model_codes = np.unique(model_names.astype(str), return_inverse=True)
+        prompt_keys, prompt_codes = np.unique(prompt_ids.astype(np.int64), return_inverse=True)
+        pair_codes, groups = np.unique(model_codes * len(prompt_keys) + prompt_codes, return_inverse=True)
+        group_count = len(pair_codes)
+
+        truth = model_grades.astype(np.float64)
+        predicted = extracted_grades.astype(np.float64)
+        latency = response_times.astype(np.float64)
+
+        counts = np.bincount(groups, minlength=group_count).astype(np.float64)
+        errors = predicted - truth
+        absolute_errors = np.abs(errors)
+
+        mae = np.bincount(groups, absolute_errors, group_count) / counts
+        rmse = np.sqrt(np.bincount(groups, errors ** 2, group_count) / counts)
+        average_accuracy = np.bincount(groups, 1 - np.minimum(1.0, absolute_errors), group_count) / counts
+        exact_agreement = np.bincount(groups, absolute_errors < 1e-9, group_count) / counts
+        average_response_time = np.bincount(groups, latency, group_count) / counts
+
+        pearson = MetricsService._grouped_pearson(groups, group_count, counts, truth, predicted)
+        spearman = MetricsService._grouped_pearson(
+            groups, group_count, counts,
+            MetricsService._grouped_ranks(groups, truth),
+            MetricsService._grouped_ranks(groups, predicted)
+        )
+        kappa = MetricsService._grouped_quadratic_kappa(groups, group_count, truth, predicted)
+        latency_percentiles = MetricsService._grouped_percentiles(groups, group_count, counts, latency, [0.5, 0.95, 0.99])
+
+        # Confidence breakdown; unknown confidences are not counted
+        confidence_codes = np.array(
+            [CONFIDENCE_LEVELS.index(c) if c in CONFIDENCE_LEVELS else -1 for c in confidences],
+            dtype=np.int64
+        )
+        known = confidence_codes >= 0
+        confidence_counts = np.bincount(
+            groups[known] * len(CONFIDENCE_LEVELS) + confidence_codes[known],
+            minlength=group_count * len(CONFIDENCE_LEVELS)
+        ).reshape(group_count, len(CONFIDENCE_LEVELS))
+
+        metrics = []
+        for g, pair_code in enumerate(pair_codes):
+            metrics.append({
+                "model_name": str(model_keys[pair_code // len(prompt_keys)]),
+                "prompt_id": int(prompt_keys[pair_code % len(prompt_keys)]),
+                "total_questions": int(counts[g]),
+                "average_accuracy": float(average_accuracy[g]),
+                "average_response_time": float(average_response_time[g]),
+                "mae": float(mae[g]),
+                "rmse": float(rmse[g]),
+                "pearson": _optional_float(pearson[g]),
+                "spearman": _optional_float(spearman[g]),
+                "quadratic_weighted_kappa": _optional_float(kappa[g]),
+                "exact_agreement": float(exact_agreement[g]),
+                "latency_p50": float(latency_percentiles[0][g]),
+                "latency_p95": float(latency_percentiles[1][g]),
+                "latency_p99": float(latency_percentiles[2][g]),
+                "confidence_breakdown": {
+                    level: int(confidence_counts[g, i]) for i, level in enumerate(CONFIDENCE_LEVELS)
+                }
+            })
+        return metrics
+
+    @staticmethod
+    def summarize_test(db: Session, test_id: int, model_name: str = None, prompt_id: int = None) -> List[TestSummary]:
+        """
+        Recompute and store the summaries of a test from its stored results.
+
+        Args:
+            db: Database session
+            test_id: ID of the test
+            model_name: Only summarize this model (all models if None)
+            prompt_id: Only summarize this prompt (all prompts if None)
+
+        Returns:
+            The stored summaries; those of results archived since are kept as they are
+        """
+        query = db.query(
+            TestResult.model_name,
+            TestResult.prompt_id,
+            TestResult.model_grade,
+            TestResult.extracted_grade,
+            TestResult.response_time,
+            TestResult.confidence
+        ).filter(TestResult.test_id == test_id)
+        summary_query = db.query(TestSummary).filter(TestSummary.test_id == test_id)
+        if model_name is not None:
+            query = query.filter(TestResult.model_name == model_name)
+            summary_query = summary_query.filter(TestSummary.model_name == model_name)
+        if prompt_id is not None:
+            query = query.filter(TestResult.prompt_id == prompt_id)
+            summary_query = summary_query.filter(TestSummary.prompt_id == prompt_id)
+
+        rows = query.all()
+        if not rows:
+            return summary_query.all()
+        columns = list(zip(*rows))
+        metrics = MetricsService.compute_metrics(
+            model_names=np.array(columns[0], dtype=object),
+            prompt_ids=np.array(columns[1], dtype=np.int64),
+            model_grades=np.array(columns[2], dtype=np.float64),
+            extracted_grades=np.array(columns[3], dtype=np.float64),
+            response_times=np.array(columns[4], dtype=np.float64),
+            confidences=np.array(columns[5], dtype=object)
+        )
+
+        summary_query.delete(synchronize_session=False)
+        summaries = [TestSummary(test_id=test_id, **group_metrics) for group_metrics in metrics]
+        db.add_all(summaries)
+        db.commit()
+        return summaries
+
+    @staticmethod
+    def _grouped_pearson(groups, group_count, counts, x, y) -> np.ndarray:
+        """Pearson correlation of x and y within each group (NaN when a group has no variance)."""
+        sum_x = np.bincount(groups, x, group_count)
+        sum_y = np.bincount(groups, y, group_count)
+        covariance = np.bincount(groups, x * y, group_count) - sum_x * sum_y / counts
+        variance_x = np.bincount(groups, x * x, group_count) - sum_x ** 2 / counts
+        variance_y = np.bincount(groups, y * y, group_count) - sum_y ** 2 / counts
+        denominator = np.sqrt(variance_x * variance_y)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(denominator > 1e-12, covariance / denominator, np.nan)
+
+    @staticmethod
+    def _grouped_ranks(groups, values) -> np.ndarray:
+        """Rank values within each group, giving ties their average rank."""
+        order = np.lexsort((values, groups))
+        sorted_groups = groups[order]
+        sorted_values = values[order]
+
+        # Position of every element within its group
+        group_starts = np.r_[0, np.flatnonzero(np.diff(sorted_groups)) + 1]
+        group_lengths = np.diff(np.r_[group_starts, len(order)])
+        positions = np.arange(len(order)) - np.repeat(group_starts, group_lengths)
+
+        # Runs of equal values within a group share the mean position of the run
+        new_run = np.r_[True, (np.diff(sorted_groups) != 0) | (np.diff(sorted_values) != 0)]
+        run_ids = np.cumsum(new_run) - 1
+        run_ranks = np.bincount(run_ids, positions) / np.bincount(run_ids)
+
+        ranks = np.empty(len(order), dtype=np.float64)
+        ranks[order] = run_ranks[run_ids] + 1
+        return ranks
+
+    @staticmethod
+    def _grouped_quadratic_kappa(groups, group_count, truth, predicted) -> np.ndarray:
+        """Quadratic weighted kappa within each group, on grades binned to 1 / KAPPA_STEPS."""
+        categories = KAPPA_STEPS + 1
+        truth_bins = np.rint(np.clip(truth, 0.0, 1.0) * KAPPA_STEPS).astype(np.int64)
+        predicted_bins = np.rint(np.clip(predicted, 0.0, 1.0) * KAPPA_STEPS).astype(np.int64)
+
+        observed = np.bincount(
+            (groups * categories + truth_bins) * categories + predicted_bins,
+            minlength=group_count * categories * categories
+        ).reshape(group_count, categories, categories).astype(np.float64)
+        totals = observed.sum(axis=(1, 2))
+        expected = np.einsum("gi,gj->gij", observed.sum(axis=2), observed.sum(axis=1)) / totals[:, None, None]
+
+        steps = np.arange(categories)
+        weights = (steps[:, None] - steps[None, :]) ** 2 / (categories - 1) ** 2
+        observed_disagreement = (weights * observed).sum(axis=(1, 2))
+        expected_disagreement = (weights * expected).sum(axis=(1, 2))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(expected_disagreement > 1e-12, 1 - observed_disagreement / expected_disagreement, np.nan)
+
+    @staticmethod
+    def _grouped_percentiles(groups, group_count, counts, values, quantiles) -> List[np.ndarray]:
+        """Linearly interpolated percentiles of values within each group."""
+        order = np.lexsort((values, groups))
+        sorted_values = values[order]
+        group_starts = np.r_[0, np.cumsum(counts[:-1])].astype(np.int64)
+
+        percentiles = []
+        for quantile in quantiles:
+            position = quantile * (counts - 1)
+            lower = np.floor(position).astype(np.int64)
+            upper = np.ceil(position).astype(np.int64)
+            fraction = position - lower
+            low_values = sorted_values[group_starts + lower]
+            high_values = sorted_values[group_starts + upper]
+            percentiles.append(low_values + (high_values - low_values) * fraction)
+        return percentiles
+
+
+def _optional_float(value) -> Optional[float]:
+    return None if np.isnan(value) else float(value)
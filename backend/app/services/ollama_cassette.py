@@ -0,0 +1,234 @@
+import asyncio
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+import httpx
+import orjson
+
+# Record every Ollama request to the cassette ("record"), serve them from it ("replay"),
+# or serve recorded requests and record the others ("auto"); off when unset
+OLLAMA_CASSETTE_MODE = os.getenv("OLLAMA_CASSETTE_MODE", "").lower()
+
+# Cassette file of the record and replay modes
+OLLAMA_CASSETTE_PATH = os.getenv("OLLAMA_CASSETTE_PATH", "ollama.cassette")
+
+# "original" replays responses as slowly as they were recorded; "none" replays them instantly
+OLLAMA_CASSETTE_TIMING = os.getenv("OLLAMA_CASSETTE_TIMING", "none").lower()
+
+FILE_MAGIC = b"OLLCAS01"
+
+# Request hash and compressed payload length that precede every record
+RECORD_HEADER = struct.Struct("<32sI")
+
+class CassetteMode(str):
+    """Cassette mode enum."""
+    RECORD = "record"
+    REPLAY = "replay"
+    AUTO = "auto"
+
+
+class CassetteMiss(Exception):
+    """Raised in replay mode for a request that is not on the cassette."""
+
+
+class OllamaCassette:
+    """
+    Append-only recording of Ollama requests and their responses.
+
+    A cassette file is a magic number followed by records, each a SHA-256 hash of the
+    request (method, endpoint and JSON body), the length of the payload and the payload:
+    the zlib-compressed JSON of the response status, body or streamed lines, and timing.
+    Records are only ever appended, in one write each, so several workers can record to
+    one cassette and a record cut short by a crash is ignored and overwritten.
+
+    For replay the file is memory-mapped and indexed by request hash on open; payloads
+    are only read and decompressed when requested. A request recorded several times is
+    answered with its recordings in turn, so a nondeterministic model replays exactly
+    the sequence of answers it gave.
+    """
+
+    def __init__(self, path: str, mode: str, timing: str = OLLAMA_CASSETTE_TIMING):
+        if mode not in (CassetteMode.RECORD, CassetteMode.REPLAY, CassetteMode.AUTO):
+            raise ValueError(f"Unknown cassette mode '{mode}'")
+        self.path = path
+        self.mode = mode
+        self.original_timing = timing == "original"
+        self.logger = logging.getLogger(__name__)
+        self._index: Dict[bytes, List[Tuple[int, int]]] = {}
+        self._replayed: Dict[bytes, int] = {}
+        self._mapped: Optional[mmap.mmap] = None
+        self._mapped_size = 0
+        self._indexed_size = len(FILE_MAGIC)
+        self._lock = threading.Lock()
+
+        if mode == CassetteMode.REPLAY and not os.path.exists(path):
+            raise FileNotFoundError(f"Cassette {path} does not exist")
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            with open(path, "wb") as file:
+                file.write(FILE_MAGIC)
+        with open(path, "rb") as file:
+            if file.read(len(FILE_MAGIC)) != FILE_MAGIC:
+                raise ValueError(f"{path} is not an Ollama cassette")
+        with self._lock:
+            self._refresh()
+
+        if mode != CassetteMode.REPLAY and os.path.getsize(path) > self._indexed_size:
+            # Drop a record cut short by a crash, so new records start at a record boundary
+            with open(path, "r+b") as file:
+                file.truncate(self._indexed_size)
+        self.logger.info(f"Opened cassette {path} in {mode} mode with {len(self)} recorded requests")
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._refresh()
+            return sum(len(records) for records in self._index.values())
+
+    @staticmethod
+    def request_key(method: str, endpoint: str, body) -> bytes:
+        """Hash identifying a request, independent of the Ollama host."""
+        canonical = json.dumps([method.upper(), endpoint.strip("/"), body], sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(canonical.encode("utf-8")).digest()
+
+    async def request(self, method: str, endpoint: str, body, send: Callable[[], Awaitable[httpx.Response]],
+                      url: str = "") -> httpx.Response:
+        """
+        Answer a request from the cassette, or send it and record the response.
+
+        Args:
+            method: HTTP method
+            endpoint: Ollama API endpoint, e.g. "api/generate"
+            body: JSON body of the request
+            send: Sends the request to Ollama
+            url: Full URL, set on replayed responses
+
+        Raises:
+            CassetteMiss: In replay mode, if the request was not recorded
+        """
+        key = self.request_key(method, endpoint, body)
+        if self.mode != CassetteMode.RECORD:
+            record = self._replay(key)
+            if record is not None:
+                if self.original_timing:
+                    await asyncio.sleep(record["elapsed"])
+                return httpx.Response(
+                    record["status"],
+                    content=record["content"].encode("utf-8"),
+                    headers={"content-type": "application/json"},
+                    request=httpx.Request(method, url or f"http://cassette/{endpoint}")
+                )
+            if self.mode == CassetteMode.REPLAY:
+                raise CassetteMiss(f"{method} {endpoint} is not on cassette {self.path}")
+
+        started_at = time.monotonic()
+        response = await send()
+        self._append(key, {
+            "method": method,
+            "endpoint": endpoint,
+            "request": body,
+            "status": response.status_code,
+            "content": response.content.decode("utf-8", errors="replace"),
+            "elapsed": time.monotonic() - started_at,
+        })
+        return response
+
+    async def stream(self, method: str, endpoint: str, body,
+                     send: Callable[[], AsyncIterator[Tuple[int, str]]]) -> AsyncIterator[Tuple[int, str]]:
+        """
+        Stream the lines of a response from the cassette, or stream and record them.
+
+        Args:
+            send: Streams (status code, line) pairs from Ollama
+
+        Yields:
+            Tuples of (status code, line)
+        """
+        key = self.request_key(method, endpoint, body)
+        if self.mode != CassetteMode.RECORD:
+            record = self._replay(key)
+            if record is not None:
+                previous = 0.0
+                for offset, status_code, line in record["chunks"]:
+                    if self.original_timing:
+                        await asyncio.sleep(offset - previous)
+                        previous = offset
+                    yield status_code, line
+                return
+            if self.mode == CassetteMode.REPLAY:
+                raise CassetteMiss(f"{method} {endpoint} is not on cassette {self.path}")
+
+        started_at = time.monotonic()
+        chunks = []
+        async for status_code, line in send():
+            chunks.append((time.monotonic() - started_at, status_code, line))
+            yield status_code, line
+        # Only complete streams are recorded
+        self._append(key, {
+            "method": method,
+            "endpoint": endpoint,
+            "request": body,
+            "chunks": chunks,
+            "elapsed": time.monotonic() - started_at,
+        })
+
+    def _replay(self, key: bytes) -> Optional[Dict]:
+        """The next recording of a request, or None if it was never recorded."""
+        with self._lock:
+            if key not in self._index:
+                self._refresh()
+            records = self._index.get(key)
+            if not records:
+                return None
+            turn = self._replayed.get(key, 0)
+            self._replayed[key] = turn + 1
+            offset, length = records[turn % len(records)]
+            payload = self._mapped[offset:offset + length]
+        return orjson.loads(zlib.decompress(payload))
+
+    def _append(self, key: bytes, record: Dict):
+        payload = zlib.compress(orjson.dumps(record))
+        with self._lock:
+            # One write per record: appends of other workers cannot interleave with it
+            with open(self.path, "ab") as file:
+                file.write(RECORD_HEADER.pack(key, len(payload)) + payload)
+
+    def _refresh(self):
+        """Map the cassette again and index the records appended since the last refresh."""
+        size = os.path.getsize(self.path)
+        if size == self._mapped_size:
+            return
+        with open(self.path, "rb") as file:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mapped is not None:
+            self._mapped.close()
+        self._mapped, self._mapped_size = mapped, size
+
+        offset = self._indexed_size
+        while offset + RECORD_HEADER.size <= size:
+            key, length = RECORD_HEADER.unpack_from(mapped, offset)
+            if offset + RECORD_HEADER.size + length > size:
+                break  # Incomplete record at the end
+            self._index.setdefault(key, []).append((offset + RECORD_HEADER.size, length))
+            offset += RECORD_HEADER.size + length
+        self._indexed_size = offset
+
+
+_cassette: Optional[OllamaCassette] = None
+_cassette_lock = threading.Lock()
+
+def get_cassette() -> Optional[OllamaCassette]:
+    """The cassette configured by OLLAMA_CASSETTE_MODE and OLLAMA_CASSETTE_PATH, or None if off."""
+    global _cassette
+    if not OLLAMA_CASSETTE_MODE:
+        return None
+    if _cassette is None:
+        with _cassette_lock:
+            if _cassette is None:
+                _cassette = OllamaCassette(OLLAMA_CASSETTE_PATH, OLLAMA_CASSETTE_MODE)
+    return _cassette
@@ -3,19 +3,37 @@ import json
 import logging
 import os
 import asyncio
-import re
-from typing import Dict, Optional, Tuple
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from app.schemas.scheduler_schema import GenerationPriority
+from app.services.generation_scheduler import generation_scheduler
+from app.services.ollama_cassette import get_cassette
+from app.services.grade_extraction import get_extractor, DEFAULT_EXTRACTOR_VERSION
 
 class OllamaService:
-    def __init__(self, base_url: str = None, max_retries: int = 5, initial_retry_delay: float = 1.0, model_name: str = None):
+    def __init__(self, base_url: str = None, max_retries: int = 5, initial_retry_delay: float = 1.0, model_name: str = None,
+                 priority: str = GenerationPriority.INTERACTIVE, owner: Optional[int] = None):
         self.base_url = base_url or os.environ.get("OLLAMA_URL", "http://localhost:11434")
         self.model_name = model_name or "gemma3:4b"
+        self.priority = priority  # Scheduling class of this service's generations
+        self.owner = owner  # User whose fair share the generations count against
         self.logger = logging.getLogger(__name__)
         self.max_retries = max_retries
         self.initial_retry_delay = initial_retry_delay
+        self.extractor_version = DEFAULT_EXTRACTOR_VERSION
 
     async def _make_request_with_retry(self, method: str, endpoint: str, **kwargs) -> httpx.Response:
-        """Make HTTP request with exponential backoff retry logic."""
+        """Make HTTP request with exponential backoff retry logic, through the cassette if one is configured."""
+        cassette = get_cassette()
+        if cassette is not None:
+            return await cassette.request(
+                method, endpoint, kwargs.get("json"),
+                lambda: self._send_with_retry(method, endpoint, **kwargs),
+                url=f"{self.base_url}/{endpoint}"
+            )
+        return await self._send_with_retry(method, endpoint, **kwargs)
+
+    async def _send_with_retry(self, method: str, endpoint: str, **kwargs) -> httpx.Response:
+        """Send HTTP request to Ollama with exponential backoff retry logic."""
         delay = self.initial_retry_delay
         last_exception = None
 
@@ -38,6 +56,27 @@ class OllamaService:
 
         raise last_exception or Exception("All retry attempts failed")
 
+    async def _stream_lines(self, method: str, endpoint: str, **kwargs) -> AsyncIterator[Tuple[int, str]]:
+        """
+        Stream the lines of a response, through the cassette if one is configured.
+        
+        Yields:
+            Tuples of (status code, line); a failed request yields its status code and body once
+        """
+        async def send():
+            async with httpx.AsyncClient(timeout=None) as client:  # Use no timeout for large downloads
+                async with client.stream(method, f"{self.base_url}/{endpoint}", **kwargs, timeout=None) as response:
+                    if response.status_code != 200:
+                        yield response.status_code, (await response.aread()).decode("utf-8", errors="replace")
+                        return
+                    async for line in response.aiter_lines():
+                        yield response.status_code, line
+        
+        cassette = get_cassette()
+        lines = cassette.stream(method, endpoint, kwargs.get("json"), send) if cassette is not None else send()
+        async for status_code, line in lines:
+            yield status_code, line
+
     async def check_model_exists(self, model_name: str = None) -> bool:
         """Check if the model is already downloaded."""
         model_to_check = model_name or self.model_name
@@ -54,6 +93,17 @@ class OllamaService:
             self.logger.error(f"Error checking model existence: {e}")
             return False
 
+    async def get_model_digests(self) -> Dict[str, str]:
+        """Get the digest of every downloaded model, by model name (empty if Ollama is unreachable)."""
+        try:
+            response = await self._make_request_with_retry("GET", "api/tags")
+            if response.status_code == 200:
+                return {model["name"]: model.get("digest") for model in response.json().get("models", [])}
+            return {}
+        except Exception as e:
+            self.logger.error(f"Error getting model digests: {e}")
+            return {}
+
     async def download_model(self, model_name: str = None) -> bool:
         """Download the model if it doesn't exist."""
         target_model = model_name or self.model_name
@@ -74,35 +124,28 @@ class OllamaService:
         target_model = model_name or self.model_name
         
         try:
-            async with httpx.AsyncClient(timeout=None) as client:  # Use no timeout for large downloads
-                async with client.stream(
-                    "POST",
-                    f"{self.base_url}/api/pull",
-                    json={"model": target_model, "stream": True},
-                    timeout=None
-                ) as response:
-                    if response.status_code != 200:
-                        yield {"error": f"Failed to start download: {response.text}"}
-                        return
+            async for status_code, line in self._stream_lines("POST", "api/pull", json={"model": target_model, "stream": True}):
+                if status_code != 200:
+                    yield {"error": f"Failed to start download: {line}"}
+                    return
 
-                    async for line in response.aiter_lines():
-                        if not line.strip():
-                            continue
-                            
-                        try:
-                            progress_data = json.loads(line)
-                            # Log progress data for debugging
-                            if progress_data.get("status") == "downloading":
-                                self.logger.info(f"Download progress: {progress_data.get('completed', 0)}/{progress_data.get('total', 0)} bytes for {progress_data.get('digest', 'unknown')}")
-                            else:
-                                self.logger.info(f"Status update: {progress_data.get('status')}")
-                            
-                            # Pass through unmodified progress data
-                            yield progress_data
-                        except Exception as e:
-                            self.logger.error(f"Error parsing progress data: {e}")
-                            yield {"error": f"Error parsing progress data: {str(e)}"}
-                            
+                if not line.strip():
+                    continue
+                    
+                try:
+                    progress_data = json.loads(line)
+                    # Log progress data for debugging
+                    if progress_data.get("status") == "downloading":
+                        self.logger.info(f"Download progress: {progress_data.get('completed', 0)}/{progress_data.get('total', 0)} bytes for {progress_data.get('digest', 'unknown')}")
+                    else:
+                        self.logger.info(f"Status update: {progress_data.get('status')}")
+                    
+                    # Pass through unmodified progress data
+                    yield progress_data
+                except Exception as e:
+                    self.logger.error(f"Error parsing progress data: {e}")
+                    yield {"error": f"Error parsing progress data: {str(e)}"}
+                    
         except Exception as e:
             self.logger.error(f"Error streaming download: {e}")
             yield {"error": f"Error streaming download: {str(e)}"}
@@ -122,34 +165,95 @@ class OllamaService:
             self.logger.error(f"Error getting model info: {e}")
             return None
             
-    async def generate_response(self, prompt: str) -> str:
+    async def generate_response(self, prompt: str, options: Optional[Dict] = None) -> str:
         """Generate a response from the LLM using the given prompt."""
+        response_text, _ = await self.generate_response_with_stats(prompt, options=options)
+        return response_text
+    
+    async def generate_response_with_stats(self, prompt: str, options: Optional[Dict] = None) -> Tuple[str, Dict]:
+        """
+        Generate a response from the LLM and return it with Ollama's generation statistics.
+        
+        Args:
+            prompt: Prompt to send to the model
+            options: Ollama model options for this request, e.g. {"num_predict": 16}
+            
+        Returns:
+            Tuple of (response_text, stats) where stats holds Ollama's eval_count, eval_duration
+            and related timing fields, plus queue_duration, the nanoseconds spent waiting for a
+            generation slot (empty if generation failed)
+        """
         try:
             self.logger.info(f"Generating response for prompt: {prompt[:50]}...")
             
             # Let standalone Ollama use its auto-detected GPU configuration
             # The standalone installation will have already configured the optimal hardware settings
-            response = await self._make_request_with_retry(
-                "POST",
-                "api/generate",
-                json={
-                    "model": self.model_name,
-                    "prompt": prompt,
-                    "stream": False,
-                    # The hardware detection happens at the standalone Ollama level
-                    # No need to specify GPU options here as they're auto-configured
-                }
-            )
+            payload = {
+                "model": self.model_name,
+                "prompt": prompt,
+                "stream": False,
+                # The hardware detection happens at the standalone Ollama level
+                # No need to specify GPU options here as they're auto-configured
+            }
+            if options:
+                payload["options"] = options
+            async with generation_scheduler.slot(self.priority, len(prompt), self.owner) as wait:
+                response = await self._make_request_with_retry(
+                    "POST",
+                    "api/generate",
+                    json=payload
+                )
             
             if response.status_code == 200:
                 result = response.json()
-                return result.get("response", "")
+                stats = {key: value for key, value in result.items() if key.endswith(("_count", "_duration"))}
+                stats["queue_duration"] = int(wait * 1e9)
+                return result.get("response", ""), stats
             else:
                 self.logger.error(f"Failed to generate response: {response.text}")
-                return ""
+                return "", {}
         except Exception as e:
             self.logger.error(f"Error generating response: {e}")
-            return ""
+            return "", {}
+    
+    async def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed texts with the model through Ollama's embed API.
+        
+        Args:
+            texts: Texts to embed in one request
+            
+        Returns:
+            One embedding per text, or an empty list if the request failed
+        """
+        try:
+            async with generation_scheduler.slot(self.priority, sum(len(text) for text in texts), self.owner):
+                response = await self._make_request_with_retry(
+                    "POST",
+                    "api/embed",
+                    json={"model": self.model_name, "input": texts}
+                )
+            
+            if response.status_code == 200:
+                return response.json().get("embeddings", [])
+            else:
+                self.logger.error(f"Failed to generate embeddings: {response.text}")
+                return []
+        except Exception as e:
+            self.logger.error(f"Error generating embeddings: {e}")
+            return []
+    
+    def extract(self, response: str) -> Tuple[float, str, str]:
+        """
+        Extract the grade, confidence and feedback from the model's response in one pass.
+        
+        Args:
+            response: Text response from the model
+            
+        Returns:
+            Tuple of (extracted_grade, confidence_level, feedback)
+        """
+        return get_extractor(self.extractor_version)(response)
     
     def extract_grade(self, response: str) -> Tuple[float, str]:
         """
@@ -161,34 +265,8 @@ class OllamaService:
         Returns:
             Tuple of (extracted_grade, confidence_level)
         """
-        # Try to find a grade in format "Grade: X.X" or similar
-        grade_pattern = r"(?:grade|score|rating|mark):\s*([0-9]\.[0-9]|[01])"
-        match = re.search(grade_pattern, response.lower())
-        
-        if match:
-            return float(match.group(1)), "high"
-        
-        # Try to find a standalone decimal between 0 and 1
-        decimal_pattern = r"(?<![a-zA-Z0-9])([0-9]\.[0-9]|[01])(?![0-9])"
-        matches = re.findall(decimal_pattern, response)
-        
-        if matches:
-            # If multiple matches, take the last one as it's likely the conclusion
-            return float(matches[-1]), "medium"
-        
-        # Look for numbers written as words
-        word_to_grade = {
-            "zero": 0.0, "one": 1.0, "half": 0.5,
-            "zero point five": 0.5, "point five": 0.5,
-            "0": 0.0, "1": 1.0, "0.5": 0.5
-        }
-        
-        for word, grade in word_to_grade.items():
-            if word in response.lower():
-                return grade, "low"
-        
-        # Default fallback
-        return 0.5, "very low"
+        grade, confidence, _ = get_extractor(self.extractor_version)(response)
+        return grade, confidence
     
     def extract_feedback(self, response: str) -> str:
         """
@@ -200,16 +278,11 @@ class OllamaService:
         Returns:
             Extracted feedback or empty string if none found
         """
-        # Remove the grade part if present
-        grade_pattern = r"(?:grade|score|rating|mark):\s*([0-9]\.[0-9]|[01])"
-        feedback = re.sub(grade_pattern, "", response, flags=re.IGNORECASE)
-        
-        # Clean up the feedback
-        feedback = feedback.strip()
-        
+        _, _, feedback = get_extractor(self.extractor_version)(response)
         return feedback
     
-    def create_grading_prompt(self, question: str, model_answer: str, student_answer: str) -> str:
+    @staticmethod
+    def create_grading_prompt(question: str, model_answer: str, student_answer: str) -> str:
         """
         Create a prompt for the model to grade a student's answer.
         
@@ -0,0 +1,90 @@
+import math
+from typing import Dict, List, Optional, Tuple
+
+class PairStatistics:
+    """Running accuracy statistics of one (model, prompt) pair."""
+
+    def __init__(self, count: int, accuracy_sum: float, accuracy_square_sum: float):
+        self.count = count
+        self.accuracy_sum = accuracy_sum
+        self.accuracy_square_sum = accuracy_square_sum
+
+    @property
+    def mean(self) -> float:
+        return self.accuracy_sum / self.count if self.count else 0.0
+
+    @property
+    def variance(self) -> float:
+        if self.count < 2:
+            return 0.25  # Largest possible variance of a value in [0, 1]
+        return max(0.0, (self.accuracy_square_sum - self.accuracy_sum ** 2 / self.count) / (self.count - 1))
+
+
+class RacingService:
+    """
+    Successive elimination ("racing") of the (model, prompt) pairs of an adaptive test.
+
+    Accuracies lie in [0, 1], so every pair gets an empirical Bernstein confidence
+    interval, which stays valid for any distribution and narrows quickly for pairs whose
+    accuracy varies little. The failure probability is split over the pairs (union bound),
+    so all intervals hold together with the requested confidence. A pair is eliminated
+    once its upper bound falls below the lower bound of the current leader.
+    """
+
+    @staticmethod
+    def confidence_interval(stats: PairStatistics, confidence: float, pair_count: int) -> Tuple[float, float]:
+        """
+        Empirical Bernstein confidence interval of a pair's mean accuracy.
+
+        Args:
+            stats: Statistics of the pair
+            confidence: Probability that the intervals of all pairs hold together
+            pair_count: Number of pairs raced against each other
+
+        Returns:
+            Tuple of (lower_bound, upper_bound), clipped to [0, 1]
+        """
+        if stats.count == 0:
+            return 0.0, 1.0
+        delta = (1 - confidence) / max(pair_count, 1)
+        log_term = math.log(3 / delta)
+        radius = math.sqrt(2 * stats.variance * log_term / stats.count) + 3 * log_term / stats.count
+        return max(0.0, stats.mean - radius), min(1.0, stats.mean + radius)
+
+    @staticmethod
+    def select_eliminated(
+        stats: Dict[Tuple[str, int], PairStatistics],
+        active: List[Tuple[str, int]],
+        confidence: float,
+        min_rows: int
+    ) -> Tuple[List[Tuple[str, int]], Dict[Tuple[str, int], Tuple[float, float]]]:
+        """
+        Select the active pairs that are clearly beaten by the leader.
+
+        Args:
+            stats: Statistics of every pair of the test, including finished ones
+            active: Pairs that are still being evaluated
+            confidence: Stopping confidence of the test
+            min_rows: Rows a pair must have before it can lead or be eliminated
+
+        Returns:
+            Tuple of (eliminated pairs, confidence interval of every pair)
+        """
+        bounds = {
+            pair: RacingService.confidence_interval(pair_stats, confidence, len(stats))
+            for pair, pair_stats in stats.items()
+        }
+
+        # The leader is the pair with the best guaranteed accuracy
+        leader_lower: Optional[float] = None
+        for pair, pair_stats in stats.items():
+            if pair_stats.count >= min_rows and (leader_lower is None or bounds[pair][0] > leader_lower):
+                leader_lower = bounds[pair][0]
+        if leader_lower is None:
+            return [], bounds
+
+        eliminated = [
+            pair for pair in active
+            if pair in stats and stats[pair].count >= min_rows and bounds[pair][1] < leader_lower
+        ]
+        return eliminated, bounds
@@ -0,0 +1,185 @@
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from app.models.llm_response import LLMResponse
+from app.models.question import Question
+from app.models.student_answer import StudentAnswer
+from app.models.test import TestResult
+from app.schemas.evaluation_schema import GradingMode
+from app.schemas.llm_response_schema import GradeProvenance
+from app.services.grade_extraction import extract_batch, get_extractor
+from app.services.metrics_service import MetricsService
+
+# Stored responses fetched from the database per round trip
+REEXTRACTION_CHUNK_SIZE = int(os.getenv("REEXTRACTION_CHUNK_SIZE", "2000"))
+
+# Worker processes used for extraction; below PARALLEL_MIN_ROWS rows per chunk extraction stays in-process
+REEXTRACTION_WORKERS = int(os.getenv("REEXTRACTION_WORKERS", str(os.cpu_count() or 1)))
+PARALLEL_MIN_ROWS = 500
+
+class ReextractionService:
+    """
+    Service for re-running grade extraction over stored LLM responses without calling the LLM.
+
+    Responses are streamed from the database in chunks by ID, extracted in a process pool,
+    and written back either over the live grade columns ("rewrite") or into the shadow
+    columns ("shadow") so a new extractor can be compared with the current one.
+    """
+
+    MODES = ("rewrite", "shadow")
+
+    @staticmethod
+    def reextract_test_results(db: Session, test_id: int, extractor_version: str, mode: str,
+                               on_progress: Optional[Callable[[Dict], None]] = None) -> Dict:
+        """
+        Re-extract the grades of a test's stored results.
+
+        In rewrite mode extracted grades, confidences and accuracies are replaced and the
+        test summaries are recomputed. In shadow mode only the shadow columns are written.
+
+        Args:
+            on_progress: Called with the statistics after each chunk is written
+
+        Returns:
+            Dict with processing statistics
+        """
+        ReextractionService.validate(extractor_version, mode)
+        logger = logging.getLogger(__name__)
+        stats = {"processed": 0, "changed": 0, "extractor_version": extractor_version, "mode": mode}
+
+        with ReextractionService._executor() as executor:
+            for chunk in ReextractionService._chunks(
+                db,
+                db.query(TestResult.id, TestResult.full_response, TestResult.model_grade, TestResult.extracted_grade)
+                .filter(TestResult.test_id == test_id),
+                TestResult.id
+            ):
+                extracted = ReextractionService._extract(executor, extractor_version, [row.full_response for row in chunk])
+
+                updates = []
+                for row, (grade, confidence, _) in zip(chunk, extracted):
+                    if grade != row.extracted_grade:
+                        stats["changed"] += 1
+                    if mode == "rewrite":
+                        updates.append({
+                            "id": row.id,
+                            "extracted_grade": grade,
+                            "confidence": confidence,
+                            "accuracy": 1 - min(1.0, abs(grade - row.model_grade)),
+                            "extractor_version": extractor_version
+                        })
+                    else:
+                        updates.append({
+                            "id": row.id,
+                            "shadow_extracted_grade": grade,
+                            "shadow_extractor_version": extractor_version
+                        })
+
+                db.execute(update(TestResult), updates)
+                db.commit()
+                stats["processed"] += len(chunk)
+                logger.info(f"Re-extracted {stats['processed']} results of test {test_id}")
+                if on_progress:
+                    on_progress(stats)
+
+        if mode == "rewrite" and stats["processed"]:
+            MetricsService.summarize_test(db, test_id)
+
+        return stats
+
+    @staticmethod
+    def reextract_llm_responses(db: Session, extractor_version: str, mode: str, collection_id: Optional[int] = None,
+                                on_progress: Optional[Callable[[Dict], None]] = None) -> Dict:
+        """
+        Re-extract the grades and feedback of stored grading responses.
+
+        Only responses generated by the LLM are re-extracted; lexical and cluster grades
+        have no response to extract from. In rewrite mode grades, confidences and feedback are replaced,
+        except the feedback of grade-only responses, which is generated on request; in
+        shadow mode only the shadow grade is written.
+
+        Args:
+            on_progress: Called with the statistics after each chunk is written
+
+        Returns:
+            Dict with processing statistics
+        """
+        ReextractionService.validate(extractor_version, mode)
+        logger = logging.getLogger(__name__)
+        stats = {"processed": 0, "changed": 0, "extractor_version": extractor_version, "mode": mode}
+
+        query = db.query(LLMResponse.id, LLMResponse.raw_response, LLMResponse.grade, LLMResponse.grading_mode).filter(
+            LLMResponse.provenance == GradeProvenance.LLM
+        )
+        if collection_id is not None:
+            query = query.join(StudentAnswer, LLMResponse.student_answer_id == StudentAnswer.id).join(Question).filter(Question.collection_id == collection_id)
+
+        with ReextractionService._executor() as executor:
+            for chunk in ReextractionService._chunks(db, query, LLMResponse.id):
+                extracted = ReextractionService._extract(executor, extractor_version, [row.raw_response for row in chunk])
+
+                updates = []
+                for row, (grade, confidence, feedback) in zip(chunk, extracted):
+                    if grade != row.grade:
+                        stats["changed"] += 1
+                    if mode == "rewrite":
+                        values = {"id": row.id, "grade": grade, "confidence": confidence, "extractor_version": extractor_version}
+                        if row.grading_mode != GradingMode.GRADE_ONLY:
+                            values["feedback"] = feedback
+                        updates.append(values)
+                    else:
+                        updates.append({
+                            "id": row.id,
+                            "shadow_grade": grade,
+                            "shadow_extractor_version": extractor_version
+                        })
+
+                db.execute(update(LLMResponse), updates)
+                db.commit()
+                stats["processed"] += len(chunk)
+                logger.info(f"Re-extracted {stats['processed']} LLM responses")
+                if on_progress:
+                    on_progress(stats)
+
+        return stats
+
+    @staticmethod
+    def validate(extractor_version: str, mode: str):
+        """Raise ValueError for an unknown extractor version or mode."""
+        get_extractor(extractor_version)
+        if mode not in ReextractionService.MODES:
+            raise ValueError(f"Unknown mode '{mode}'. Available: {', '.join(ReextractionService.MODES)}")
+
+    @staticmethod
+    def _executor() -> ProcessPoolExecutor:
+        # Jobs run in a thread of the server process, which must not be forked
+        start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        return ProcessPoolExecutor(max_workers=max(1, REEXTRACTION_WORKERS), mp_context=multiprocessing.get_context(start_method))
+
+    @staticmethod
+    def _chunks(db: Session, query, id_column):
+        """Yield the rows of a query in chunks, paginating by ID so memory stays bounded."""
+        last_id = 0
+        while True:
+            chunk = query.filter(id_column > last_id).order_by(id_column).limit(REEXTRACTION_CHUNK_SIZE).all()
+            if not chunk:
+                return
+            yield chunk
+            last_id = chunk[-1].id
+
+    @staticmethod
+    def _extract(executor: ProcessPoolExecutor, extractor_version: str, responses: List[str]) -> List[Tuple[float, str, str]]:
+        """Extract a chunk of responses, spread over the worker processes when it is large enough."""
+        if len(responses) < PARALLEL_MIN_ROWS or REEXTRACTION_WORKERS <= 1:
+            return extract_batch(extractor_version, responses)
+
+        slice_size = -(-len(responses) // REEXTRACTION_WORKERS)
+        slices = [responses[i:i + slice_size] for i in range(0, len(responses), slice_size)]
+        extracted = []
+        for batch in executor.map(extract_batch, [extractor_version] * len(slices), slices):
+            extracted.extend(batch)
+        return extracted
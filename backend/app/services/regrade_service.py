@@ -0,0 +1,105 @@
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.models.collection import Collection
+from app.models.combination import Combination
+from app.models.llm_response import LLMResponse
+from app.models.question import Question
+from app.models.student_answer import StudentAnswer
+from app.schemas.llm_response_schema import GradeProvenance
+from app.services.fingerprint_service import FingerprintService
+from app.services.grading_service import GradingService
+from app.services.ollama_service import OllamaService
+
+# Answers fingerprinted per query
+FINGERPRINT_CHUNK_SIZE = 500
+
+class RegradeService:
+    """
+    Service for finding grades that are out of date.
+
+    The current fingerprint of an answer is computed from the combination of its
+    collection, the digest of the combination's model and the prompt the answer would be
+    graded with now, and compared with the fingerprint stored on its latest grade.
+    """
+
+    @staticmethod
+    def prompt_fingerprints(db: Session, answer_ids: List[int]) -> Dict[int, Tuple[Optional[Combination], str, str]]:
+        """
+        Render the current prompts of answers.
+
+        Returns:
+            Dict of answer ID -> (combination, prompt hash, lexical scorer input hash)
+        """
+        combinations = {}
+        fingerprints = {}
+        for start in range(0, len(answer_ids), FINGERPRINT_CHUNK_SIZE):
+            rows = db.query(
+                StudentAnswer.id, StudentAnswer.answer, Question.text, Question.model_answer, Collection.combination_id
+            ).join(Question, StudentAnswer.question_id == Question.id).join(
+                Collection, Question.collection_id == Collection.id
+            ).filter(StudentAnswer.id.in_(answer_ids[start:start + FINGERPRINT_CHUNK_SIZE])).all()
+
+            for answer_id, answer, question, model_answer, combination_id in rows:
+                if combination_id not in combinations:
+                    combinations[combination_id] = db.query(Combination).filter(
+                        Combination.id == combination_id
+                    ).first() if combination_id else None
+                combination = combinations[combination_id]
+                prompt = GradingService.render_prompt(combination, question, model_answer, answer or "")
+                fingerprints[answer_id] = (
+                    combination,
+                    FingerprintService.prompt_hash(prompt),
+                    FingerprintService.lexical_hash(answer or "", model_answer)
+                )
+        return fingerprints
+
+    @staticmethod
+    async def find_stale_answers(db: Session, collection_id: int) -> Tuple[int, List[int]]:
+        """
+        Find the graded answers of a collection whose latest grade has an outdated fingerprint.
+
+        Grades stored before fingerprints existed count as stale. Grades accepted by the
+        lexical scorer only go stale when the answer or model answer changes.
+
+        Returns:
+            Tuple of (number of graded answers, IDs of the stale ones)
+        """
+        latest_ids = db.query(func.max(LLMResponse.id)).join(
+            StudentAnswer, LLMResponse.student_answer_id == StudentAnswer.id
+        ).join(Question).filter(Question.collection_id == collection_id).group_by(LLMResponse.student_answer_id)
+
+        latest = db.query(
+            LLMResponse.student_answer_id,
+            LLMResponse.provenance,
+            LLMResponse.combination_id,
+            LLMResponse.combination_version,
+            LLMResponse.model_digest,
+            LLMResponse.prompt_hash
+        ).filter(LLMResponse.id.in_(latest_ids)).all()
+
+        current = RegradeService.prompt_fingerprints(db, [row.student_answer_id for row in latest])
+        digests = {}
+        stale = []
+        for row in latest:
+            combination, prompt_hash, lexical_hash = current[row.student_answer_id]
+            if row.provenance == GradeProvenance.LEXICAL:
+                if row.prompt_hash != lexical_hash:
+                    stale.append(row.student_answer_id)
+                continue
+
+            model_name = combination.model_name if combination else OllamaService().model_name
+            if model_name not in digests:
+                digests[model_name] = await FingerprintService.model_digest(model_name)
+            digest = digests[model_name]
+
+            if (
+                row.prompt_hash != prompt_hash
+                or row.combination_id != (combination.id if combination else None)
+                or row.combination_version != (combination.version if combination else None)
+                # An unknown digest (Ollama unreachable) does not make every grade stale
+                or (digest is not None and row.model_digest != digest)
+            ):
+                stale.append(row.student_answer_id)
+
+        return len(latest), sorted(stale)
@@ -0,0 +1,231 @@
+import datetime
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from typing import Any, Dict, List
+from sqlalchemy import JSON, Boolean, DateTime, Float, Integer, func, select
+from sqlalchemy.orm import Session
+from app.models.llm_response import LLMResponse
+from app.models.test import Test, TestResult
+from app.schemas.test_schema import TestStatus
+from app.services.json_rows import query_rows
+
+# Directory of the Parquet archive, with one subdirectory per archived table
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "archive")
+
+# Newest LLM responses kept per student answer; older ones are archived
+RETENTION_KEEP_RESPONSES = int(os.getenv("RETENTION_KEEP_RESPONSES", "3"))
+
+# Days after which the results of finished tests are archived
+RETENTION_TEST_RESULT_DAYS = int(os.getenv("RETENTION_TEST_RESULT_DAYS", "90"))
+
+# Rows archived and deleted per transaction
+RETENTION_BATCH_SIZE = int(os.getenv("RETENTION_BATCH_SIZE", "5000"))
+
+MAX_ARCHIVE_PAGE_SIZE = 1000
+
+class ArchivedTable:
+    """An archived table, partitioned by one column derived from its rows."""
+
+    def __init__(self, model, partition: str, partition_type: str, partition_value, stored_partition: bool):
+        self.model = model
+        self.name = model.__tablename__
+        self.partition = partition
+        self.partition_type = partition_type  # "int64" or "string"
+        self.partition_value = partition_value  # Row dict to partition value
+        # Whether the partition is a column of the table; it is then only stored in the directory name
+        self.stored_partition = stored_partition
+
+    def columns(self) -> List:
+        return [column for column in self.model.__table__.columns
+                if not (self.stored_partition and column.name == self.partition)]
+
+
+ARCHIVED_TABLES = {
+    # Grades by month of grading
+    "llm_responses": ArchivedTable(
+        LLMResponse, "month", "string",
+        lambda row: row["timestamp"].strftime("%Y-%m") if row["timestamp"] else "unknown",
+        stored_partition=False
+    ),
+    # Test results by test, which is how they are read
+    "test_results": ArchivedTable(
+        TestResult, "test_id", "int64", lambda row: row["test_id"], stored_partition=True
+    ),
+}
+
+# One retention run at a time per process
+_run_lock = threading.Lock()
+
+class RetentionService:
+    """
+    Service for moving historical grades and test results out of the database.
+
+    Rows selected by the retention policies are written to a Parquet archive under
+    ARCHIVE_DIR, partitioned Hive-style (llm_responses/month=2025-01/, test_results/test_id=7/),
+    and deleted from the database in batches of RETENTION_BATCH_SIZE rows. A batch is
+    deleted only once its files are in place, so a crash can duplicate archived rows
+    but never lose them; reads of the archive skip duplicates.
+    """
+
+    @staticmethod
+    def run(db: Session, keep_responses: int = RETENTION_KEEP_RESPONSES,
+            test_result_days: int = RETENTION_TEST_RESULT_DAYS, dry_run: bool = False) -> Dict:
+        """
+        Archive the LLM responses beyond the newest keep_responses of each student answer,
+        and the results of finished tests created more than test_result_days ago.
+
+        Args:
+            dry_run: Only count the rows that would be archived
+
+        Returns:
+            Dict with the number of rows archived per table
+
+        Raises:
+            ValueError: If a policy is out of range
+            RuntimeError: If a retention run is already in progress in this process
+        """
+        if keep_responses < 1:
+            raise ValueError("At least the newest response of each answer must be kept")
+        if test_result_days < 0:
+            raise ValueError("test_result_days cannot be negative")
+        if not _run_lock.acquire(blocking=False):
+            raise RuntimeError("A retention run is already in progress")
+
+        try:
+            ranked = select(
+                LLMResponse.id,
+                func.row_number().over(
+                    partition_by=LLMResponse.student_answer_id, order_by=LLMResponse.id.desc()
+                ).label("rank")
+            ).subquery()
+            response_ids = [row.id for row in db.query(ranked.c.id).filter(ranked.c.rank > keep_responses).order_by(ranked.c.id)]
+
+            cutoff = datetime.datetime.utcnow() - datetime.timedelta(days=test_result_days)
+            results = db.query(TestResult.id, TestResult.test_id).join(Test, TestResult.test_id == Test.id).filter(
+                TestResult.created_at < cutoff,
+                Test.status.notin_([TestStatus.PENDING, TestStatus.RUNNING, TestStatus.DELETING])
+            ).order_by(TestResult.id).all()
+            result_ids = [row.id for row in results]
+
+            stats = {"dry_run": dry_run, "llm_responses": len(response_ids), "test_results": len(result_ids)}
+            if not dry_run:
+                RetentionService._archive(db, ARCHIVED_TABLES["llm_responses"], response_ids)
+
+                # Tests are marked before their results go, so a crash never leaves missing results unmarked;
+                # an archived test can no longer be resumed or have its metrics recomputed
+                archived_test_ids = sorted({row.test_id for row in results})
+                if archived_test_ids:
+                    db.query(Test).filter(Test.id.in_(archived_test_ids), Test.archived_at.is_(None)).update(
+                        {Test.archived_at: datetime.datetime.utcnow()}, synchronize_session=False
+                    )
+                    db.commit()
+                RetentionService._archive(db, ARCHIVED_TABLES["test_results"], result_ids)
+            return stats
+        finally:
+            _run_lock.release()
+
+    @staticmethod
+    def query_archive(table_name: str, filters: Dict[str, Any], after_id: int = 0, limit: int = 100) -> Dict:
+        """
+        Read one page of archived rows, ordered by ID.
+
+        Args:
+            table_name: "llm_responses" or "test_results"
+            filters: Column values the rows must match; None values are ignored
+            after_id: Return rows with an ID greater than this cursor
+            limit: Page size
+
+        Returns:
+            The page of rows and the cursor of the next page, if any
+        """
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.dataset as ds
+
+        table = ARCHIVED_TABLES[table_name]
+        limit = max(1, min(limit, MAX_ARCHIVE_PAGE_SIZE))
+        path = os.path.join(ARCHIVE_DIR, table.name)
+        if not os.path.isdir(path):
+            return {"rows": [], "next_after_id": None}
+
+        dataset = ds.dataset(path, format="parquet", partitioning=ds.partitioning(
+            pa.schema([(table.partition, getattr(pa, table.partition_type)())]), flavor="hive"
+        ))
+        expression = ds.field("id") > after_id
+        for name, value in filters.items():
+            if value is not None:
+                expression = expression & (ds.field(name) == value)
+
+        # IDs first, so only the rows of the page are read in full
+        ids = pc.unique(dataset.to_table(columns=["id"], filter=expression)["id"])
+        page_ids = ids.take(pc.array_sort_indices(ids)[:limit])
+        rows = dataset.to_table(filter=ds.field("id").isin(page_ids)).sort_by("id").to_pylist()
+
+        json_columns = [column.name for column in table.model.__table__.columns if isinstance(column.type, JSON)]
+        page, seen = [], set()
+        for row in rows:
+            if row["id"] in seen:
+                continue  # Archived twice by a run interrupted before its delete
+            seen.add(row["id"])
+            for name in json_columns:
+                if row[name] is not None:
+                    row[name] = json.loads(row[name])
+            page.append(row)
+        return {"rows": page, "next_after_id": page[-1]["id"] if len(page) == limit else None}
+
+    @staticmethod
+    def _archive(db: Session, table: ArchivedTable, ids: List[int]):
+        """Write rows to the archive and delete them, a batch per transaction."""
+        logger = logging.getLogger(__name__)
+        columns = table.model.__table__.columns
+        json_columns = [column.name for column in columns if isinstance(column.type, JSON)]
+
+        for start in range(0, len(ids), RETENTION_BATCH_SIZE):
+            batch = ids[start:start + RETENTION_BATCH_SIZE]
+            rows = query_rows(db.query(*columns).filter(table.model.id.in_(batch)))
+
+            partitions: Dict[Any, List[Dict]] = {}
+            for row in rows:
+                for name in json_columns:
+                    if row[name] is not None:
+                        row[name] = json.dumps(row[name])
+                partitions.setdefault(table.partition_value(row), []).append(row)
+            for value, partition_rows in partitions.items():
+                RetentionService._write_partition(table, value, partition_rows)
+
+            db.query(table.model).filter(table.model.id.in_(batch)).delete(synchronize_session=False)
+            db.commit()
+            logger.info(f"Archived {start + len(batch)} of {len(ids)} rows of {table.name}")
+
+    @staticmethod
+    def _write_partition(table: ArchivedTable, value, rows: List[Dict]):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = pa.schema([(column.name, RetentionService._arrow_type(column)) for column in table.columns()])
+        directory = os.path.join(ARCHIVE_DIR, table.name, f"{table.partition}={value}")
+        os.makedirs(directory, exist_ok=True)
+        name = f"part-{int(time.time() * 1000)}-{uuid.uuid4().hex[:8]}.parquet"
+
+        # Written under a hidden name first, so readers never see a partial file
+        temporary_path = os.path.join(directory, f".{name}")
+        pq.write_table(pa.Table.from_pylist(rows, schema=schema), temporary_path, compression="zstd")
+        os.replace(temporary_path, os.path.join(directory, name))
+
+    @staticmethod
+    def _arrow_type(column):
+        import pyarrow as pa
+
+        if isinstance(column.type, Boolean):
+            return pa.bool_()
+        if isinstance(column.type, Integer):
+            return pa.int64()
+        if isinstance(column.type, Float):
+            return pa.float64()
+        if isinstance(column.type, DateTime):
+            return pa.timestamp("us")
+        return pa.string()  # Strings, texts, compressed texts and serialized JSON
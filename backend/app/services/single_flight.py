@@ -0,0 +1,101 @@
+import asyncio
+import hashlib
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, Tuple
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+# Seconds between attempts to take an advisory lock held by another worker
+ADVISORY_LOCK_POLL_INTERVAL = 0.1
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key in this process into one execution.
+
+    The first caller of a key (the leader) runs the call; callers arriving while it runs
+    (followers) wait for the leader's result, or its exception, instead of running the
+    call again. When the leader is cancelled, a follower takes over as the new leader.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self.logger = logging.getLogger(__name__)
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Run a call unless one with the same key is already running.
+
+        Returns:
+            Tuple of (result, shared) where shared tells if the result came from another caller
+        """
+        future = self._calls.get(key)
+        while future is not None:
+            self.logger.info(f"Joining in-flight call {key}")
+            try:
+                # Shielded so a follower giving up does not cancel the leader's result for the others
+                return await asyncio.shield(future), True
+            except asyncio.CancelledError:
+                if not future.cancelled() or asyncio.current_task().cancelling():
+                    raise  # This follower was cancelled itself
+            # The leader was cancelled; its request says nothing about the followers', so run the call again
+            self.logger.info(f"In-flight call {key} was cancelled, retrying")
+            future = self._calls.get(key)
+
+        future = asyncio.get_running_loop().create_future()
+        # Retrieve the exception even when no follower is waiting, so it is not reported as lost
+        future.add_done_callback(lambda done: done.cancelled() or done.exception())
+        self._calls[key] = future
+        try:
+            result = await call()
+            future.set_result(result)
+            return result, False
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            del self._calls[key]
+
+    def is_running(self, key: Hashable) -> bool:
+        """Check if a call with the key is in flight in this process."""
+        return key in self._calls
+
+
+@asynccontextmanager
+async def advisory_lock(db: Session, key: Hashable) -> AsyncIterator[bool]:
+    """
+    Hold a PostgreSQL advisory lock on a key, shared by every worker on the database.
+
+    The lock is taken on a dedicated connection, since the session hands its connection
+    back to the pool on every commit, and polled so waiting never blocks the event loop.
+    Other databases have no advisory locks; there the lock is a no-op.
+
+    Yields:
+        True if another worker held the lock when it was requested
+    """
+    engine = db.get_bind()
+    if engine.dialect.name != "postgresql":
+        yield False
+        return
+
+    lock_id = int.from_bytes(hashlib.sha256(repr(key).encode("utf-8")).digest()[:8], "big", signed=True)
+    with engine.connect() as connection:
+        waited = False
+        while not connection.execute(text("SELECT pg_try_advisory_lock(:lock_id)"), {"lock_id": lock_id}).scalar():
+            waited = True
+            connection.rollback()
+            await asyncio.sleep(ADVISORY_LOCK_POLL_INTERVAL)
+        # Session-level lock: it outlives the transaction, which is not left open while grading
+        connection.commit()
+        try:
+            yield waited
+        finally:
+            connection.execute(text("SELECT pg_advisory_unlock(:lock_id)"), {"lock_id": lock_id})
+            connection.commit()
+
+
+# Shared coalescing of grade requests in this process
+grading_flights = SingleFlight()
@@ -0,0 +1,152 @@
+import hashlib
+import io
+import json
+from typing import Any, Dict, List
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.models.test import TestDataset, TestItem
+
+# Columns a test dataset CSV must contain
+REQUIRED_COLUMNS = ["Question", "Model Answer", "Student Answer", "Model Grade"]
+
+# Values per IN (...) lookup, below the bound parameter limit of every supported database
+LOOKUP_CHUNK_SIZE = 500
+
+class TestDatasetService:
+    """
+    Service for storing test datasets, deduplicated by content hash.
+
+    Every uploaded row becomes a test item identified by the hash of its content, so
+    identical rows are stored once no matter how many datasets, tests, models and prompts
+    use them. A dataset is the ordered list of its item IDs, and re-uploading the same
+    rows returns the existing dataset.
+    """
+
+    @staticmethod
+    def parse_csv(csv_content: bytes) -> List[Dict[str, Any]]:
+        """
+        Parse a test dataset CSV into rows.
+
+        Args:
+            csv_content: CSV file content as bytes
+
+        Returns:
+            List of rows with question, model_answer, student_answer and model_grade
+        """
+        # Imported here: pandas is a quarter of the app's import time and only parses uploads
+        import pandas as pd
+
+        try:
+            df = pd.read_csv(io.StringIO(csv_content.decode('utf-8')))
+        except pd.errors.EmptyDataError:
+            raise ValueError("The CSV file is empty")
+        except pd.errors.ParserError:
+            raise ValueError("Error parsing CSV file")
+
+        for column in REQUIRED_COLUMNS:
+            if column not in df.columns:
+                raise ValueError(f"CSV must contain column: {column}")
+
+        return [
+            {
+                "question": str(row["Question"]),
+                "model_answer": str(row["Model Answer"]),
+                "student_answer": str(row["Student Answer"]),
+                "model_grade": float(row["Model Grade"])
+            }
+            for row in df[REQUIRED_COLUMNS].to_dict("records")
+        ]
+
+    @staticmethod
+    def get_or_create_dataset(db: Session, name: str, rows: List[Dict[str, Any]]) -> TestDataset:
+        """
+        Store rows as a dataset, reusing the items and the dataset that already exist.
+
+        Args:
+            db: Database session
+            name: Name given to the dataset if it is new
+            rows: Rows as returned by parse_csv
+
+        Returns:
+            The new or existing dataset
+        """
+        if not rows:
+            raise ValueError("The dataset has no rows")
+
+        row_hashes = [TestDatasetService.hash_row(row) for row in rows]
+        content_hash = hashlib.sha256("".join(row_hashes).encode("utf-8")).hexdigest()
+
+        # Concurrent uploads of overlapping rows may insert the same item; retry with the winner's rows
+        for attempt in range(2):
+            dataset = db.query(TestDataset).filter(TestDataset.content_hash == content_hash).first()
+            if dataset:
+                return dataset
+
+            item_ids = TestDatasetService._get_item_ids(db, set(row_hashes))
+            new_items = {}
+            for row_hash, row in zip(row_hashes, rows):
+                if row_hash not in item_ids and row_hash not in new_items:
+                    new_items[row_hash] = TestItem(content_hash=row_hash, **row)
+
+            try:
+                db.add_all(new_items.values())
+                db.flush()
+                item_ids.update({row_hash: item.id for row_hash, item in new_items.items()})
+
+                dataset = TestDataset(
+                    name=name,
+                    content_hash=content_hash,
+                    item_ids=[item_ids[row_hash] for row_hash in row_hashes],
+                    row_count=len(rows)
+                )
+                db.add(dataset)
+                db.commit()
+                db.refresh(dataset)
+                return dataset
+            except IntegrityError:
+                db.rollback()
+                if attempt == 1:
+                    raise
+
+    @staticmethod
+    def load_rows(db: Session, dataset: TestDataset) -> List[Dict[str, Any]]:
+        """
+        Load the rows of a dataset in upload order.
+
+        Returns:
+            List of rows with item_id, question, model_answer, student_answer and model_grade
+        """
+        unique_ids = list(set(dataset.item_ids))
+        items = {}
+        for start in range(0, len(unique_ids), LOOKUP_CHUNK_SIZE):
+            for item in db.query(TestItem).filter(TestItem.id.in_(unique_ids[start:start + LOOKUP_CHUNK_SIZE])).all():
+                items[item.id] = {
+                    "item_id": item.id,
+                    "question": item.question,
+                    "model_answer": item.model_answer,
+                    "student_answer": item.student_answer,
+                    "model_grade": item.model_grade
+                }
+        return [items[item_id] for item_id in dataset.item_ids]
+
+    @staticmethod
+    def hash_row(row: Dict[str, Any]) -> str:
+        """Content hash of a row."""
+        content = json.dumps(
+            [row["question"], row["model_answer"], row["student_answer"], float(row["model_grade"])],
+            ensure_ascii=False
+        )
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _get_item_ids(db: Session, row_hashes: set) -> Dict[str, int]:
+        """IDs of the stored items with the given hashes."""
+        hashes = list(row_hashes)
+        item_ids = {}
+        for start in range(0, len(hashes), LOOKUP_CHUNK_SIZE):
+            item_ids.update(
+                db.query(TestItem.content_hash, TestItem.id)
+                .filter(TestItem.content_hash.in_(hashes[start:start + LOOKUP_CHUNK_SIZE]))
+                .all()
+            )
+        return item_ids
@@ -0,0 +1,148 @@
+import asyncio
+import time
+from collections import deque
+from typing import Dict, Optional, Set, Tuple
+
+# Number of recent rows used for the rolling throughput figures
+ROLLING_WINDOW = 20
+
+# Events buffered per subscriber; every event is a full pair snapshot, so dropping some is harmless
+SUBSCRIBER_QUEUE_SIZE = 1000
+
+class PairProgress:
+    """Live progress of one (model, prompt) pair of a running test."""
+
+    def __init__(self, model_name: str, prompt_id: int, rows_done: int, total_rows: int,
+                 accuracy_sum: float = 0.0, accuracy_count: int = 0):
+        self.model_name = model_name
+        self.prompt_id = prompt_id
+        self.rows_done = rows_done
+        self.total_rows = total_rows
+        self.status = "running"
+        self.accuracy_sum = accuracy_sum
+        self.accuracy_count = accuracy_count
+        self.accuracy_lower = None
+        self.accuracy_upper = None
+        # (finished_at, eval_count, eval_seconds) of the most recent rows
+        self.recent = deque(maxlen=ROLLING_WINDOW)
+
+    def record_row(self, accuracy: float, stats: Dict):
+        self.rows_done += 1
+        self.accuracy_sum += accuracy
+        self.accuracy_count += 1
+        eval_seconds = stats.get("eval_duration", 0) / 1e9
+        self.recent.append((time.monotonic(), stats.get("eval_count", 0), eval_seconds))
+
+    def rows_per_minute(self) -> Optional[float]:
+        if len(self.recent) < 2:
+            return None
+        elapsed = self.recent[-1][0] - self.recent[0][0]
+        if elapsed <= 0:
+            return None
+        return (len(self.recent) - 1) * 60.0 / elapsed
+
+    def tokens_per_second(self) -> Optional[float]:
+        tokens = sum(entry[1] for entry in self.recent)
+        seconds = sum(entry[2] for entry in self.recent)
+        if seconds <= 0:
+            return None
+        return tokens / seconds
+
+    def to_event(self) -> Dict:
+        rows_per_minute = self.rows_per_minute()
+        remaining = max(self.total_rows - self.rows_done, 0)
+        eta_seconds = None
+        if self.status == "running" and rows_per_minute:
+            eta_seconds = remaining * 60.0 / rows_per_minute
+        return {
+            "model_name": self.model_name,
+            "prompt_id": self.prompt_id,
+            "status": self.status,
+            "rows_done": self.rows_done,
+            "total_rows": self.total_rows,
+            "rows_per_minute": rows_per_minute,
+            "tokens_per_second": self.tokens_per_second(),
+            "accuracy": self.accuracy_sum / self.accuracy_count if self.accuracy_count else None,
+            "accuracy_lower": self.accuracy_lower,
+            "accuracy_upper": self.accuracy_upper,
+            "eta_seconds": eta_seconds
+        }
+
+
+class TestProgressService:
+    """
+    In-process publish/subscribe hub for the progress of running tests.
+
+    The test runner reports every processed row, and progress streams subscribe to the
+    events of one test. Only runs owned by this process publish events; streams fall
+    back to the stored checkpoints for runs owned by other workers.
+    """
+
+    def __init__(self):
+        self._pairs: Dict[int, Dict[Tuple[str, int], PairProgress]] = {}
+        self._subscribers: Dict[int, Set[asyncio.Queue]] = {}
+
+    def start_pair(self, test_id: int, model_name: str, prompt_id: int, rows_done: int, total_rows: int,
+                   accuracy_sum: float = 0.0, accuracy_count: int = 0):
+        """Register a pair that starts (or resumes) processing."""
+        pair = PairProgress(model_name, prompt_id, rows_done, total_rows, accuracy_sum, accuracy_count)
+        self._pairs.setdefault(test_id, {})[(model_name, prompt_id)] = pair
+        self.publish(test_id, {"type": "pair", **pair.to_event()})
+
+    def record_row(self, test_id: int, model_name: str, prompt_id: int, accuracy: float, stats: Dict):
+        """Record a processed row and notify subscribers."""
+        pair = self._pairs.get(test_id, {}).get((model_name, prompt_id))
+        if pair is None:
+            return
+        pair.record_row(accuracy, stats)
+        self.publish(test_id, {"type": "row", **pair.to_event()})
+
+    def set_bounds(self, test_id: int, model_name: str, prompt_id: int, lower: float, upper: float):
+        """Update the accuracy confidence interval of a pair of an adaptive test."""
+        pair = self._pairs.get(test_id, {}).get((model_name, prompt_id))
+        if pair is None:
+            return
+        pair.accuracy_lower = lower
+        pair.accuracy_upper = upper
+        self.publish(test_id, {"type": "pair", **pair.to_event()})
+
+    def finish_pair(self, test_id: int, model_name: str, prompt_id: int, status: str):
+        """Mark a pair as finished with the given status."""
+        pair = self._pairs.get(test_id, {}).get((model_name, prompt_id))
+        if pair is None:
+            return
+        pair.status = status
+        self.publish(test_id, {"type": "pair", **pair.to_event()})
+
+    def finish_test(self, test_id: int, status: str):
+        """Notify subscribers that the run ended and drop its live state."""
+        self.publish(test_id, {"type": "status", "status": status})
+        self._pairs.pop(test_id, None)
+
+    def get_pairs(self, test_id: int) -> Optional[Dict[Tuple[str, int], PairProgress]]:
+        """Live pairs of a test run owned by this process, if any."""
+        return self._pairs.get(test_id)
+
+    def subscribe(self, test_id: int) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.setdefault(test_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, test_id: int, queue: asyncio.Queue):
+        subscribers = self._subscribers.get(test_id)
+        if subscribers is None:
+            return
+        subscribers.discard(queue)
+        if not subscribers:
+            del self._subscribers[test_id]
+
+    def publish(self, test_id: int, event: Dict):
+        for queue in self._subscribers.get(test_id, ()):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                pass
+
+
+# Shared progress hub for the test runs of this process
+test_progress_service = TestProgressService()
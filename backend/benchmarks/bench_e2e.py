@@ -0,0 +1,502 @@
+"""
+End-to-end load test of the backend against the fake Ollama server.
+
+Starts benchmarks.fake_ollama and the real app (uvicorn app.main:app) as subprocesses
+and drives the app over HTTP through these scenarios:
+
+    csv-ingest           create collections and upload their question and answer CSVs
+    grading              grade every answer of a collection with concurrent grade requests
+    collection-grading   grade a collection with a grading batch and wait for it to finish
+    gradebook            load a graded collection like the collection page does
+    test-harness         upload a test dataset CSV and wait for the test run to finish
+
+Every scenario reports request counts, errors, 429 rejections, throughput, latency
+percentiles (p50/p95/p99) and the requests the fake Ollama served. The report is
+written as JSON so baselines of two releases can be diffed with --compare.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_e2e [--scenarios grading,gradebook] [--students 50] [--questions 4]
+        [--concurrency 8] [--slots 1] [--latency lognormal:0.2,0.5] [--time-scale 0.1]
+        [--database-url postgresql://...] [--cassette run.cassette --cassette-mode replay]
+        [--output baseline.json] [--compare old.json]
+
+Without --database-url a new SQLite database is created in a temporary directory. A
+Postgres URL must point to a scratch database: the app creates its tables there and the
+benchmark adds its own users, collections and tests.
+"""
+import argparse
+import asyncio
+import csv
+import io
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+SCENARIOS = ["csv-ingest", "grading", "collection-grading", "gradebook", "test-harness"]
+
+# Statuses of grading batches and tests that are still being processed
+ACTIVE_STATUSES = ("pending", "running")
+
+# Seconds between polls of a running grading batch or test
+POLL_INTERVAL = 0.25
+
+BENCH_PROMPT = """Question: {{question}}
+
+Correct Answer: {{model_answer}}
+
+Student's Answer: {{student_answer}}
+
+Grade the student's answer based on the correct answer from (0.0 - 1.0).
+Provide a brief explanation for your grade."""
+
+QUESTION_TOPICS = [
+    ("What does the cell membrane do?", "It controls what enters and leaves the cell because it is selectively permeable"),
+    ("Why do seasons occur on Earth?", "The tilt of the Earth's axis changes how directly sunlight hits each hemisphere"),
+    ("What is the role of an enzyme?", "An enzyme speeds up a chemical reaction by lowering its activation energy"),
+    ("What causes tides?", "The gravitational pull of the moon and the sun on the oceans causes tides"),
+    ("What is photosynthesis?", "Plants convert light energy, water and carbon dioxide into glucose and oxygen"),
+    ("Why is the sky blue?", "Air molecules scatter short blue wavelengths of sunlight more than red ones"),
+]
+
+def percentile(sorted_values: List[float], fraction: float) -> Optional[float]:
+    """Nearest-rank percentile of sorted values."""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+class ScenarioResult:
+    """Requests, latencies and outcome of one scenario."""
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.errors = 0
+        self.rejected = 0
+        self.items = 0
+        self.started_at = time.perf_counter()
+        self.finished_at: Optional[float] = None
+        self.extra: Dict[str, Any] = {}
+
+    def record(self, latency: float, response: Optional[httpx.Response], expected: tuple = ()):
+        """Record a request; statuses in expected count as successes even if they are errors."""
+        if response is not None and response.status_code in expected:
+            self.latencies.append(latency)
+        elif response is None or response.status_code >= 400 and response.status_code != 429:
+            self.errors += 1
+        elif response.status_code == 429:
+            self.rejected += 1
+        else:
+            self.latencies.append(latency)
+
+    def finish(self):
+        self.finished_at = time.perf_counter()
+
+    def to_dict(self) -> Dict[str, Any]:
+        duration = (self.finished_at or time.perf_counter()) - self.started_at
+        latencies = sorted(self.latencies)
+        requests = len(latencies) + self.errors + self.rejected
+        return {
+            "requests": requests,
+            "errors": self.errors,
+            "rejected": self.rejected,
+            "duration_seconds": round(duration, 3),
+            "throughput_per_second": round(len(latencies) / duration, 3) if duration > 0 else None,
+            "items": self.items,
+            "items_per_second": round(self.items / duration, 3) if duration > 0 and self.items else None,
+            "latency_ms": {
+                "p50": _ms(percentile(latencies, 0.50)),
+                "p95": _ms(percentile(latencies, 0.95)),
+                "p99": _ms(percentile(latencies, 0.99)),
+                "mean": _ms(sum(latencies) / len(latencies) if latencies else None),
+                "max": _ms(latencies[-1] if latencies else None),
+            },
+            **self.extra,
+        }
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return round(seconds * 1000, 2) if seconds is not None else None
+
+
+class Bench:
+    """HTTP client of the app under test and the data the scenarios share."""
+
+    def __init__(self, args: argparse.Namespace, app_url: str, ollama_url: str):
+        self.args = args
+        self.client = httpx.AsyncClient(base_url=f"{app_url}/api", timeout=httpx.Timeout(600.0))
+        self.ollama = httpx.AsyncClient(base_url=ollama_url, timeout=30.0)
+        self.rng = random.Random(args.seed)
+        self.user_id: Optional[int] = None
+        self.graded_collection_id: Optional[int] = None
+        self.collection_count = 0
+
+    async def request(self, result: Optional[ScenarioResult], method: str, url: str, expected: tuple = (),
+                      **kwargs) -> Optional[httpx.Response]:
+        """Send a request, recording its latency and outcome in the scenario result."""
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            response = None
+        if result is not None:
+            result.record(time.perf_counter() - start, response, expected)
+        return response
+
+    async def login(self):
+        # Only the "dev" user is created as an admin, which the test harness endpoints require
+        await self.client.post("/users/", json={"username": "dev", "password": "bench"})
+        response = await self.client.post("/login", json={"username": "dev", "password": "bench"})
+        response.raise_for_status()
+        self.client.headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+        users = (await self.client.get("/users/")).json()["users"]
+        self.user_id = next(user["id"] for user in users if user["username"] == "dev")
+
+    def questions_csv(self) -> str:
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(["question", "model_answer"])
+        for question, model_answer in QUESTION_TOPICS[:self.args.questions]:
+            writer.writerow([question, model_answer])
+        return output.getvalue()
+
+    def student_answer(self, model_answer: str) -> str:
+        """A variation of the model answer: students often phrase the same idea alike."""
+        words = model_answer.split()
+        kept = [word for word in words if self.rng.random() > self.args.answer_noise]
+        if self.rng.random() < 0.2:
+            self.rng.shuffle(kept)
+        return " ".join(kept) or words[0]
+
+    def answers_csv(self) -> str:
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(["student_name", "student_pid", "question", "answer"])
+        for student in range(self.args.students):
+            for question, model_answer in QUESTION_TOPICS[:self.args.questions]:
+                writer.writerow([f"Student {student}", f"student{student:05d}", question, self.student_answer(model_answer)])
+        return output.getvalue()
+
+    async def ingest_collection(self, result: Optional[ScenarioResult] = None) -> int:
+        """Create a collection and upload its questions and answers. Returns the collection ID."""
+        self.collection_count += 1
+        response = await self.request(result, "POST", "/collections/", json={
+            "user_id": self.user_id, "name": f"Benchmark {self.collection_count}"
+        })
+        response.raise_for_status()
+        collection_id = response.json()["id"]
+        await self.request(result, "POST", f"/collections/{collection_id}/upload-questions",
+                           files={"file": ("questions.csv", self.questions_csv(), "text/csv")})
+        response = await self.request(result, "POST", f"/collections/{collection_id}/upload-answers",
+                                      files={"file": ("answers.csv", self.answers_csv(), "text/csv")})
+        if result is not None and response is not None and response.status_code == 200:
+            result.items += self.args.students * self.args.questions
+        return collection_id
+
+    async def answer_ids(self, collection_id: int) -> List[int]:
+        questions = (await self.client.get(f"/questions/collection/{collection_id}")).json()["questions"]
+        ids = []
+        for question in questions:
+            answers = (await self.client.get(f"/student-answers/question/{question['id']}")).json()["student_answers"]
+            ids.extend(answer["id"] for answer in answers)
+        return ids
+
+    async def gather_limited(self, calls):
+        """Await the calls with at most --concurrency in flight."""
+        semaphore = asyncio.Semaphore(self.args.concurrency)
+
+        async def limited(call):
+            async with semaphore:
+                return await call()
+
+        return await asyncio.gather(*(limited(call) for call in calls))
+
+    async def ollama_requests(self) -> Dict[str, int]:
+        try:
+            return (await self.ollama.get("/fake/stats")).json()["requests"]
+        except httpx.HTTPError:
+            return {}
+
+    async def close(self):
+        await self.client.aclose()
+        await self.ollama.aclose()
+
+
+async def scenario_csv_ingest(bench: Bench, result: ScenarioResult):
+    for _ in range(bench.args.ingest_repeat):
+        await bench.ingest_collection(result)
+
+async def scenario_grading(bench: Bench, result: ScenarioResult):
+    collection_id = await bench.ingest_collection()
+    answer_ids = await bench.answer_ids(collection_id)
+    result.started_at = time.perf_counter()
+    await bench.gather_limited([
+        lambda answer_id=answer_id: bench.request(result, "POST", f"/student-answers/{answer_id}/grade")
+        for answer_id in answer_ids
+    ])
+    result.items = len(answer_ids)
+    bench.graded_collection_id = collection_id
+
+async def scenario_collection_grading(bench: Bench, result: ScenarioResult):
+    collection_id = await bench.ingest_collection()
+    result.started_at = time.perf_counter()
+    body = {"collection_id": collection_id}
+    if bench.args.cluster_threshold is not None:
+        body["cluster_threshold"] = bench.args.cluster_threshold
+    response = await bench.request(result, "POST", "/grading-batches/", json=body)
+    if response is None or response.status_code != 201:
+        return
+    batch = response.json()
+    while batch["status"] in ACTIVE_STATUSES:
+        await asyncio.sleep(POLL_INTERVAL)
+        batch = (await bench.client.get(f"/grading-batches/{batch['id']}")).json()
+    result.items = batch["graded_answers"] + batch["propagated_answers"]
+    result.errors += batch["failed_answers"]
+    result.extra["batch_status"] = batch["status"]
+    result.extra["propagated_answers"] = batch["propagated_answers"]
+    if bench.graded_collection_id is None:
+        bench.graded_collection_id = collection_id
+
+async def scenario_gradebook(bench: Bench, result: ScenarioResult):
+    collection_id = bench.graded_collection_id or await bench.ingest_collection()
+    result.started_at = time.perf_counter()
+    page_loads = []
+    for _ in range(bench.args.gradebook_repeat):
+        start = time.perf_counter()
+        await bench.request(result, "GET", f"/collections/{bench.user_id}/{collection_id}")
+        await bench.request(result, "GET", f"/students/collection/{collection_id}")
+        response = await bench.request(result, "GET", f"/questions/collection/{collection_id}")
+        questions = response.json()["questions"] if response is not None and response.status_code == 200 else []
+        answer_lists = await bench.gather_limited([
+            lambda question=question: bench.request(result, "GET", f"/student-answers/question/{question['id']}")
+            for question in questions
+        ])
+        answer_ids = [
+            answer["id"] for response in answer_lists if response is not None and response.status_code == 200
+            for answer in response.json()["student_answers"]
+        ]
+        # An answer without a grade yet is a 404, which the collection page expects
+        await bench.gather_limited([
+            lambda answer_id=answer_id: bench.request(result, "GET", f"/student-answers/{answer_id}/grades", expected=(404,))
+            for answer_id in answer_ids
+        ])
+        result.items += len(answer_ids)
+        page_loads.append(time.perf_counter() - start)
+    page_loads.sort()
+    result.extra["page_load_ms"] = {"p50": _ms(percentile(page_loads, 0.5)), "max": _ms(page_loads[-1] if page_loads else None)}
+
+async def scenario_test_harness(bench: Bench, result: ScenarioResult):
+    response = await bench.request(result, "POST", "/prompts/", json={
+        "name": "Benchmark prompt", "category": "benchmark", "prompt": BENCH_PROMPT
+    })
+    prompt_id = response.json()["id"]
+    response = await bench.request(result, "POST", "/tests/", json={
+        "name": "Benchmark test", "model_names": [bench.args.model], "prompt_ids": [prompt_id]
+    })
+    if response is None or response.status_code != 201:
+        return
+    test_id = response.json()["id"]
+
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(["Question", "Model Answer", "Student Answer", "Model Grade"])
+    for row in range(bench.args.test_rows):
+        question, model_answer = QUESTION_TOPICS[row % len(QUESTION_TOPICS)]
+        writer.writerow([question, model_answer, bench.student_answer(model_answer), bench.rng.choice([0, 0.5, 1])])
+    response = await bench.request(result, "POST", f"/tests/{test_id}/upload",
+                                   files={"file": ("test.csv", output.getvalue(), "text/csv")})
+    if response is None or response.status_code != 200:
+        return
+
+    summary = (await bench.client.get(f"/tests/{test_id}/summary")).json()
+    while summary["status"] in ACTIVE_STATUSES:
+        await asyncio.sleep(POLL_INTERVAL)
+        summary = (await bench.client.get(f"/tests/{test_id}/summary")).json()
+    result.items = summary["total_results"]
+    result.extra["test_status"] = summary["status"]
+
+SCENARIO_FUNCTIONS = {
+    "csv-ingest": scenario_csv_ingest,
+    "grading": scenario_grading,
+    "collection-grading": scenario_collection_grading,
+    "gradebook": scenario_gradebook,
+    "test-harness": scenario_test_harness,
+}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_process(command: List[str], env: Dict[str, str], ready_url: str, log_path: Path) -> subprocess.Popen:
+    """Start a server subprocess and wait until ready_url answers."""
+    log = open(log_path, "w")
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{' '.join(command)} exited with {process.returncode}; see {log_path}")
+        try:
+            if httpx.get(ready_url, timeout=1.0).status_code < 500:
+                return process
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"{' '.join(command)} did not start within 60 seconds; see {log_path}")
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+async def run_scenarios(args: argparse.Namespace, app_url: str, ollama_url: str) -> Dict[str, Any]:
+    bench = Bench(args, app_url, ollama_url)
+    try:
+        await bench.login()
+        results = {}
+        for name in args.scenarios:
+            print(f"Running {name}...", flush=True)
+            before = await bench.ollama_requests()
+            result = ScenarioResult()
+            await SCENARIO_FUNCTIONS[name](bench, result)
+            result.finish()
+            after = await bench.ollama_requests()
+            result.extra["ollama_requests"] = {
+                endpoint: count - before.get(endpoint, 0) for endpoint, count in after.items() if count != before.get(endpoint, 0)
+            }
+            results[name] = result.to_dict()
+        return results
+    finally:
+        await bench.close()
+
+def print_report(report: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None):
+    def change(name: str, value: Optional[float], path: List[str]) -> str:
+        old = (baseline or {}).get("scenarios", {}).get(name)
+        for key in path:
+            old = old.get(key) if isinstance(old, dict) else None
+        if value is None or not old:
+            return ""
+        return f" ({(value - old) / old:+.0%})"
+
+    print(f"\n{'scenario':<20}{'requests':>10}{'errors':>8}{'429':>6}{'req/s':>10}{'items/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, result in report["scenarios"].items():
+        latency = result["latency_ms"]
+        print(
+            f"{name:<20}{result['requests']:>10}{result['errors']:>8}{result['rejected']:>6}"
+            f"{result['throughput_per_second'] or 0:>10.2f}{result['items_per_second'] or 0:>10.2f}"
+            f"{latency['p50'] or 0:>10.1f}{latency['p95'] or 0:>10.1f}{latency['p99'] or 0:>10.1f}"
+        )
+        if baseline:
+            print(
+                f"{'  vs baseline':<20}{'':>24}"
+                f"{change(name, result['throughput_per_second'], ['throughput_per_second']):>10}"
+                f"{change(name, result['items_per_second'], ['items_per_second']):>10}"
+                + "".join(f"{change(name, latency[key], ['latency_ms', key]):>10}" for key in ("p50", "p95", "p99"))
+            )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Comma-separated scenarios to run, in order")
+    parser.add_argument("--database-url", help="Scratch database of the app; a new SQLite file by default")
+    parser.add_argument("--students", type=int, default=50, help="Students per collection")
+    parser.add_argument("--questions", type=int, default=4, help=f"Questions per collection, at most {len(QUESTION_TOPICS)}")
+    parser.add_argument("--answer-noise", type=float, default=0.15, help="Share of model answer words a student leaves out")
+    parser.add_argument("--concurrency", type=int, default=8, help="Requests in flight in the grading and gradebook scenarios")
+    parser.add_argument("--ingest-repeat", type=int, default=3, help="Collections uploaded by csv-ingest")
+    parser.add_argument("--gradebook-repeat", type=int, default=5, help="Page loads of the gradebook scenario")
+    parser.add_argument("--test-rows", type=int, default=100, help="Rows of the test-harness dataset")
+    parser.add_argument("--cluster-threshold", type=float, help="Cluster similar answers in collection-grading")
+    parser.add_argument("--model", default="gemma3:4b", help="Model of the test-harness test")
+    parser.add_argument("--slots", type=int, default=1, help="Parallel generations of the fake Ollama and the app")
+    parser.add_argument("--latency", default="lognormal:0.2,0.5", help="Fake Ollama load latency distribution")
+    parser.add_argument("--tokens-per-second", type=float, default=40.0, help="Fake Ollama generation speed")
+    parser.add_argument("--response-tokens", default="uniform:20,80", help="Fake Ollama response length distribution")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Share of fake Ollama generations failing")
+    parser.add_argument("--time-scale", type=float, default=0.1, help="Multiplier of the fake Ollama's delays")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--cassette", help="Cassette file the app records Ollama requests to or replays them from")
+    parser.add_argument("--cassette-mode", default="auto", choices=["record", "replay", "auto"],
+                        help="How the app uses --cassette; replay reruns a recorded run without the fake Ollama's delays")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--compare", help="JSON report of a previous run to compare with")
+    args = parser.parse_args()
+
+    args.scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in args.scenarios if name not in SCENARIO_FUNCTIONS]
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(unknown)}; choose from {', '.join(SCENARIOS)}")
+    args.questions = max(1, min(args.questions, len(QUESTION_TOPICS)))
+
+    workdir = Path(tempfile.mkdtemp(prefix="bench_e2e_"))
+    database_url = args.database_url or f"sqlite:///{workdir / 'bench.db'}"
+    ollama_port, app_port = free_port(), free_port()
+    ollama_url, app_url = f"http://127.0.0.1:{ollama_port}", f"http://127.0.0.1:{app_port}"
+
+    ollama_command = [
+        sys.executable, "-m", "benchmarks.fake_ollama", "--port", str(ollama_port), "--slots", str(args.slots),
+        "--latency", args.latency, "--tokens-per-second", str(args.tokens_per_second),
+        "--response-tokens", args.response_tokens, "--failure-rate", str(args.failure_rate),
+        "--time-scale", str(args.time_scale), "--seed", str(args.seed),
+    ]
+    app_env = dict(
+        os.environ, DATABASE_URL=database_url, OLLAMA_URL=ollama_url, GENERATION_SLOTS=str(args.slots),
+        RESUME_TESTS_ON_STARTUP="false",
+    )
+    if args.cassette:
+        app_env.update(OLLAMA_CASSETTE_PATH=str(Path(args.cassette).resolve()), OLLAMA_CASSETTE_MODE=args.cassette_mode)
+    processes = []
+    try:
+        processes.append(start_process(ollama_command, dict(os.environ), f"{ollama_url}/api/tags", workdir / "fake_ollama.log"))
+        processes.append(start_process(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(app_port), "--log-level", "warning"],
+            app_env, f"{app_url}/api/collections/", workdir / "app.log"
+        ))
+        scenarios = asyncio.run(run_scenarios(args, app_url, ollama_url))
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait(timeout=10)
+
+    report = {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "database": database_url.split(":", 1)[0],
+            "students": args.students,
+            "questions": args.questions,
+            "concurrency": args.concurrency,
+            "cassette_mode": args.cassette_mode if args.cassette else None,
+            "fake_ollama": {
+                "slots": args.slots, "latency": args.latency, "tokens_per_second": args.tokens_per_second,
+                "response_tokens": args.response_tokens, "failure_rate": args.failure_rate, "time_scale": args.time_scale,
+            },
+        },
+        "scenarios": scenarios,
+    }
+    baseline = json.loads(Path(args.compare).read_text()) if args.compare else None
+    print_report(report, baseline)
+    print(f"\nServer logs: {workdir}")
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2) + "\n")
+        print(f"Report written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
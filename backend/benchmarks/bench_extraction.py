@@ -0,0 +1,133 @@
+"""
+Micro-benchmark of the grade extractors.
+
+Builds a corpus from the responses stored in the database (TestResult.full_response and
+LLMResponse.raw_response), checks that every extractor returns exactly what v1 returns
+on it, and times single and batch extraction per version.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_extraction [--limit 20000] [--repeat 5] [--synthetic]
+
+Uses DATABASE_URL like the app. With --synthetic, or when the database holds no
+responses, a generated corpus covering every extraction path is used instead.
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.services.grade_extraction import EXTRACTORS, extract_batch
+
+# Responses that exercise every branch of the extractors
+EDGE_CASES = [
+    "",
+    "Grade: 0.8\nThe answer covers the main idea.",
+    "GRADE:1 Score: 0.5 mark: 0",
+    "score:   0.7",
+    "Rating: 9.5 is out of range",
+    "I would give this 0.6 overall, maybe 0.7.",
+    "The student gets 1 point.",
+    "Version 2.0 of the answer, grade 10",
+    "zero point five",
+    "Half marks. One of the key points is missing.",
+    "None of the points were covered.",
+    "It is worth point five.",
+    "10 out of 10",
+    "No numeric grade here at all.",
+    "Ratİng: 1 with a non-ASCII character",
+    "ſcore: 1 and a Kelvin sign K1",
+    "  Grade: 0.3  \n\n  trailing whitespace  ",
+]
+
+def load_stored_responses(limit: int) -> List[str]:
+    """Load up to limit stored responses from the database."""
+    from app.database.connection import SessionLocal
+    from app.models import LLMResponse
+    from app.models.combination import Combination  # noqa: F401 (resolves the Collection relationship)
+    from app.models.test import TestResult
+
+    db = SessionLocal()
+    try:
+        responses = [row[0] for row in db.query(TestResult.full_response).limit(limit).all()]
+        remaining = limit - len(responses)
+        if remaining > 0:
+            responses += [row[0] for row in db.query(LLMResponse.raw_response).limit(remaining).all()]
+        return [response for response in responses if response is not None]
+    finally:
+        db.close()
+
+def synthetic_responses(count: int, seed: int = 42) -> List[str]:
+    """Generate responses shaped like typical model output."""
+    rng = random.Random(seed)
+    explanation = (
+        "The student's answer identifies the main concept but misses some of the detail "
+        "expected by the model answer. The reasoning is mostly correct. "
+    )
+    templates = [
+        lambda: f"Grade: {rng.choice(['0.0', '0.5', '1.0', '0.8'])}\n{explanation * rng.randint(1, 4)}",
+        lambda: f"{explanation * rng.randint(1, 4)}\nScore: {rng.choice(['0', '1', '0.3'])}",
+        lambda: f"{explanation * rng.randint(1, 3)}I would give this {rng.choice(['0.4', '0.9', '1'])}.",
+        lambda: f"{explanation * rng.randint(1, 3)}Half of the points are covered.",
+        lambda: explanation * rng.randint(1, 3),
+    ]
+    return [rng.choice(templates)() for _ in range(count)]
+
+def check_compatibility(corpus: List[str]) -> int:
+    """Compare every extractor with v1 on the corpus. Returns the number of mismatches."""
+    expected = extract_batch("v1", corpus)
+    mismatches = 0
+    for version in EXTRACTORS:
+        if version == "v1":
+            continue
+        for response, want, got in zip(corpus, expected, extract_batch(version, corpus)):
+            if want != got:
+                mismatches += 1
+                if mismatches <= 10:
+                    print(f"  {version} mismatch on {response[:60]!r}: v1={want!r} {version}={got!r}")
+    return mismatches
+
+def time_best(function, repeat: int) -> float:
+    """Best wall time of repeated calls, in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--limit", type=int, default=20000, help="Maximum number of stored responses to load")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing repetitions, the best is reported")
+    parser.add_argument("--synthetic", action="store_true", help="Use a generated corpus instead of the database")
+    args = parser.parse_args()
+
+    corpus = [] if args.synthetic else load_stored_responses(args.limit)
+    source = "database"
+    if not corpus:
+        corpus = synthetic_responses(args.limit)
+        source = "synthetic"
+    corpus = EDGE_CASES + corpus
+    total_chars = sum(len(response) for response in corpus)
+    print(f"Corpus: {len(corpus)} responses from {source}, {total_chars / len(corpus):.0f} chars on average")
+
+    mismatches = check_compatibility(corpus)
+    print(f"Compatibility with v1: {'OK' if mismatches == 0 else f'{mismatches} mismatches'}")
+
+    baseline = None
+    print(f"{'version':<10}{'single us/resp':>16}{'batch us/resp':>16}{'speedup':>10}")
+    for version, extractor in EXTRACTORS.items():
+        single = time_best(lambda: [extractor(response) for response in corpus], args.repeat)
+        batch = time_best(lambda: extract_batch(version, corpus), args.repeat)
+        baseline = baseline or batch
+        print(f"{version:<10}{single / len(corpus) * 1e6:>16.2f}{batch / len(corpus) * 1e6:>16.2f}{baseline / batch:>9.2f}x")
+
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
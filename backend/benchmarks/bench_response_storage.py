@@ -0,0 +1,166 @@
+"""
+Benchmark of the storage of LLM outputs.
+
+Writes the same synthetic reasoning-model responses (several KB of raw response and
+feedback each) to SQLite database files three ways and reports the size of each file
+and the time and peak Python memory of loading every response ORM object:
+
+    text            Uncompressed Text columns, loaded with every row (the layout before
+                    CompressedText)
+    zstd            CompressedText without a dictionary, deferred
+    zstd+dict       CompressedText after training a shared dictionary and recompressing
+
+"grades" loads the rows the way list and aggregate queries do, "full" also loads the
+raw response and feedback (undefer_group("llm_output")), as the grade endpoints do.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_response_storage [--responses 5000] [--repeat 3]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import Column, MetaData, Table, Text, create_engine, insert, text
+from sqlalchemy.orm import registry, sessionmaker, undefer_group
+
+from app.models import Base
+from app.models.combination import Combination  # noqa: F401 (resolves the Collection foreign key)
+from app.models.compressed_text import compression_store
+from app.models.compression_dictionary import CompressionDictionary
+from app.models.llm_response import LLMResponse
+from app.models.test import TestResult
+from app.services.compression_service import CompressionService
+
+COMPRESSED_COLUMNS = ("raw_response", "feedback")
+
+class PlainLLMResponse:
+    """LLMResponse with uncompressed, eagerly loaded outputs."""
+
+def plain_table() -> Table:
+    """The llm_responses table with Text output columns and without foreign keys."""
+    return Table("llm_responses", MetaData(), *[
+        Column(column.name, Text() if column.name in COMPRESSED_COLUMNS else column.type, primary_key=column.primary_key)
+        for column in LLMResponse.__table__.columns
+    ])
+
+def synthetic_responses(count: int, seed: int = 42):
+    """Rows of reasoning-model responses: a think block restating the task, then grade and feedback."""
+    rng = random.Random(seed)
+    topics = ["photosynthesis", "the cell membrane", "mitosis", "osmosis", "enzymes", "the water cycle", "natural selection"]
+    words = ("light energy glucose chlorophyll oxygen carbon dioxide membrane selectively permeable proteins "
+             "transport diffusion concentration gradient chromosomes nucleus division daughter cells enzyme substrate "
+             "active site temperature evaporation condensation precipitation variation inheritance fitness").split()
+    steps = [
+        "Okay, let me look at the question about {topic}. The reference answer says {phrase}.",
+        "The student wrote that {phrase}, which is partly right.",
+        "Wait, the rubric expects the key idea of {word} to be mentioned explicitly.",
+        "Let me compare this with the reference answer again: {phrase}.",
+        "Hmm, the student does mention {word}, but does not explain why {phrase}.",
+        "So the main concept is there, but the explanation of {word} is incomplete.",
+        "I should be careful not to penalize wording; the meaning is what matters here.",
+    ]
+
+    def phrase():
+        return " ".join(rng.choice(words) for _ in range(rng.randint(4, 12)))
+
+    rows = []
+    for i in range(count):
+        topic = rng.choice(topics)
+        thoughts = " ".join(
+            rng.choice(steps).format(topic=topic, phrase=phrase(), word=rng.choice(words))
+            for _ in range(rng.randint(25, 60))
+        )
+        grade = rng.choice([0.0, 0.25, 0.5, 0.75, 1.0])
+        feedback = " ".join(
+            rng.choice(steps[1:]).format(topic=topic, phrase=phrase(), word=rng.choice(words))
+            for _ in range(rng.randint(4, 10))
+        )
+        rows.append({
+            "raw_response": f"<think>\n{thoughts}\n</think>\n\nGrade: {grade}\n\nFeedback: {feedback}",
+            "feedback": feedback,
+            "grade": grade,
+            "model_name": "deepseek-r1:14b",
+            "confidence": "high",
+            "student_answer_id": i + 1,
+        })
+    return rows
+
+def build_database(path: str, rows, layout: str):
+    """Write the rows to a new database file in one of the layouts; returns a session factory."""
+    engine = create_engine(f"sqlite:///{path}")
+    if layout == "text":
+        table = plain_table()
+        table.metadata.create_all(engine)
+        registry().map_imperatively(PlainLLMResponse, table)
+    else:
+        Base.metadata.create_all(engine, tables=[LLMResponse.__table__, TestResult.__table__, CompressionDictionary.__table__])
+        compression_store.bind(engine)
+        table = LLMResponse.__table__
+
+    session_factory = sessionmaker(bind=engine)
+    with session_factory() as db:
+        db.execute(insert(table if layout == "text" else LLMResponse), rows)
+        db.commit()
+        if layout == "zstd+dict":
+            CompressionService.train_dictionary(db)
+            CompressionService.recompress(db)
+    with engine.connect() as connection:
+        connection.execute(text("VACUUM"))
+    return session_factory
+
+def measure(session_factory, model, full: bool, repeat: int):
+    """Best time of loading every response, and the peak traced memory of one more load."""
+    def load():
+        with session_factory() as db:
+            query = db.query(model)
+            if full and model is LLMResponse:
+                query = query.options(undefer_group("llm_output"))
+            responses = query.all()
+            if full:
+                sum(len(response.raw_response) + len(response.feedback) for response in responses)
+
+    best_time = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        load()
+        best_time = min(best_time, time.perf_counter() - start)
+
+    # Traced separately, as tracing slows allocation down
+    tracemalloc.start()
+    load()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best_time, peak
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--responses", type=int, default=5000, help="Number of stored LLM responses")
+    parser.add_argument("--repeat", type=int, default=3, help="Timing repetitions, the best is reported")
+    args = parser.parse_args()
+
+    rows = synthetic_responses(args.responses)
+    output_bytes = sum(len(row["raw_response"]) + len(row["feedback"]) for row in rows)
+    print(f"{args.responses} responses, {output_bytes / args.responses / 1024:.1f} KB of output each")
+
+    print(f"{'layout':<12}{'file MB':>10}{'grades ms':>11}{'grades MB':>11}{'full ms':>10}{'full MB':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        for layout in ("text", "zstd", "zstd+dict"):
+            path = os.path.join(directory, f"{layout}.db")
+            session_factory = build_database(path, rows, layout)
+            model = PlainLLMResponse if layout == "text" else LLMResponse
+            grades_time, grades_peak = measure(session_factory, model, full=False, repeat=args.repeat)
+            full_time, full_peak = measure(session_factory, model, full=True, repeat=args.repeat)
+            print(f"{layout:<12}{os.path.getsize(path) / 2**20:>10.2f}{grades_time * 1e3:>11.1f}{grades_peak / 2**20:>11.2f}"
+                  f"{full_time * 1e3:>10.1f}{full_peak / 2**20:>10.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+"""
+Benchmark of the list endpoints' serialization paths.
+
+Fills an in-memory SQLite database with one question and its student answers, checks
+that the row path produces the same JSON as the Pydantic path, and times listing the
+answers to the question (GET /api/student-answers/question/{id}) three ways:
+
+    orm+jsonable   ORM objects, model_validate per row, jsonable_encoder and json.dumps
+                   (FastAPI's serialization before it dumped response models directly)
+    orm+pydantic   ORM objects, model_validate per row, Pydantic's model_dump_json
+    rows+orjson    Column rows as dicts and orjson (crud and app.services.json_rows)
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_serialization [--answers 5000] [--repeat 5]
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Base
+from app.models.collection import Collection
+from app.models.combination import Combination  # noqa: F401 (resolves the Collection foreign key)
+from app.models.question import Question
+from app.models.student import Student
+from app.models.student_answer import StudentAnswer
+from app.models.test import Test  # noqa: F401 (resolves the ReextractionJob foreign key)
+from app.models.user import User
+from app.schemas.student_answer_schema import StudentAnswerListResponse, StudentAnswerResponse
+from app.services.json_rows import json_response, query_rows, schema_columns
+
+def build_database(answers: int, seed: int = 42):
+    """Create an in-memory database with one question and the given number of answers."""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+
+    rng = random.Random(seed)
+    words = "the cell membrane controls what enters and leaves because it is selectively permeable".split()
+    user = User(username="bench", password="bench")
+    db.add(user)
+    db.flush()
+    collection = Collection(user_id=user.id, name="Benchmark")
+    db.add(collection)
+    db.flush()
+    question = Question(collection_id=collection.id, text="What does the cell membrane do?", model_answer=" ".join(words))
+    db.add(question)
+    db.flush()
+
+    students = [Student(name=f"Student {i}", pid=f"pid{i:06d}", collection_id=collection.id) for i in range(answers)]
+    db.add_all(students)
+    db.flush()
+    db.add_all([
+        StudentAnswer(
+            answer=" ".join(rng.choice(words) for _ in range(rng.randint(5, 60))),
+            student_id=student.id,
+            question_id=question.id,
+            provisional_score=rng.choice([None, rng.random()])
+        )
+        for student in students
+    ])
+    db.commit()
+    return db, question.id
+
+def orm_models(db, question_id: int) -> StudentAnswerListResponse:
+    student_answers = db.query(StudentAnswer).filter(StudentAnswer.question_id == question_id).all()
+    return StudentAnswerListResponse(student_answers=[StudentAnswerResponse.model_validate(sa) for sa in student_answers])
+
+def orm_jsonable(db, question_id: int) -> bytes:
+    return json.dumps(jsonable_encoder(orm_models(db, question_id))).encode("utf-8")
+
+def orm_pydantic(db, question_id: int) -> bytes:
+    return orm_models(db, question_id).model_dump_json().encode("utf-8")
+
+def rows_orjson(db, question_id: int) -> bytes:
+    student_answers = db.query(*schema_columns(StudentAnswer, StudentAnswerResponse)).filter(
+        StudentAnswer.question_id == question_id
+    )
+    return json_response({"student_answers": query_rows(student_answers)}).body
+
+def query_only(db, question_id: int) -> int:
+    return len(db.query(*schema_columns(StudentAnswer, StudentAnswerResponse)).filter(
+        StudentAnswer.question_id == question_id
+    ).all())
+
+def time_best(function, repeat: int) -> float:
+    """Best wall time of repeated calls, in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--answers", type=int, default=5000, help="Number of student answers to list")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing repetitions, the best is reported")
+    args = parser.parse_args()
+
+    db, question_id = build_database(args.answers)
+    paths = {
+        "orm+jsonable": orm_jsonable,
+        "orm+pydantic": orm_pydantic,
+        "rows+orjson": rows_orjson,
+    }
+
+    expected = json.loads(orm_jsonable(db, question_id))
+    mismatches = [name for name, path in paths.items() if json.loads(path(db, question_id)) != expected]
+    print(f"Listing {args.answers} answers; same JSON on every path: {'OK' if not mismatches else ', '.join(mismatches) + ' differ'}")
+
+    def timed(path):
+        def run():
+            # Start from an empty identity map, as a request's new session does
+            db.expunge_all()
+            return path(db, question_id)
+        return time_best(run, args.repeat)
+
+    query_time = timed(query_only)
+    print(f"{'path':<14}{'ms':>10}{'us/row':>10}{'speedup':>10}")
+    baseline = None
+    for name, path in paths.items():
+        elapsed = timed(path)
+        baseline = baseline or elapsed
+        print(f"{name:<14}{elapsed * 1e3:>10.2f}{elapsed / args.answers * 1e6:>10.2f}{baseline / elapsed:>9.2f}x")
+    print(f"{'(query only)':<14}{query_time * 1e3:>10.2f}{query_time / args.answers * 1e6:>10.2f}")
+
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,365 @@
+"""
+Stand-in for an Ollama server, for benchmarks and tests without a GPU.
+
+Implements the parts of the Ollama API the backend uses: api/tags, api/show, api/ps,
+api/pull (streamed progress), api/generate (streaming and non-streaming), api/embed
+and the older api/embeddings. Generations hold one of a fixed number of parallel
+slots like OLLAMA_NUM_PARALLEL, take a sampled load latency plus prompt evaluation
+and token generation time, and answer in the "Grade: x" format the grade extractors
+understand. Grades and embeddings are deterministic functions of the prompt, and
+similar texts get similar embeddings, so clustering behaves like it does on a real
+embedding model.
+
+Usage (from the backend directory):
+    python -m benchmarks.fake_ollama [--port 11435] [--slots 1] [--latency lognormal:0.2,0.5]
+        [--tokens-per-second 40] [--response-tokens uniform:20,80] [--failure-rate 0.0]
+        [--time-scale 1.0]
+
+Then point the backend at it with OLLAMA_URL=http://localhost:11435.
+
+Distributions are written name:parameters, with times in seconds:
+    constant:x  uniform:low,high  normal:mean,stddev  lognormal:median,sigma  exponential:mean
+
+GET /fake/stats returns request counts per endpoint and POST /fake/reset clears them.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+DEFAULT_MODELS = ["gemma3:4b", "llama3.2:3b", "nomic-embed-text"]
+
+# Bytes of a fake model "download", reported by api/pull in DOWNLOAD_STEPS steps
+DOWNLOAD_SIZE = 2_000_000_000
+DOWNLOAD_STEPS = 10
+
+EXPLANATION_WORDS = (
+    "The student's answer covers the main idea of the model answer but leaves out some "
+    "of the supporting detail and uses less precise terminology than expected"
+).split()
+
+def parse_distribution(spec: str) -> Callable[[random.Random], float]:
+    """
+    Parse a distribution written name:parameters into a sampler of non-negative values.
+
+    Raises:
+        ValueError: If the name or the number of parameters is not recognized
+    """
+    name, _, parameters = spec.partition(":")
+    values = [float(value) for value in parameters.split(",") if value.strip()]
+    samplers = {
+        "constant": (1, lambda rng, x: x),
+        "uniform": (2, lambda rng, low, high: rng.uniform(low, high)),
+        "normal": (2, lambda rng, mean, stddev: rng.gauss(mean, stddev)),
+        "lognormal": (2, lambda rng, median, sigma: median * math.exp(rng.gauss(0, sigma))),
+        "exponential": (1, lambda rng, mean: rng.expovariate(1 / mean) if mean > 0 else 0.0),
+    }
+    if name not in samplers or len(values) != samplers[name][0]:
+        raise ValueError(f"Unknown distribution '{spec}'; use one of {', '.join(samplers)} with its parameters")
+    sampler = samplers[name][1]
+    return lambda rng: max(0.0, sampler(rng, *values))
+
+
+class FakeOllamaConfig:
+    """Behaviour of the stand-in server."""
+
+    def __init__(self, models: Optional[List[str]] = None, slots: int = 1, max_queue: int = 512,
+                 latency: str = "lognormal:0.2,0.5", tokens_per_second: float = 40.0,
+                 prompt_tokens_per_second: float = 1000.0, response_tokens: str = "uniform:20,80",
+                 failure_rate: float = 0.0, embedding_dimension: int = 256, embedding_latency: str = "constant:0.01",
+                 time_scale: float = 1.0, seed: int = 0):
+        self.models = models or list(DEFAULT_MODELS)
+        self.slots = max(1, slots)
+        self.max_queue = max_queue
+        self.latency = parse_distribution(latency)
+        self.tokens_per_second = tokens_per_second
+        self.prompt_tokens_per_second = prompt_tokens_per_second
+        self.response_tokens = parse_distribution(response_tokens)
+        self.failure_rate = failure_rate
+        self.embedding_dimension = embedding_dimension
+        self.embedding_latency = parse_distribution(embedding_latency)
+        self.time_scale = time_scale
+        self.seed = seed
+
+
+def model_digest(model: str) -> str:
+    return hashlib.sha256(f"fake-ollama:{model}".encode("utf-8")).hexdigest()
+
+def fake_grade(model: str, prompt: str) -> float:
+    """Deterministic grade of a prompt, in steps of 0.25."""
+    digest = hashlib.sha256(f"{model}\0{prompt}".encode("utf-8")).digest()
+    return digest[0] % 5 / 4
+
+def fake_response_words(model: str, prompt: str, tokens: int) -> List[str]:
+    """Words of a response in the format the grade extractors parse, about one token each."""
+    words = ["Grade:", f"{fake_grade(model, prompt):.2f}", "Explanation:"]
+    while len(words) < tokens:
+        words.extend(EXPLANATION_WORDS)
+    return words[:max(tokens, 2)]
+
+def fake_embedding(text: str, dimension: int) -> List[float]:
+    """Unit vector of hashed word unigrams and bigrams, so texts sharing words are similar."""
+    words = re.findall(r"\w+", text.lower())
+    vector = [0.0] * dimension
+    for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+        digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+        index = int.from_bytes(digest[:4], "little") % dimension
+        vector[index] += 1.0 if digest[4] & 1 else -1.0
+    norm = math.sqrt(sum(value * value for value in vector))
+    if norm == 0:
+        vector[0] = norm = 1.0
+    return [value / norm for value in vector]
+
+
+def create_app(config: FakeOllamaConfig) -> FastAPI:
+    """Build the stand-in server."""
+    app = FastAPI(title="Fake Ollama")
+    rng = random.Random(config.seed)
+    slots = asyncio.Semaphore(config.slots)
+    models = {model: datetime.now(timezone.utc) for model in config.models}
+    loaded: Dict[str, float] = {}
+    counts = Counter()
+    waiting = {"generations": 0}
+
+    def model_entry(model: str) -> Dict:
+        return {
+            "name": model,
+            "model": model,
+            "modified_at": models[model].isoformat(),
+            "size": DOWNLOAD_SIZE,
+            "digest": model_digest(model),
+            "details": {"format": "gguf", "family": model.split(":")[0], "parameter_size": "4B", "quantization_level": "Q4_K_M"},
+        }
+
+    def error(status_code: int, message: str) -> JSONResponse:
+        counts["errors"] += 1
+        return JSONResponse({"error": message}, status_code=status_code)
+
+    def injected_failure() -> bool:
+        return config.failure_rate > 0 and rng.random() < config.failure_rate
+
+    async def sleep(seconds: float):
+        if seconds > 0 and config.time_scale > 0:
+            await asyncio.sleep(seconds * config.time_scale)
+
+    @app.get("/api/tags")
+    async def tags():
+        counts["tags"] += 1
+        return {"models": [model_entry(model) for model in models]}
+
+    @app.post("/api/show")
+    async def show(request: Request):
+        counts["show"] += 1
+        body = await request.json()
+        model = body.get("model") or body.get("name")
+        if model not in models:
+            return error(404, f"model '{model}' not found")
+        return {
+            "modelfile": f"FROM {model}",
+            "parameters": "num_ctx 4096",
+            "template": "{{ .Prompt }}",
+            "details": model_entry(model)["details"],
+        }
+
+    @app.get("/api/ps")
+    async def ps():
+        counts["ps"] += 1
+        now = time.time()
+        return {"models": [
+            {**model_entry(model), "size_vram": DOWNLOAD_SIZE,
+             "expires_at": datetime.fromtimestamp(used_at + 300, timezone.utc).isoformat()}
+            for model, used_at in loaded.items() if model in models and now - used_at < 300
+        ]}
+
+    @app.post("/api/pull")
+    async def pull(request: Request):
+        counts["pull"] += 1
+        body = await request.json()
+        model = body.get("model") or body.get("name")
+
+        async def progress():
+            yield json.dumps({"status": "pulling manifest"}) + "\n"
+            digest = f"sha256:{model_digest(model)}"
+            for step in range(1, DOWNLOAD_STEPS + 1):
+                await sleep(0.05)
+                yield json.dumps({
+                    "status": "downloading", "digest": digest, "total": DOWNLOAD_SIZE,
+                    "completed": DOWNLOAD_SIZE * step // DOWNLOAD_STEPS
+                }) + "\n"
+            for status in ("verifying sha256 digest", "writing manifest", "success"):
+                yield json.dumps({"status": status}) + "\n"
+            models[model] = datetime.now(timezone.utc)
+
+        if body.get("stream", True) is False:
+            async for _ in progress():
+                pass
+            return {"status": "success"}
+        return StreamingResponse(progress(), media_type="application/x-ndjson")
+
+    @app.post("/api/generate")
+    async def generate(request: Request):
+        counts["generate"] += 1
+        body = await request.json()
+        model = body.get("model")
+        prompt = body.get("prompt", "")
+        if model not in models:
+            return error(404, f"model '{model}' not found, try pulling it first")
+        if injected_failure():
+            return error(500, "injected failure")
+        if waiting["generations"] >= config.max_queue:
+            return error(503, "server busy, please try again. maximum pending requests exceeded")
+
+        options = body.get("options") or {}
+        tokens = max(1, int(config.response_tokens(rng)))
+        if options.get("num_predict"):
+            tokens = min(tokens, int(options["num_predict"]))
+        words = fake_response_words(model, prompt, tokens)
+        prompt_tokens = max(1, len(prompt) // 4)
+        load_seconds = config.latency(rng)
+        prompt_seconds = prompt_tokens / config.prompt_tokens_per_second
+        token_seconds = 1 / config.tokens_per_second
+
+        def stats(started_at: float, generation_started_at: float) -> Dict:
+            now = time.perf_counter()
+            return {
+                "total_duration": int((now - started_at) * 1e9),
+                "load_duration": int(load_seconds * config.time_scale * 1e9),
+                "prompt_eval_count": prompt_tokens,
+                "prompt_eval_duration": int(prompt_seconds * config.time_scale * 1e9),
+                "eval_count": len(words),
+                "eval_duration": int((now - generation_started_at) * 1e9),
+            }
+
+        async def run(emit: Optional[Callable[[str], None]] = None):
+            waiting["generations"] += 1
+            queued = True
+            try:
+                async with slots:
+                    waiting["generations"] -= 1
+                    queued = False
+                    loaded[model] = time.time()
+                    started_at = time.perf_counter()
+                    await sleep(load_seconds + prompt_seconds)
+                    generation_started_at = time.perf_counter()
+                    if emit is None:
+                        await sleep(len(words) * token_seconds)
+                    else:
+                        for index, word in enumerate(words):
+                            await sleep(token_seconds)
+                            emit(word if index == 0 else " " + word)
+                    return stats(started_at, generation_started_at)
+            finally:
+                if queued:
+                    waiting["generations"] -= 1
+
+        created_at = datetime.now(timezone.utc).isoformat()
+        if body.get("stream", True) is False:
+            result = await run()
+            return {"model": model, "created_at": created_at, "response": " ".join(words), "done": True,
+                    "done_reason": "length" if options.get("num_predict") == len(words) else "stop", **result}
+
+        async def chunks():
+            queue: asyncio.Queue = asyncio.Queue()
+            task = asyncio.create_task(run(lambda text: queue.put_nowait(text)))
+            task.add_done_callback(lambda _: queue.put_nowait(None))
+            try:
+                while (text := await queue.get()) is not None:
+                    yield json.dumps({"model": model, "created_at": created_at, "response": text, "done": False}) + "\n"
+                result = task.result()
+                yield json.dumps({"model": model, "created_at": created_at, "response": "", "done": True,
+                                  "done_reason": "stop", **result}) + "\n"
+            finally:
+                task.cancel()
+
+        return StreamingResponse(chunks(), media_type="application/x-ndjson")
+
+    async def embed_texts(model: str, texts: List[str]) -> List[List[float]]:
+        async with slots:
+            loaded[model] = time.time()
+            await sleep(config.embedding_latency(rng) * max(1, len(texts) / 16))
+            return [fake_embedding(text, config.embedding_dimension) for text in texts]
+
+    @app.post("/api/embed")
+    async def embed(request: Request):
+        counts["embed"] += 1
+        body = await request.json()
+        model = body.get("model")
+        if model not in models:
+            return error(404, f"model '{model}' not found, try pulling it first")
+        if injected_failure():
+            return error(500, "injected failure")
+        texts = body.get("input", [])
+        texts = [texts] if isinstance(texts, str) else texts
+        return {"model": model, "embeddings": await embed_texts(model, texts)}
+
+    @app.post("/api/embeddings")
+    async def embeddings(request: Request):
+        counts["embeddings"] += 1
+        body = await request.json()
+        model = body.get("model")
+        if model not in models:
+            return error(404, f"model '{model}' not found, try pulling it first")
+        if injected_failure():
+            return error(500, "injected failure")
+        return {"embedding": (await embed_texts(model, [body.get("prompt", "")]))[0]}
+
+    @app.get("/fake/stats")
+    async def fake_stats():
+        return {"requests": dict(counts), "queued_generations": waiting["generations"], "slots": config.slots}
+
+    @app.post("/fake/reset")
+    async def fake_reset():
+        counts.clear()
+        return {"requests": {}}
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--models", default=",".join(DEFAULT_MODELS), help="Comma-separated models to list as downloaded")
+    parser.add_argument("--slots", type=int, default=1, help="Generations served in parallel, like OLLAMA_NUM_PARALLEL")
+    parser.add_argument("--max-queue", type=int, default=512, help="Queued generations before 503, like OLLAMA_MAX_QUEUE")
+    parser.add_argument("--latency", default="lognormal:0.2,0.5", help="Load latency before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=40.0, help="Generation speed")
+    parser.add_argument("--prompt-tokens-per-second", type=float, default=1000.0, help="Prompt evaluation speed")
+    parser.add_argument("--response-tokens", default="uniform:20,80", help="Length of a response in tokens")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Share of generate and embed requests failing with 500")
+    parser.add_argument("--embedding-dimension", type=int, default=256)
+    parser.add_argument("--embedding-latency", default="constant:0.01", help="Latency per 16 embedded texts")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="Multiplier of every simulated delay; 0 disables them")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    config = FakeOllamaConfig(
+        models=[model for model in args.models.split(",") if model],
+        slots=args.slots,
+        max_queue=args.max_queue,
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        prompt_tokens_per_second=args.prompt_tokens_per_second,
+        response_tokens=args.response_tokens,
+        failure_rate=args.failure_rate,
+        embedding_dimension=args.embedding_dimension,
+        embedding_latency=args.embedding_latency,
+        time_scale=args.time_scale,
+        seed=args.seed,
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Startup profile of the backend.
+
+Imports app.main in a fresh interpreter with `python -X importtime` and reports the
+total import time, the top-level packages that cost the most and the slowest
+individual modules. With --startup, the app's startup event is then run in profile
+mode (STARTUP_PROFILE=true), which logs the duration of each startup step.
+
+Usage (from the backend directory):
+    python -m benchmarks.profile_startup [--top 15] [--startup]
+
+Uses DATABASE_URL like the app; INIT_DB_ON_STARTUP and RESUME_TESTS_ON_STARTUP are
+passed through to the startup run.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+def import_profile() -> Tuple[float, List[Tuple[str, int, int, int]]]:
+    """
+    Import app.main with -X importtime.
+
+    Returns:
+        Tuple of (wall seconds, list of (module, depth, self us, cumulative us))
+    """
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=BACKEND_DIR, capture_output=True, text=True
+    )
+    elapsed = time.perf_counter() - start
+    if completed.returncode != 0:
+        raise RuntimeError(f"Importing app.main failed:\n{completed.stderr[-2000:]}")
+
+    modules = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules.append((name.strip(), depth, int(self_us), int(cumulative_us)))
+    return elapsed, modules
+
+def by_package(modules: List[Tuple[str, int, int, int]]) -> Dict[str, int]:
+    """Self import time per top-level package, in microseconds."""
+    packages = {}
+    for name, _, self_us, _ in modules:
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0) + self_us
+    return packages
+
+def run_startup():
+    """Run the startup event in profile mode and let it log its steps."""
+    code = (
+        "from fastapi.testclient import TestClient\n"
+        "from app.main import app\n"
+        "with TestClient(app):\n"
+        "    pass\n"
+    )
+    env = dict(os.environ, STARTUP_PROFILE="true")
+    completed = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, env=env, capture_output=True, text=True)
+    for line in completed.stderr.splitlines():
+        if "Startup profile" in line or completed.returncode != 0:
+            print(f"  {line}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top", type=int, default=15, help="Number of packages and modules to list")
+    parser.add_argument("--startup", action="store_true", help="Also run and time the startup event")
+    args = parser.parse_args()
+
+    elapsed, modules = import_profile()
+    total_us = sum(self_us for _, _, self_us, _ in modules)
+    print(f"Importing app.main: {elapsed * 1000:.0f} ms wall, {total_us / 1000:.0f} ms in {len(modules)} imports")
+
+    print(f"\n{'package':<32}{'self ms':>10}{'share':>8}")
+    for package, self_us in sorted(by_package(modules).items(), key=lambda item: -item[1])[:args.top]:
+        print(f"{package:<32}{self_us / 1000:>10.1f}{self_us / total_us:>8.1%}")
+
+    # Modules of the app and the packages they import directly, by cumulative time
+    print(f"\n{'module (cumulative)':<48}{'ms':>10}")
+    entry_points = [module for module in modules if module[1] == 0 or module[0].startswith("app.")]
+    for name, _, _, cumulative_us in sorted(entry_points, key=lambda module: -module[3])[:args.top]:
+        print(f"{name:<48}{cumulative_us / 1000:>10.1f}")
+
+    if args.startup:
+        print("\nStartup steps:")
+        run_startup()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
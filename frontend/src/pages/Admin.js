@@ -13,6 +13,9 @@ Student's Answer: {{student_answer}}
 Grade the student's answer based on the correct answer from (0.0 - 1.0). 
 Provide a brief explanation for your grade.`;
 
+// Number of detailed test results loaded per page
+const RESULTS_PAGE_SIZE = 200;
+
 // Predefined academic categories
 const ACADEMIC_CATEGORIES = [
   "General",
@@ -49,6 +52,9 @@ export default function Admin() {
   const [selectedTest, setSelectedTest] = useState(null);
   const [testPrompts, setTestPrompts] = useState({});
   const [viewingPrompt, setViewingPrompt] = useState(null);
+  const [liveProgress, setLiveProgress] = useState({});
+  const [testResults, setTestResults] = useState([]);
+  const [resultsCursor, setResultsCursor] = useState(null);
   
   // Prompts state
   const [prompts, setPrompts] = useState([]);
@@ -95,24 +101,75 @@ export default function Admin() {
     }
   }, [urlView, urlTestId, loading]);
 
-  // Auto-refresh for running tests
+  // Live progress stream for running tests
   useEffect(() => {
-    let intervalId;
-    
-    if (selectedTest && selectedTest.status === "running") {
-      // Set up polling when a running test is being viewed
-      intervalId = setInterval(() => {
-        refreshTestDetails(selectedTest.id);
-      }, 5000); // Poll every 5 seconds
+    if (!selectedTest || selectedTest.status !== "running") {
+      return;
     }
     
-    // Clean up interval when component unmounts or dependencies change
-    return () => {
-      if (intervalId) {
-        clearInterval(intervalId);
+    const testId = selectedTest.id;
+    const abortController = new AbortController();
+    
+    const streamProgress = async () => {
+      try {
+        // Using fetch instead of axios for better streaming support
+        const response = await fetch(`/api/tests/${testId}/progress`, {
+          headers: {
+            "Authorization": `Bearer ${localStorage.getItem("token")}`
+          },
+          signal: abortController.signal
+        });
+        
+        if (!response.ok) {
+          throw new Error(`HTTP error! status: ${response.status}`);
+        }
+        
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        
+        while (true) {
+          const { done, value } = await reader.read();
+          if (done) break;
+          
+          // Process complete lines
+          buffer += decoder.decode(value, { stream: true });
+          const lines = buffer.split('\n');
+          buffer = lines.pop() || '';
+          
+          for (const line of lines) {
+            if (!line.trim()) continue;
+            const event = JSON.parse(line);
+            
+            if (event.type === "snapshot") {
+              const pairs = {};
+              event.pairs.forEach((pair) => {
+                pairs[`${pair.model_name}-${pair.prompt_id}`] = pair;
+              });
+              setLiveProgress(pairs);
+            } else if (event.type === "row" || event.type === "pair") {
+              setLiveProgress(prev => ({
+                ...prev,
+                [`${event.model_name}-${event.prompt_id}`]: event
+              }));
+            }
+          }
+        }
+        
+        // The stream ends when the test stops running; load the final results once
+        fetchTestDetails(testId);
+      } catch (err) {
+        if (err.name !== "AbortError") {
+          console.error(`Failed to stream progress for test ${testId}`, err);
+        }
       }
     };
-  }, [selectedTest]);
+    
+    streamProgress();
+    
+    // Close the stream when the component unmounts or another test is selected
+    return () => abortController.abort();
+  }, [selectedTest?.id, selectedTest?.status]);
 
   useEffect(() => {
     if (!loading) {
@@ -137,12 +194,18 @@ export default function Admin() {
     }
   };
   
-  // Fetch complete test details including prompts
+  // Fetch test summary, the first page of results and prompt details
   const fetchTestDetails = async (testId) => {
     try {
-      const response = await axios.get(`/api/tests/${testId}`);
+      const response = await axios.get(`/api/tests/${testId}/summary`);
       setSelectedTest(response.data);
       
+      const resultsResponse = await axios.get(`/api/tests/${testId}/results`, {
+        params: { limit: RESULTS_PAGE_SIZE }
+      });
+      setTestResults(resultsResponse.data.results);
+      setResultsCursor(resultsResponse.data.next_after_id);
+      
       // Fetch prompt details for this test
       if (response.data.prompt_ids && response.data.prompt_ids.length > 0) {
         const promptsData = {};
@@ -164,42 +227,17 @@ export default function Admin() {
     }
   };
   
-  // Refresh just the test data (used for polling)
-  const refreshTestDetails = async (testId) => {
+  // Fetch the next page of results for the selected test
+  const fetchMoreTestResults = async () => {
     try {
-      const response = await axios.get(`/api/tests/${testId}`);
-      
-      // Only update if status has changed or results have been added/modified
-      const currentResults = selectedTest.results ? selectedTest.results.length : 0;
-      const newResults = response.data.results ? response.data.results.length : 0;
-      
-      if (response.data.status !== selectedTest.status || newResults !== currentResults) {
-        console.log(`Test ${testId} updated: status=${response.data.status}, results=${newResults}`);
-        setSelectedTest(response.data);
-        
-        // If we have new prompt IDs that weren't previously loaded, fetch their details
-        if (response.data.prompt_ids) {
-          const newPromptIds = response.data.prompt_ids.filter(id => !testPrompts[id]);
-          
-          if (newPromptIds.length > 0) {
-            const updatedPrompts = {...testPrompts};
-            
-            for (const promptId of newPromptIds) {
-              try {
-                const promptResponse = await axios.get(`/api/prompts/${promptId}`);
-                updatedPrompts[promptId] = promptResponse.data;
-              } catch (promptErr) {
-                console.error(`Failed to fetch prompt details for ID ${promptId}`, promptErr);
-              }
-            }
-            
-            setTestPrompts(updatedPrompts);
-          }
-        }
-      }
+      const response = await axios.get(`/api/tests/${selectedTest.id}/results`, {
+        params: { limit: RESULTS_PAGE_SIZE, after_id: resultsCursor }
+      });
+      setTestResults(prev => [...prev, ...response.data.results]);
+      setResultsCursor(response.data.next_after_id);
     } catch (err) {
-      console.error(`Failed to refresh test details for ID ${testId}`, err);
-      // Don't show error to user during auto-refresh to avoid error spam
+      console.error(`Failed to fetch more results for test ${selectedTest.id}`, err);
+      setError(`Failed to fetch results: ${err.response?.data?.detail || err.message}`);
     }
   };
   
@@ -211,6 +249,18 @@ export default function Admin() {
     setViewingPrompt(null);
   };
 
+  const handleCancelTest = async (id) => {
+    if (!window.confirm("Are you sure you want to cancel this test? Results produced so far are kept.")) return;
+    
+    try {
+      await axios.post(`/api/tests/${id}/cancel`);
+      fetchTestDetails(id);
+    } catch (err) {
+      console.error("Failed to cancel test", err);
+      setError(`Failed to cancel test: ${err.response?.data?.detail || err.message}`);
+    }
+  };
+
   const handleDeleteTest = async (id) => {
     if (!window.confirm("Are you sure you want to delete this test?")) return;
     
@@ -607,9 +657,17 @@ export default function Admin() {
             <div className="test-header-actions">
               {isRunning && (
                 <div className="auto-refresh-indicator">
-                  <span className="refresh-dot"></span> Auto-refreshing...
+                  <span className="refresh-dot"></span> Live progress
                 </div>
               )}
+              {isRunning && (
+                <button 
+                  className="btn-danger"
+                  onClick={() => handleCancelTest(selectedTest.id)}
+                >
+                  Cancel Test
+                </button>
+              )}
               <button 
                 className="btn-secondary"
                 onClick={() => setSelectedTest(null)}
@@ -648,15 +706,71 @@ export default function Admin() {
             </div>
           </div>
           
+          {isRunning && Object.keys(liveProgress).length > 0 && (
+            <div className="test-results-section">
+              <h3>Progress</h3>
+              {Object.values(liveProgress).map((pair) => (
+                <div key={`${pair.model_name}-${pair.prompt_id}`} className="download-progress">
+                  <div className="progress-status">
+                    <span className="status-label">
+                      {pair.model_name} / {testPrompts[pair.prompt_id]?.name || `Prompt ID: ${pair.prompt_id}`}
+                    </span>
+                    <span className="status-value">{pair.status}</span>
+                  </div>
+                  <div className="progress-bar-container">
+                    <div
+                      className="progress-bar"
+                      style={{ width: `${pair.total_rows ? (pair.rows_done / pair.total_rows) * 100 : 0}%` }}
+                    ></div>
+                  </div>
+                  <div className="progress-details">
+                    <span>{pair.rows_done} / {pair.total_rows} rows</span>
+                    <span>{pair.rows_per_minute != null ? `${pair.rows_per_minute.toFixed(1)} rows/min` : "-"}</span>
+                    <span>{pair.tokens_per_second != null ? `${pair.tokens_per_second.toFixed(1)} tok/s` : "-"}</span>
+                    <span>{pair.accuracy != null ? `${(pair.accuracy * 100).toFixed(1)}% accuracy` : "-"}</span>
+                    {pair.accuracy_lower != null && (
+                      <span>CI {(pair.accuracy_lower * 100).toFixed(1)}–{(pair.accuracy_upper * 100).toFixed(1)}%</span>
+                    )}
+                    <span>{pair.eta_seconds != null ? `ETA ${Math.ceil(pair.eta_seconds / 60)} min` : ""}</span>
+                  </div>
+                </div>
+              ))}
+            </div>
+          )}
+          
           {selectedTest.summaries && selectedTest.summaries.length > 0 ? (
             <div className="test-results-section">
               <h3>Test Results</h3>
               <div className="test-summaries">
-                {selectedTest.summaries.map((summary) => (
+                {selectedTest.summaries.map((summary) => {
+                  const pairProgress = (selectedTest.progress || []).find(
+                    (progress) => progress.model_name === summary.model_name && progress.prompt_id === summary.prompt_id
+                  );
+                  return (
                   <div key={`${summary.model_name}-${summary.prompt_id}`} className="summary-card">
-                    <h4>{summary.model_name}</h4>
+                    <h4>
+                      {summary.model_name}
+                      {pairProgress?.status === "eliminated" && (
+                        <span className="status-badge eliminated">eliminated early</span>
+                      )}
+                    </h4>
                     <p><strong>Average Accuracy:</strong> {(summary.average_accuracy * 100).toFixed(2)}%</p>
+                    {pairProgress?.accuracy_lower != null && (
+                      <p><strong>Accuracy CI ({Math.round((selectedTest.stopping_confidence || 0.95) * 100)}%):</strong> {(pairProgress.accuracy_lower * 100).toFixed(1)}% – {(pairProgress.accuracy_upper * 100).toFixed(1)}%</p>
+                    )}
                     <p><strong>Average Response Time:</strong> {summary.average_response_time.toFixed(2)}s</p>
+                    {summary.mae != null && (
+                      <p><strong>MAE / RMSE:</strong> {summary.mae.toFixed(3)} / {summary.rmse.toFixed(3)}</p>
+                    )}
+                    {summary.quadratic_weighted_kappa != null && (
+                      <p><strong>Quadratic Weighted Kappa:</strong> {summary.quadratic_weighted_kappa.toFixed(3)}</p>
+                    )}
+                    {summary.exact_agreement != null && (
+                      <p><strong>Exact Agreement:</strong> {(summary.exact_agreement * 100).toFixed(2)}%</p>
+                    )}
+                    {summary.latency_p95 != null && (
+                      <p><strong>Latency p50 / p95:</strong> {summary.latency_p50.toFixed(2)}s / {summary.latency_p95.toFixed(2)}s</p>
+                    )}
                     <p><strong>Questions Evaluated:</strong> {summary.total_questions}</p>
                     <p>
                       <strong>Prompt:</strong>{" "}
@@ -668,7 +782,8 @@ export default function Admin() {
                       </span>
                     </p>
                   </div>
-                ))}
+                  );
+                })}
               </div>
               
               <h3>Detailed Results</h3>
@@ -686,7 +801,7 @@ export default function Admin() {
                     </tr>
                   </thead>
                   <tbody>
-                    {selectedTest.results.map((result) => (
+                    {testResults.map((result) => (
                       <tr key={result.id}>
                         <td>{result.model_name}</td>
                         <td>
@@ -707,6 +822,14 @@ export default function Admin() {
                   </tbody>
                 </table>
               </div>
+              <p>
+                Showing {testResults.length} of {selectedTest.total_results} results
+              </p>
+              {resultsCursor && (
+                <button className="btn-secondary" onClick={fetchMoreTestResults}>
+                  Load More Results
+                </button>
+              )}
             </div>
           ) : (
             <div className="no-results">
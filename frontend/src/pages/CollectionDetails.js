@@ -3,6 +3,9 @@ import { useParams, useNavigate } from "react-router-dom";
 import axios from "axios";
 import "../styles/CollectionDetails.css";
 
+// Provisional score from which uploaded answers are accepted without grading
+const AUTO_ACCEPT_THRESHOLD = 0.95;
+
 export default function CollectionDetails() {
   const { id } = useParams();
   const navigate = useNavigate();
@@ -24,10 +27,12 @@ export default function CollectionDetails() {
   const [answerError, setAnswerError] = useState("");
   const [grades, setGrades] = useState({});
   const [gradingInProgress, setGradingInProgress] = useState({});
+  const [feedbackInProgress, setFeedbackInProgress] = useState({});
   const [showUploadQuestionsModal, setShowUploadQuestionsModal] = useState(false);
   const [showUploadAnswersModal, setShowUploadAnswersModal] = useState(false);
   const [questionsFile, setQuestionsFile] = useState(null);
   const [answersFile, setAnswersFile] = useState(null);
+  const [autoAcceptMatches, setAutoAcceptMatches] = useState(false);
   const [uploadStatus, setUploadStatus] = useState(null);
   const [openStudentId, setOpenStudentId] = useState(null); // State for student dropdown
   const [isGradingAll, setIsGradingAll] = useState(false); // State for Grade All button
@@ -255,7 +260,8 @@ export default function CollectionDetails() {
         {
           headers: {
             'Content-Type': 'multipart/form-data'
-          }
+          },
+          params: autoAcceptMatches ? { auto_accept_threshold: AUTO_ACCEPT_THRESHOLD } : {}
         }
       );
       
@@ -343,6 +349,24 @@ export default function CollectionDetails() {
     setIsGradingAll(false);
   };
 
+  // Regrade only the answers whose grade was produced by an older prompt, model or answer text
+  const handleRegradeStale = async () => {
+    setIsGradingAll(true);
+    try {
+      const staleRes = await axios.get(`/api/grading-batches/stale/${id}`);
+      for (const answerID of staleRes.data.stale_answer_ids) {
+        try {
+          await handleGradeAnswer(answerID);
+        } catch (err) {
+          console.error(`Failed to regrade answer ${answerID}:`, err);
+        }
+      }
+    } catch (err) {
+      console.error("Failed to find stale grades", err);
+    }
+    setIsGradingAll(false);
+  };
+
   // Toggle student dropdown visibility
   const toggleStudent = (studentId) => {
     setOpenStudentId(prevOpenId => (prevOpenId === studentId ? null : studentId));
@@ -503,11 +527,35 @@ export default function CollectionDetails() {
       
       setGradingInProgress(prev => ({ ...prev, [answerID]: false }));
     } catch (err) {
+      if (err.response?.status === 429) {
+        // Too many of this collection owner's grades are pending; retry when the server suggests
+        const retryAfter = parseInt(err.response.headers['retry-after'] || "5", 10);
+        await new Promise(resolve => setTimeout(resolve, retryAfter * 1000));
+        return handleGradeAnswer(answerID);
+      }
       console.error("Failed to grade answer", err);
       setGradingInProgress(prev => ({ ...prev, [answerID]: false }));
     }
   };
 
+  // Generate the feedback of a grade-only grade the first time it is requested
+  const handleShowFeedback = async (answerID) => {
+    try {
+      setFeedbackInProgress(prev => ({ ...prev, [answerID]: true }));
+      const gradeRes = await axios.get(`/api/student-answers/${answerID}/grades`, {
+        params: { feedback: true }
+      });
+      setGrades(prev => ({
+        ...prev,
+        [answerID]: gradeRes.data
+      }));
+    } catch (err) {
+      console.error("Failed to get feedback", err);
+    } finally {
+      setFeedbackInProgress(prev => ({ ...prev, [answerID]: false }));
+    }
+  };
+
   if (loading) return <div className="loading">Loading...</div>;
   if (error) return <div className="error">{error}</div>;
   if (!collection) return <div className="not-found">Collection not found</div>;
@@ -638,6 +686,14 @@ export default function CollectionDetails() {
               >
                 {isGradingAll ? "Grading All..." : "Grade All"}
               </button>
+              <button 
+                onClick={handleRegradeStale} 
+                disabled={isGradingAll || students.length === 0 || questions.length === 0}
+                className="grade-all-button"
+                style={{ marginRight: '10px' }}
+              >
+                Regrade Stale
+              </button>
               <button onClick={() => setShowAddStudentModal(true)}>Add Student</button>
             </div>
           </div>
@@ -668,17 +724,32 @@ export default function CollectionDetails() {
                               
                               {grade ? (
                                 <div className="grade-display">
-                                  <p><strong>Grade:</strong> {grade.grade.toFixed(2)}</p>
-                                  <p><strong>Feedback:</strong> {grade.feedback}</p>
+                                  <p><strong>Grade:</strong> {grade.grade.toFixed(2)}{grade.provenance === "lexical" && " (matches the model answer)"}{grade.provenance === "cluster" && " (same as a similar answer)"}</p>
+                                  {grade.feedback == null && grade.grading_mode === "grade_only" ? (
+                                    <button
+                                      onClick={() => handleShowFeedback(answer.id)}
+                                      disabled={feedbackInProgress[answer.id]}
+                                      className="grade-button"
+                                    >
+                                      {feedbackInProgress[answer.id] ? "Generating feedback..." : "Show Feedback"}
+                                    </button>
+                                  ) : (
+                                    <p><strong>Feedback:</strong> {grade.feedback}</p>
+                                  )}
                                 </div>
                               ) : (
-                                <button 
-                                  onClick={() => handleGradeAnswer(answer.id)}
-                                  disabled={gradingInProgress[answer.id]}
-                                  className="grade-button"
-                                >
-                                  {gradingInProgress[answer.id] ? "Grading..." : "Grade"}
-                                </button>
+                                <>
+                                  {answer.provisional_score != null && (
+                                    <p><strong>Provisional score:</strong> {answer.provisional_score.toFixed(2)} (similarity to the model answer)</p>
+                                  )}
+                                  <button 
+                                    onClick={() => handleGradeAnswer(answer.id)}
+                                    disabled={gradingInProgress[answer.id]}
+                                    className="grade-button"
+                                  >
+                                    {gradingInProgress[answer.id] ? "Grading..." : "Grade"}
+                                  </button>
+                                </>
                               )}
                             </>
                           ) : (
@@ -864,6 +935,15 @@ export default function CollectionDetails() {
               </div>
             </div>
             
+            <label className="csv-note">
+              <input
+                type="checkbox"
+                checked={autoAcceptMatches}
+                onChange={(e) => setAutoAcceptMatches(e.target.checked)}
+              />
+              Accept answers that match the model answer without grading them
+            </label>
+            
             {uploadStatus && (
               <div className={`upload-status ${uploadStatus.error ? 'error' : 'success'}`}>
                 <p>{uploadStatus.message}</p>
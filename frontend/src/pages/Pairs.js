@@ -21,6 +21,10 @@ export default function Pairs() {
   const [prompt, setPrompt] = useState(DEFAULT_PROMPT);
   const [availableModels, setAvailableModels] = useState([]);
   const [selectedModel, setSelectedModel] = useState("");
+  const [cascadeModel, setCascadeModel] = useState("");
+  const [cascadeBandLow, setCascadeBandLow] = useState("");
+  const [cascadeBandHigh, setCascadeBandHigh] = useState("");
+  const [gradingMode, setGradingMode] = useState("full");
   const [combinations, setCombinations] = useState([]);
   const [isLoading, setIsLoading] = useState(false);
   const [error, setError] = useState(null);
@@ -93,7 +97,11 @@ export default function Pairs() {
         name,
         description,
         prompt,
-        model_name: selectedModel
+        model_name: selectedModel,
+        cascade_model_name: cascadeModel || null,
+        cascade_band_low: cascadeModel && cascadeBandLow !== "" ? Number(cascadeBandLow) : null,
+        cascade_band_high: cascadeModel && cascadeBandHigh !== "" ? Number(cascadeBandHigh) : null,
+        grading_mode: gradingMode
       });
       setActiveView("list");
       fetchCombinations();
@@ -248,6 +256,49 @@ export default function Pairs() {
                     )}
                   </div>
                 )}
+                
+                <div className="form-group">
+                  <label htmlFor="cascade-model">Escalation Model (optional)</label>
+                  <p>Answers graded with low confidence, or with a grade in the ambiguous band, are graded again by this model.</p>
+                  <select
+                    id="cascade-model"
+                    value={cascadeModel}
+                    onChange={(e) => setCascadeModel(e.target.value)}
+                  >
+                    <option value="">No escalation</option>
+                    {availableModels
+                      .filter((model) => model.name !== selectedModel)
+                      .map((model) => (
+                        <option key={model.name} value={model.name}>
+                          {model.name} ({model.details?.parameter_size || "Unknown size"})
+                        </option>
+                      ))}
+                  </select>
+                </div>
+                
+                {cascadeModel && (
+                  <div className="form-group">
+                    <label>Ambiguous Grade Band (optional)</label>
+                    <input
+                      type="number"
+                      min="0"
+                      max="1"
+                      step="0.05"
+                      value={cascadeBandLow}
+                      onChange={(e) => setCascadeBandLow(e.target.value)}
+                      placeholder="From, e.g. 0.4"
+                    />
+                    <input
+                      type="number"
+                      min="0"
+                      max="1"
+                      step="0.05"
+                      value={cascadeBandHigh}
+                      onChange={(e) => setCascadeBandHigh(e.target.value)}
+                      placeholder="To, e.g. 0.6"
+                    />
+                  </div>
+                )}
               </div>
             )}
           </div>
@@ -282,6 +333,19 @@ export default function Pairs() {
               />
             </div>
             
+            <div className="form-group">
+              <label htmlFor="grading-mode">Grading Mode</label>
+              <select
+                id="grading-mode"
+                value={gradingMode}
+                onChange={(e) => setGradingMode(e.target.value)}
+                className="form-control"
+              >
+                <option value="full">Grade and feedback</option>
+                <option value="grade_only">Grade only, feedback when requested (faster)</option>
+              </select>
+            </div>
+            
             <div className="review-summary">
               <h4>Prompt Template:</h4>
               <pre>{prompt}</pre>
@@ -289,6 +353,16 @@ export default function Pairs() {
               <h4>Selected Model:</h4>
               <p>{selectedModel}</p>
               
+              {cascadeModel && (
+                <>
+                  <h4>Escalation Model:</h4>
+                  <p>
+                    {cascadeModel}
+                    {cascadeBandLow !== "" && cascadeBandHigh !== "" && ` (also for grades from ${cascadeBandLow} to ${cascadeBandHigh})`}
+                  </p>
+                </>
+              )}
+              
               <p>Click "Save" to create this prompt-model pair.</p>
             </div>
           </div>
@@ -345,6 +419,13 @@ export default function Pairs() {
                 <h4>Model:</h4>
                 <p>{combination.model_name}</p>
                 
+                {combination.cascade_model_name && (
+                  <>
+                    <h4>Escalation Model:</h4>
+                    <p>{combination.cascade_model_name}</p>
+                  </>
+                )}
+                
                 <h4>Prompt Template:</h4>
                 <pre className="prompt-preview">{combination.prompt}</pre>
               </div>
@@ -13,8 +13,13 @@ export default function TestingWizard() {
   const [selectedCategory, setSelectedCategory] = useState("All");
   const [csvFile, setCsvFile] = useState(null);
   const [csvPreview, setCsvPreview] = useState(null);
+  const [datasets, setDatasets] = useState([]);
+  const [selectedDatasetId, setSelectedDatasetId] = useState("");
   const [testName, setTestName] = useState("");
   const [testDescription, setTestDescription] = useState("");
+  const [evaluationMode, setEvaluationMode] = useState("exhaustive");
+  const [stoppingConfidence, setStoppingConfidence] = useState(0.95);
+  const [minRows, setMinRows] = useState(30);
   const [isLoading, setIsLoading] = useState(false);
   const [error, setError] = useState(null);
   const [testId, setTestId] = useState(null);
@@ -43,6 +48,8 @@ export default function TestingWizard() {
     } else if (currentStep === 2) {
       fetchPrompts();
       fetchCategories();
+    } else if (currentStep === 3) {
+      fetchDatasets();
     }
   }, [currentStep, selectedCategory]);
 
@@ -61,6 +68,15 @@ export default function TestingWizard() {
     }
   };
 
+  const fetchDatasets = async () => {
+    try {
+      const response = await axios.get("/api/test-datasets/");
+      setDatasets(response.data);
+    } catch (err) {
+      console.error("Failed to fetch test datasets", err);
+    }
+  };
+
   const fetchPrompts = async () => {
     setIsLoading(true);
     try {
@@ -144,7 +160,10 @@ export default function TestingWizard() {
         name: testName,
         description: testDescription,
         model_names: selectedModels,
-        prompt_ids: selectedPrompts
+        prompt_ids: selectedPrompts,
+        evaluation_mode: evaluationMode,
+        stopping_confidence: Number(stoppingConfidence),
+        min_rows: Number(minRows)
       });
 
       setTestId(response.data.id);
@@ -159,21 +178,28 @@ export default function TestingWizard() {
   };
 
   const handleUploadCsv = async () => {
-    if (!csvFile) {
-      setError("Please select a CSV file to upload");
+    if (!csvFile && !selectedDatasetId) {
+      setError("Please select a CSV file to upload or a stored dataset");
       return;
     }
 
     setIsLoading(true);
     try {
-      const formData = new FormData();
-      formData.append("file", csvFile);
+      if (selectedDatasetId) {
+        // Stored datasets run right away, without uploading the rows again
+        await axios.post(`/api/tests/${testId}/run`, {
+          dataset_id: Number(selectedDatasetId)
+        });
+      } else {
+        const formData = new FormData();
+        formData.append("file", csvFile);
 
-      await axios.post(`/api/tests/${testId}/upload`, formData, {
-        headers: {
-          'Content-Type': 'multipart/form-data'
-        }
-      });
+        await axios.post(`/api/tests/${testId}/upload`, formData, {
+          headers: {
+            'Content-Type': 'multipart/form-data'
+          }
+        });
+      }
 
       // Navigate to test results view or dashboard
       navigate(`/admin?view=tests&id=${testId}`);
@@ -364,6 +390,48 @@ export default function TestingWizard() {
         />
       </div>
       
+      <div className="form-group">
+        <label htmlFor="evaluation-mode">Evaluation Mode</label>
+        <select
+          id="evaluation-mode"
+          value={evaluationMode}
+          onChange={(e) => setEvaluationMode(e.target.value)}
+          className="form-control"
+        >
+          <option value="exhaustive">Exhaustive: every pair on every row</option>
+          <option value="adaptive">Adaptive: stop pairs that are clearly losing</option>
+        </select>
+      </div>
+      
+      {evaluationMode === "adaptive" && (
+        <>
+          <div className="form-group">
+            <label htmlFor="stopping-confidence">Stopping Confidence</label>
+            <input
+              type="number"
+              id="stopping-confidence"
+              min="0.5"
+              max="0.999"
+              step="0.01"
+              value={stoppingConfidence}
+              onChange={(e) => setStoppingConfidence(e.target.value)}
+              className="form-control"
+            />
+          </div>
+          <div className="form-group">
+            <label htmlFor="min-rows">Minimum Rows per Pair</label>
+            <input
+              type="number"
+              id="min-rows"
+              min="1"
+              value={minRows}
+              onChange={(e) => setMinRows(e.target.value)}
+              className="form-control"
+            />
+          </div>
+        </>
+      )}
+      
       <div className="csv-upload-section">
         <p>The CSV file must contain the following columns:</p>
         <ul>
@@ -388,6 +456,25 @@ export default function TestingWizard() {
         </div>
       </div>
       
+      {datasets.length > 0 && (
+        <div className="form-group">
+          <label htmlFor="test-dataset">Or reuse a stored dataset</label>
+          <select
+            id="test-dataset"
+            value={selectedDatasetId}
+            onChange={(e) => setSelectedDatasetId(e.target.value)}
+            className="form-control"
+          >
+            <option value="">Upload a new CSV file</option>
+            {datasets.map(dataset => (
+              <option key={dataset.id} value={dataset.id}>
+                {dataset.name} ({dataset.row_count} rows)
+              </option>
+            ))}
+          </select>
+        </div>
+      )}
+      
       {csvPreview && (
         <div className="csv-preview">
           <h4>CSV Preview</h4>
@@ -415,6 +502,7 @@ export default function TestingWizard() {
         <h4>Test Summary</h4>
         <p><strong>Name:</strong> {testName}</p>
         {testDescription && <p><strong>Description:</strong> {testDescription}</p>}
+        <p><strong>Evaluation Mode:</strong> {evaluationMode === "adaptive" ? `Adaptive (${stoppingConfidence} confidence, at least ${minRows} rows)` : "Exhaustive"}</p>
         
         <div className="test-models">
           <h5>Selected Models ({selectedModels.length})</h5>
@@ -436,7 +524,16 @@ export default function TestingWizard() {
           </ul>
         </div>
         
-        {csvFile && (
+        {selectedDatasetId ? (
+          <div className="test-csv">
+            <h5>Test Data</h5>
+            <p>
+              {datasets
+                .filter(dataset => String(dataset.id) === String(selectedDatasetId))
+                .map(dataset => `${dataset.name} (${dataset.row_count} rows, stored)`)}
+            </p>
+          </div>
+        ) : csvFile && (
           <div className="test-csv">
             <h5>Test Data</h5>
             <p>{csvFile.name} ({(csvFile.size / 1024).toFixed(2)} KB)</p>